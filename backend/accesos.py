@@ -0,0 +1,153 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, or_
+
+from . import models
+from .metricas import metricas
+
+logger = logging.getLogger("uvicorn.error")
+
+# Segundos entre escrituras de las fechas de último acceso (0: escribir en cada login)
+LAST_ACCESS_FLUSH_SECONDS = float(os.getenv("LAST_ACCESS_FLUSH_SECONDS", "5"))
+
+# Usuarios pendientes de escribir a partir de los que el login escribe el lote él mismo
+LAST_ACCESS_MAX_PENDING = int(os.getenv("LAST_ACCESS_MAX_PENDING", "10000"))
+
+class BufferAccesos:
+    """
+    Escritura diferida de `usuarios.fecha_ultimo_acceso`.
+
+    Cada login solo anota la fecha en memoria (la más reciente por usuario) y
+    un hilo en segundo plano escribe todas las pendientes cada
+    LAST_ACCESS_FLUSH_SECONDS con un único UPDATE ejecutado en lote, en lugar
+    de un UPDATE y un commit por login que en SQLite toman el bloqueo de
+    escritura de toda la base de datos. El UPDATE solo avanza la fecha, así
+    que los lotes de varios workers no se pisan.
+
+    La memoria está acotada: con LAST_ACCESS_MAX_PENDING usuarios pendientes,
+    el login que llega escribe el lote antes de continuar.
+    """
+
+    def __init__(self, maximo_pendientes: int):
+        self.maximo_pendientes = maximo_pendientes
+        self._pendientes: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._lock_volcado = threading.Lock()
+        self._motor = None
+        self._detener: Optional[threading.Event] = None
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def activo(self) -> bool:
+        return self._hilo is not None
+
+    def registrar(self, usuario_id: int, fecha: datetime) -> bool:
+        """
+        Anota el último acceso de un usuario para el próximo lote.
+
+        Returns:
+            False si la escritura diferida no está activa (scripts, o
+            LAST_ACCESS_FLUSH_SECONDS=0): el llamante debe escribirla él mismo
+        """
+        if not self.activo:
+            return False
+        with self._lock:
+            anterior = self._pendientes.get(usuario_id)
+            if anterior is None or anterior < fecha:
+                self._pendientes[usuario_id] = fecha
+            lleno = len(self._pendientes) >= self.maximo_pendientes
+        if lleno:
+            self.volcar()
+        return True
+
+    def volcar(self) -> int:
+        """
+        Escribe las fechas pendientes en un único lote.
+
+        Returns:
+            Número de usuarios escritos
+        """
+        with self._lock_volcado:
+            with self._lock:
+                pendientes, self._pendientes = self._pendientes, {}
+            if not pendientes or self._motor is None:
+                return 0
+
+            tabla = models.Usuario.__table__
+            sentencia = tabla.update()\
+                .where(tabla.c.id == bindparam("p_usuario_id"))\
+                .where(or_(
+                    tabla.c.fecha_ultimo_acceso.is_(None),
+                    tabla.c.fecha_ultimo_acceso < bindparam("p_fecha")
+                ))\
+                .values(fecha_ultimo_acceso=bindparam("p_fecha"))
+            filas = [{"p_usuario_id": usuario_id, "p_fecha": fecha} for usuario_id, fecha in pendientes.items()]
+
+            inicio = time.perf_counter()
+            try:
+                with self._motor.begin() as conexion:
+                    conexion.execute(sentencia, filas)
+            except Exception:
+                metricas.incrementar("last_access_flush_errors_total")
+                logger.exception("Error al escribir %d fechas de último acceso", len(filas))
+                self._reintentar(pendientes)
+                return 0
+            finally:
+                metricas.observar("last_access_flush_seconds", time.perf_counter() - inicio)
+            metricas.incrementar("last_access_flushed_total", len(filas))
+            return len(filas)
+
+    def _reintentar(self, pendientes: Dict[int, datetime]) -> None:
+        """Devuelve al buffer un lote fallido, sin pasar del máximo ni pisar fechas más recientes"""
+        with self._lock:
+            for usuario_id, fecha in pendientes.items():
+                actual = self._pendientes.get(usuario_id)
+                if actual is not None and actual >= fecha:
+                    continue
+                if actual is None and len(self._pendientes) >= self.maximo_pendientes:
+                    metricas.incrementar("last_access_dropped_total")
+                    continue
+                self._pendientes[usuario_id] = fecha
+
+    def iniciar(self, motor, intervalo: float) -> None:
+        """Empieza a escribir los accesos pendientes cada `intervalo` segundos en segundo plano"""
+        if intervalo <= 0:
+            return
+        self._motor = motor
+        self._detener = detener = threading.Event()
+
+        def volcar_periodicamente():
+            while not detener.wait(intervalo):
+                self.volcar()
+
+        self._hilo = threading.Thread(target=volcar_periodicamente, name="volcado-accesos", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        """Detiene el hilo y escribe lo que quede pendiente (al parar la aplicación)"""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join()
+        self._hilo = None
+        self.volcar()
+
+    def recolectar(self, registro) -> None:
+        """Recolector de métricas: usuarios pendientes de escribir"""
+        with self._lock:
+            registro.fijar("last_access_pending", len(self._pendientes))
+
+metricas.describir("last_access_pending", "gauge", "Fechas de último acceso pendientes de escribir")
+metricas.describir("last_access_flushed_total", "counter", "Fechas de último acceso escritas en lote")
+metricas.describir("last_access_flush_seconds", "histogram", "Duración de cada escritura en lote de fechas de último acceso")
+metricas.describir("last_access_flush_errors_total", "counter", "Escrituras en lote de fechas de último acceso fallidas")
+metricas.describir("last_access_dropped_total", "counter", "Fechas de último acceso descartadas tras un fallo con el buffer lleno")
+
+# Buffer compartido por todo el proceso
+buffer_accesos = BufferAccesos(LAST_ACCESS_MAX_PENDING)
+metricas.agregar_recolector(buffer_accesos.recolectar)
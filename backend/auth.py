@@ -1,17 +1,54 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from typing import Optional, Tuple
 from .database import obtener_db
 from .crud import ServicioSeguridad, ServicioUsuarios
-from . import models
+from .principales import cache_principales
+from . import schemas
 
 # Configurar el esquema de autenticación Bearer
 security = HTTPBearer()
 
-async def obtener_usuario_actual(
+def resolver_principal(token: str, db: Session) -> Optional[Tuple[schemas.UsuarioActual, bool]]:
+    """
+    Obtiene el usuario autenticado de un token y si está activo.
+    
+    Los tokens actuales llevan el ID y el rol firmados, así que normalmente el
+    estado del usuario sale de la caché de principales sin tocar la base de
+    datos. Los tokens antiguos (solo con email) se resuelven consultándola.
+    Devuelve None si el token no es válido o el usuario no existe.
+    """
+    payload = ServicioSeguridad.decodificar_token(token)
+    if payload is None:
+        return None
+    
+    email = payload["sub"]
+    usuario_id = payload.get("uid")
+    if usuario_id is None:
+        usuario = ServicioUsuarios.obtener_usuario_por_email(db, email=email)
+        if usuario is None:
+            return None
+        usuario_id = usuario.id
+        cache_principales.guardar(usuario.id, usuario.rol, bool(usuario.activo))
+    
+    if cache_principales.esta_revocado(usuario_id):
+        return schemas.UsuarioActual(id=usuario_id, email=email, rol=payload.get("rol", "cliente")), False
+    
+    estado = cache_principales.obtener(usuario_id)
+    if estado is None:
+        estado = ServicioUsuarios.obtener_estado_usuario(db, usuario_id)
+        if estado is None:
+            return None
+        cache_principales.guardar(usuario_id, *estado)
+    
+    rol, activo = estado
+    return schemas.UsuarioActual(id=usuario_id, email=email, rol=rol), activo
+
+def obtener_usuario_actual(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(obtener_db)
-) -> models.Usuario:
+) -> schemas.UsuarioActual:
     """
     Dependencia para obtener el usuario actual autenticado.
     """
@@ -22,18 +59,15 @@ async def obtener_usuario_actual(
     )
     
     try:
-        token = credentials.credentials
-        email = ServicioSeguridad.verificar_token(token)
-        if email is None:
-            raise credentials_exception
+        resultado = resolver_principal(credentials.credentials, db)
     except Exception:
         raise credentials_exception
     
-    usuario = ServicioUsuarios.obtener_usuario_por_email(db, email=email)
-    if usuario is None:
+    if resultado is None:
         raise credentials_exception
     
-    if not usuario.activo:
+    usuario, activo = resultado
+    if not activo:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Usuario inactivo"
@@ -42,8 +76,8 @@ async def obtener_usuario_actual(
     return usuario
 
 async def obtener_usuario_admin(
-    usuario_actual: models.Usuario = Depends(obtener_usuario_actual)
-) -> models.Usuario:
+    usuario_actual: schemas.UsuarioActual = Depends(obtener_usuario_actual)
+) -> schemas.UsuarioActual:
     """
     Dependencia para verificar que el usuario actual es administrador.
     """
@@ -54,10 +88,10 @@ async def obtener_usuario_admin(
         )
     return usuario_actual
 
-async def obtener_usuario_opcional(
+def obtener_usuario_opcional(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(obtener_db)
-) -> models.Usuario | None:
+) -> schemas.UsuarioActual | None:
     """
     Dependencia opcional para obtener el usuario si está autenticado.
     Devuelve None si no hay token válido.
@@ -66,13 +100,12 @@ async def obtener_usuario_opcional(
         if not credentials:
             return None
         
-        token = credentials.credentials
-        email = ServicioSeguridad.verificar_token(token)
-        if email is None:
+        resultado = resolver_principal(credentials.credentials, db)
+        if resultado is None:
             return None
         
-        usuario = ServicioUsuarios.obtener_usuario_por_email(db, email=email)
-        if usuario is None or not usuario.activo:
+        usuario, activo = resultado
+        if not activo:
             return None
         
         return usuario
@@ -0,0 +1,298 @@
+import logging
+import re
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence
+from sqlalchemy import bindparam, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from . import models
+from .proyeccion import cargar_solo, columnas_proyeccion
+
+logger = logging.getLogger("uvicorn.error")
+
+# Nombre de la tabla virtual FTS5 que indexa nombre y descripción de los artículos
+TABLA_FTS = "articulos_busqueda"
+
+# Sufijos de los triggers que mantienen el índice (ver _SQL_TRIGGERS)
+SUFIJOS_TRIGGERS = ("ai", "ad", "au")
+
+# Pesos de relevancia para bm25: una coincidencia en el nombre vale más que en la descripción
+PESO_NOMBRE = 10.0
+PESO_DESCRIPCION = 1.0
+
+# Tabla FTS5 de contenido externo: no duplica los textos, solo guarda el índice
+_SQL_CREAR_TABLA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+    nombre,
+    descripcion,
+    content='articulos_inventario',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+"""
+
+# Triggers que mantienen el índice sincronizado dentro de la misma transacción
+# que el INSERT/UPDATE/DELETE de ServicioInventario (o de cualquier otra escritura)
+_SQL_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON articulos_inventario BEGIN
+        INSERT INTO {TABLA_FTS}(rowid, nombre, descripcion)
+        VALUES (new.id, new.nombre, new.descripcion);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON articulos_inventario BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE OF nombre, descripcion ON articulos_inventario BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+        INSERT INTO {TABLA_FTS}(rowid, nombre, descripcion)
+        VALUES (new.id, new.nombre, new.descripcion);
+    END
+    """,
+]
+
+# Segundos durante los que se recuerda que el índice no existe antes de volver
+# a comprobarlo (lo crean la migración m0004 o reconstruir_busqueda.py)
+INTERVALO_COMPROBACION_FTS = 60
+
+# Estado del índice FTS5: True una vez encontrado (no vuelve a comprobarse);
+# si no, momento (time.monotonic) en que puede volver a comprobarse
+_fts_disponible = False
+_fts_comprobar_desde = 0.0
+
+class ServicioBusqueda:
+    """
+    Servicio de búsqueda de texto completo sobre el inventario.
+
+    En SQLite usa una tabla virtual FTS5 sobre `nombre` y `descripcion` con
+    resultados ordenados por relevancia (bm25). En otras bases de datos, o si
+    SQLite no incluye FTS5, recurre a una búsqueda ILIKE paginada.
+
+    El índice se crea con el engine principal (migración m0004,
+    reconstruir_busqueda.py o configurar_db.py); las búsquedas, que pueden ir
+    por conexiones de solo lectura, solo comprueban que existe.
+    """
+
+    @staticmethod
+    def crear_indice(engine: Engine) -> bool:
+        """
+        Crea la tabla FTS5 y sus triggers si no existen. Si la tabla es nueva,
+        la puebla con los artículos existentes.
+
+        Args:
+            engine: Engine de SQLAlchemy
+
+        Returns:
+            True si el índice de texto completo está disponible
+        """
+        if engine.dialect.name != "sqlite":
+            return False
+
+        try:
+            with engine.begin() as conexion:
+                existia = conexion.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+                    {"nombre": TABLA_FTS}
+                ).first() is not None
+                conexion.execute(text(_SQL_CREAR_TABLA))
+                for sql in _SQL_TRIGGERS:
+                    conexion.execute(text(sql))
+                if not existia:
+                    conexion.execute(text(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')"))
+        except OperationalError:
+            # SQLite compilado sin FTS5
+            return False
+
+        return True
+
+    @staticmethod
+    def indice_disponible(db: Session) -> bool:
+        """
+        Comprueba si existe el índice de texto completo con sus triggers, sin
+        intentar crearlo: sin triggers (una carga masiva interrumpida) el
+        índice no refleja los cambios y se busca con ILIKE. Una vez encontrado
+        se recuerda; si falta, se vuelve a mirar cada INTERVALO_COMPROBACION_FTS
+        segundos.
+
+        Args:
+            db: Sesión de base de datos (puede ser de solo lectura)
+
+        Returns:
+            True si se puede buscar con FTS5
+        """
+        global _fts_disponible, _fts_comprobar_desde
+        if _fts_disponible:
+            return True
+        if db.get_bind().dialect.name != "sqlite" or time.monotonic() < _fts_comprobar_desde:
+            return False
+
+        existe = ServicioBusqueda._objetos_indice(db) == 1 + len(SUFIJOS_TRIGGERS)
+        if existe:
+            _fts_disponible = True
+        else:
+            _fts_comprobar_desde = time.monotonic() + INTERVALO_COMPROBACION_FTS
+        return existe
+
+    @staticmethod
+    def reparar_indice(engine: Engine) -> bool:
+        """
+        Si existe el índice pero le falta algún trigger (una carga masiva que
+        no llegó a terminar, ver `carga_masiva`), lo reconstruye. Se llama al
+        arrancar la aplicación.
+
+        Args:
+            engine: Engine principal de SQLAlchemy
+
+        Returns:
+            True si el índice se ha reconstruido
+        """
+        if engine.dialect.name != "sqlite":
+            return False
+        with engine.connect() as conexion:
+            objetos = ServicioBusqueda._objetos_indice(conexion)
+        if objetos == 0 or objetos == 1 + len(SUFIJOS_TRIGGERS):
+            return False
+        logger.warning("Al índice de búsqueda le faltan triggers (carga masiva interrumpida): reconstruyéndolo")
+        ServicioBusqueda.reconstruir_indice(engine)
+        return True
+
+    @staticmethod
+    def _objetos_indice(conexion) -> int:
+        """Número de objetos del índice que existen: la tabla FTS5 y sus triggers"""
+        nombres = [TABLA_FTS] + [f"{TABLA_FTS}_{sufijo}" for sufijo in SUFIJOS_TRIGGERS]
+        return conexion.execute(
+            text("SELECT COUNT(*) FROM sqlite_master WHERE name IN :nombres")
+            .bindparams(bindparam("nombres", expanding=True)),
+            {"nombres": nombres}
+        ).scalar()
+
+    @staticmethod
+    def reconstruir_indice(engine: Engine) -> int:
+        """
+        Reconstruye desde cero el índice de texto completo a partir de la tabla
+        de artículos. Útil para bases de datos existentes o tras cargas masivas.
+
+        Args:
+            engine: Engine de SQLAlchemy
+
+        Returns:
+            Número de artículos indexados
+
+        Raises:
+            RuntimeError: Si la base de datos no soporta FTS5
+        """
+        if not ServicioBusqueda.crear_indice(engine):
+            raise RuntimeError("La base de datos no soporta búsqueda de texto completo (FTS5)")
+
+        with engine.begin() as conexion:
+            conexion.execute(text(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')"))
+            conexion.execute(text(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('optimize')"))
+            return conexion.execute(text("SELECT COUNT(*) FROM articulos_inventario")).scalar()
+
+    @staticmethod
+    @contextmanager
+    def carga_masiva(engine: Engine) -> Iterator[None]:
+        """
+        Suspende los triggers del índice durante una carga masiva de artículos
+        y lo reconstruye al terminar, que es bastante más rápido que indexar
+        fila a fila. Sin FTS5 no hace nada. Si el proceso muere durante la
+        carga, las búsquedas usan ILIKE (ver `indice_disponible`) hasta que el
+        siguiente arranque lo repara con `reparar_indice`.
+
+        Args:
+            engine: Engine de SQLAlchemy
+        """
+        if not ServicioBusqueda.crear_indice(engine):
+            yield
+            return
+
+        with engine.begin() as conexion:
+            for sufijo in SUFIJOS_TRIGGERS:
+                conexion.execute(text(f"DROP TRIGGER IF EXISTS {TABLA_FTS}_{sufijo}"))
+        try:
+            yield
+        finally:
+            # Vuelve a crear los triggers y reindexa todos los artículos
+            ServicioBusqueda.reconstruir_indice(engine)
+
+    @staticmethod
+    def construir_consulta_fts(termino: str) -> Optional[str]:
+        """
+        Convierte el texto introducido por el usuario en una consulta FTS5 segura.
+
+        Cada palabra se busca como prefijo y todas deben aparecer, de modo que
+        "teclado mec" encuentra "Teclado Mecánico". Los operadores de FTS5 del
+        texto original se descartan.
+
+        Args:
+            termino: Texto de búsqueda
+
+        Returns:
+            Consulta FTS5 o None si el texto no contiene palabras
+        """
+        palabras = re.findall(r"\w+", termino)
+        if not palabras:
+            return None
+        return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+    @staticmethod
+    def buscar_articulos(
+        db: Session,
+        termino: str,
+        saltar: int = 0,
+        limite: int = 100,
+        campos: Optional[Sequence[str]] = None
+    ) -> List[models.ArticuloInventario]:
+        """
+        Busca artículos por nombre y descripción, ordenados por relevancia.
+
+        Args:
+            db: Sesión de base de datos
+            termino: Texto a buscar
+            saltar: Número de resultados a saltar
+            limite: Límite máximo de resultados a devolver
+            campos: Si se indica, solo se leen estas columnas de los artículos
+
+        Returns:
+            Lista de artículos que coinciden con la búsqueda
+        """
+        if not ServicioBusqueda.indice_disponible(db):
+            patron = f"%{termino}%"
+            return cargar_solo(db.query(models.ArticuloInventario), models.ArticuloInventario, campos)\
+                     .filter(or_(models.ArticuloInventario.nombre.ilike(patron),
+                                 models.ArticuloInventario.descripcion.ilike(patron)))\
+                     .order_by(models.ArticuloInventario.nombre)\
+                     .offset(saltar)\
+                     .limit(limite)\
+                     .all()
+
+        consulta = ServicioBusqueda.construir_consulta_fts(termino)
+        if consulta is None:
+            return []
+
+        columnas = columnas_proyeccion(models.ArticuloInventario, campos)
+        seleccion = ", ".join(f"articulos_inventario.{columna}" for columna in columnas) if columnas else "articulos_inventario.*"
+        sentencia = text(
+            f"SELECT {seleccion} FROM {TABLA_FTS} "
+            f"JOIN articulos_inventario ON articulos_inventario.id = {TABLA_FTS}.rowid "
+            f"WHERE {TABLA_FTS} MATCH :consulta "
+            f"ORDER BY bm25({TABLA_FTS}, :peso_nombre, :peso_descripcion), articulos_inventario.id "
+            f"LIMIT :limite OFFSET :saltar"
+        )
+        return db.query(models.ArticuloInventario)\
+                 .from_statement(sentencia)\
+                 .params(
+                     consulta=consulta,
+                     peso_nombre=PESO_NOMBRE,
+                     peso_descripcion=PESO_DESCRIPCION,
+                     limite=limite,
+                     saltar=saltar
+                 )\
+                 .all()
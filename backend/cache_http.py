@@ -0,0 +1,59 @@
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+# Segundos que una caché compartida (nginx) puede servir el catálogo sin
+# preguntar a la API. Los navegadores siempre revalidan (max-age=0)
+CATALOG_CACHE_SECONDS = int(os.getenv("CATALOG_CACHE_SECONDS", "5"))
+
+def cabeceras_catalogo(version: Optional[int]) -> Dict[str, str]:
+    """
+    Cabeceras de caché de las respuestas del catálogo para una versión dada
+    (ver `ServicioEstadisticas.obtener_version_catalogo`). Sin versión no se
+    añade ninguna y las respuestas no se pueden revalidar.
+    """
+    if version is None:
+        return {}
+    ultima_modificacion = datetime.fromtimestamp(version / 1_000_000, tz=timezone.utc)
+    return {
+        "ETag": f'W/"{version}"',
+        "Last-Modified": format_datetime(ultima_modificacion, usegmt=True),
+        "Cache-Control": f"public, max-age=0, s-maxage={CATALOG_CACHE_SECONDS}",
+    }
+
+def respuesta_no_modificada(request: Request, cabeceras: Dict[str, str]) -> Optional[Response]:
+    """
+    Devuelve una respuesta 304 si la copia del cliente sigue siendo válida
+    según If-None-Match o, si no la envía, If-Modified-Since. Devuelve None
+    si hay que generar la respuesta completa. El ETag es el validador exacto;
+    If-Modified-Since solo permite un 304 cuando el cambio es de un segundo
+    anterior a la fecha del cliente.
+    """
+    if not cabeceras:
+        return None
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Comparación débil: W/"v" y "v" identifican la misma versión
+        etiquetas = {etiqueta.strip().removeprefix("W/") for etiqueta in if_none_match.split(",")}
+        if "*" in etiquetas or cabeceras["ETag"].removeprefix("W/") in etiquetas:
+            return Response(status_code=304, headers=cabeceras)
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            fecha_cliente = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if fecha_cliente.tzinfo is None:
+            fecha_cliente = fecha_cliente.replace(tzinfo=timezone.utc)
+        # Last-Modified tiene resolución de segundos y la versión de
+        # microsegundos: si el cliente tiene el mismo segundo, el catálogo pudo
+        # cambiar después dentro de ese segundo, así que solo es válida si el
+        # último cambio es de un segundo anterior a su fecha
+        if parsedate_to_datetime(cabeceras["Last-Modified"]) < fecha_cliente:
+            return Response(status_code=304, headers=cabeceras)
+    return None
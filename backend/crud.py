@@ -1,17 +1,70 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import bindparam, desc, select, tuple_, type_coerce, String
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
+from functools import lru_cache
+import base64
+import binascii
+import json
+import time
 from . import models, schemas
+from .estadisticas import ServicioEstadisticas, TOTAL_PEDIDOS, TOTAL_USUARIOS
+from .hashing import pool_hashing, PoolHashingSaturado
+from .idempotencia import ServicioIdempotencia, Reserva, ReservaPerdida
+from .accesos import buffer_accesos
+from .eventos import hub_eventos
+from .metricas import metricas
+from .principales import cache_principales
+from .proyeccion import cargar_solo
 
 # Configuración de seguridad
 SECRET_KEY = "tu_clave_secreta_muy_segura_cambiar_en_produccion"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def obtener_pwd_context():
+    """
+    Crea el contexto de passlib la primera vez que se necesita. passlib y jose
+    se importan bajo demanda para no retrasar el arranque de cada worker.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def _ejecutar_bcrypt(operacion: str, funcion, *args):
+    """
+    Ejecuta una operación de bcrypt en el pool de hashing y registra en las
+    métricas su resultado y su duración (incluida la espera en la cola).
+    """
+    inicio = time.perf_counter()
+    try:
+        resultado = pool_hashing.ejecutar(funcion, *args)
+    except PoolHashingSaturado:
+        metricas.incrementar("bcrypt_operations_total", operation=operacion, result="saturado")
+        raise
+    except Exception:
+        metricas.incrementar("bcrypt_operations_total", operation=operacion, result="error")
+        raise
+    metricas.observar("bcrypt_duration_seconds", time.perf_counter() - inicio, operation=operacion)
+    metricas.incrementar("bcrypt_operations_total", operation=operacion, result="ok")
+    return resultado
+
+def _codificar_cursor(fecha_creacion: str, articulo_id: int) -> str:
+    """Codifica la posición (fecha_creacion, id) en un cursor opaco"""
+    contenido = json.dumps([fecha_creacion, articulo_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(contenido.encode()).decode().rstrip("=")
+
+def _decodificar_cursor(cursor: str) -> Tuple[str, int]:
+    """Decodifica un cursor opaco. Lanza ValueError si no es válido"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        fecha_creacion, articulo_id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(fecha_creacion, str) or not isinstance(articulo_id, int):
+            raise ValueError
+        return fecha_creacion, articulo_id
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Cursor de paginación no válido")
 
 class ServicioSeguridad:
     """
@@ -20,17 +73,25 @@ class ServicioSeguridad:
     
     @staticmethod
     def verificar_password(password_plano: str, password_hash: str) -> bool:
-        """Verifica si una contraseña coincide con su hash"""
-        return pwd_context.verify(password_plano, password_hash)
+        """
+        Verifica si una contraseña coincide con su hash.
+        Se ejecuta en el pool de hashing; lanza PoolHashingSaturado si está lleno.
+        """
+        return _ejecutar_bcrypt("verify", obtener_pwd_context().verify, password_plano, password_hash)
     
     @staticmethod
     def obtener_password_hash(password: str) -> str:
-        """Obtiene el hash de una contraseña"""
-        return pwd_context.hash(password)
+        """
+        Obtiene el hash de una contraseña.
+        Se ejecuta en el pool de hashing; lanza PoolHashingSaturado si está lleno.
+        """
+        return _ejecutar_bcrypt("hash", obtener_pwd_context().hash, password)
     
     @staticmethod
     def crear_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         """Crea un token de acceso JWT"""
+        from jose import jwt
+        
         to_encode = data.copy()
         if expires_delta:
             expire = datetime.utcnow() + expires_delta
@@ -40,9 +101,35 @@ class ServicioSeguridad:
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
     
+    @staticmethod
+    def crear_token_usuario(usuario: models.Usuario, expires_delta: Optional[timedelta] = None) -> str:
+        """
+        Crea el token de acceso de un usuario. Además del email incluye el ID
+        y el rol firmados, para autenticar las peticiones sin consultar la base de datos.
+        """
+        return ServicioSeguridad.crear_access_token(
+            data={"sub": usuario.email, "uid": usuario.id, "rol": usuario.rol},
+            expires_delta=expires_delta
+        )
+    
+    @staticmethod
+    def decodificar_token(token: str) -> Optional[dict]:
+        """Verifica un token JWT y devuelve su contenido, o None si no es válido"""
+        from jose import JWTError, jwt
+        
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            if payload.get("sub") is None:
+                return None
+            return payload
+        except JWTError:
+            return None
+    
     @staticmethod
     def verificar_token(token: str) -> Optional[str]:
         """Verifica un token JWT y devuelve el email del usuario"""
+        from jose import JWTError, jwt
+        
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             email: str = payload.get("sub")
@@ -72,7 +159,29 @@ class ServicioInventario:
         return db.query(models.ArticuloInventario).filter(models.ArticuloInventario.id == articulo_id).first()
     
     @staticmethod
-    def obtener_articulos(db: Session, saltar: int = 0, limite: int = 100) -> List[models.ArticuloInventario]:
+    def obtener_articulos_por_ids(db: Session, ids: List[int]) -> Dict[int, models.ArticuloInventario]:
+        """
+        Obtiene varios artículos por ID con una sola consulta IN.
+        
+        Args:
+            db: Sesión de base de datos
+            ids: IDs de los artículos a buscar
+            
+        Returns:
+            Diccionario ID -> artículo con los artículos que existen
+        """
+        articulos = db.query(models.ArticuloInventario)\
+                      .filter(models.ArticuloInventario.id.in_(ids))\
+                      .all()
+        return {articulo.id: articulo for articulo in articulos}
+    
+    @staticmethod
+    def obtener_articulos(
+        db: Session,
+        saltar: int = 0,
+        limite: int = 100,
+        campos: Optional[Sequence[str]] = None
+    ) -> List[models.ArticuloInventario]:
         """
         Obtiene una lista de artículos con paginación.
         
@@ -80,32 +189,77 @@ class ServicioInventario:
             db: Sesión de base de datos
             saltar: Número de registros a saltar
             limite: Límite máximo de registros a devolver
+            campos: Si se indica, solo se leen estas columnas (ver `cargar_solo`)
             
         Returns:
             Lista de artículos
         """
-        return db.query(models.ArticuloInventario)\
+        return cargar_solo(db.query(models.ArticuloInventario), models.ArticuloInventario, campos)\
                  .order_by(desc(models.ArticuloInventario.fecha_creacion))\
                  .offset(saltar)\
                  .limit(limite)\
                  .all()
     
     @staticmethod
-    def buscar_articulos_por_nombre(db: Session, nombre: str) -> List[models.ArticuloInventario]:
+    def obtener_articulos_cursor(
+        db: Session,
+        cursor: Optional[str] = None,
+        limite: int = 100,
+        campos: Optional[Sequence[str]] = None
+    ) -> Tuple[List[models.ArticuloInventario], Optional[str]]:
         """
-        Busca artículos por nombre (búsqueda parcial).
+        Obtiene una página de artículos usando paginación por cursor (keyset).
+        
+        A diferencia de `obtener_articulos`, no descarta filas anteriores: la
+        consulta arranca directamente en la posición del cursor usando el índice
+        (fecha_creacion, id), por lo que cualquier página cuesta lo mismo que la primera.
         
         Args:
             db: Sesión de base de datos
-            nombre: Nombre o parte del nombre a buscar
+            cursor: Cursor devuelto por la página anterior (None para la primera página)
+            limite: Límite máximo de registros a devolver
+            campos: Si se indica, solo se leen estas columnas (ver `cargar_solo`)
             
         Returns:
-            Lista de artículos que coinciden con la búsqueda
+            Tupla con la lista de artículos y el cursor de la siguiente página
+            (None si no hay más artículos)
+            
+        Raises:
+            ValueError: Si el cursor no es válido
         """
-        return db.query(models.ArticuloInventario)\
-                 .filter(models.ArticuloInventario.nombre.ilike(f"%{nombre}%"))\
-                 .order_by(models.ArticuloInventario.nombre)\
-                 .all()
+        fecha_orden = models.ArticuloInventario.fecha_creacion
+        if db.bind.dialect.name == "sqlite":
+            # SQLite guarda DATETIME como texto y CURRENT_TIMESTAMP no incluye
+            # microsegundos, así que se compara contra el texto almacenado tal cual
+            fecha_orden = type_coerce(fecha_orden, String)
+        
+        query = cargar_solo(
+            db.query(models.ArticuloInventario, fecha_orden.label("fecha_cursor")),
+            models.ArticuloInventario,
+            campos
+        )
+        if cursor:
+            fecha_creacion, articulo_id = _decodificar_cursor(cursor)
+            valor_fecha = fecha_creacion
+            if db.bind.dialect.name != "sqlite":
+                valor_fecha = datetime.fromisoformat(fecha_creacion)
+            query = query.filter(
+                tuple_(fecha_orden, models.ArticuloInventario.id) < tuple_(valor_fecha, articulo_id)
+            )
+        
+        filas = query.order_by(desc(fecha_orden), desc(models.ArticuloInventario.id))\
+                     .limit(limite + 1)\
+                     .all()
+        
+        siguiente_cursor = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            ultimo, fecha_ultimo = filas[-1]
+            if not isinstance(fecha_ultimo, str):
+                fecha_ultimo = fecha_ultimo.isoformat()
+            siguiente_cursor = _codificar_cursor(fecha_ultimo, ultimo.id)
+        
+        return [articulo for articulo, _ in filas], siguiente_cursor
     
     @staticmethod
     def crear_articulo(db: Session, articulo: schemas.ArticuloInventarioCrear) -> models.ArticuloInventario:
@@ -121,8 +275,13 @@ class ServicioInventario:
         """
         db_articulo = models.ArticuloInventario(**articulo.model_dump())
         db.add(db_articulo)
+        ServicioEstadisticas.aplicar_deltas(
+            db, ServicioEstadisticas.deltas_articulo(articulo.cantidad, articulo.precio)
+        )
+        ServicioEstadisticas.marcar_cambio_catalogo(db)
         db.commit()
         db.refresh(db_articulo)
+        hub_eventos.publicar_articulo(db_articulo.id, db_articulo.cantidad, db_articulo.precio)
         return db_articulo
     
     @staticmethod
@@ -144,13 +303,23 @@ class ServicioInventario:
         """
         db_articulo = ServicioInventario.obtener_articulo(db, articulo_id)
         if db_articulo:
+            cantidad_anterior, precio_anterior = db_articulo.cantidad, db_articulo.precio
+            
             # Solo actualizar campos que no sean None
             datos_actualizacion = articulo_actualizado.model_dump(exclude_unset=True)
             for campo, valor in datos_actualizacion.items():
                 setattr(db_articulo, campo, valor)
             
+            ServicioEstadisticas.aplicar_deltas(
+                db,
+                ServicioEstadisticas.deltas_cambio_articulo(
+                    cantidad_anterior, precio_anterior, db_articulo.cantidad, db_articulo.precio
+                )
+            )
+            ServicioEstadisticas.marcar_cambio_catalogo(db)
             db.commit()
             db.refresh(db_articulo)
+            hub_eventos.publicar_articulo(db_articulo.id, db_articulo.cantidad, db_articulo.precio)
         return db_articulo
     
     @staticmethod
@@ -168,7 +337,12 @@ class ServicioInventario:
         db_articulo = ServicioInventario.obtener_articulo(db, articulo_id)
         if db_articulo:
             db.delete(db_articulo)
+            ServicioEstadisticas.aplicar_deltas(
+                db, ServicioEstadisticas.deltas_articulo(db_articulo.cantidad, db_articulo.precio, signo=-1)
+            )
+            ServicioEstadisticas.marcar_cambio_catalogo(db)
             db.commit()
+            hub_eventos.publicar_articulo(articulo_id, 0, db_articulo.precio, eliminado=True)
             return True
         return False
     
@@ -218,6 +392,33 @@ class ServicioUsuarios:
         """Obtiene un usuario por su ID"""
         return db.query(models.Usuario).filter(models.Usuario.id == usuario_id).first()
     
+    @staticmethod
+    def obtener_estado_usuario(db: Session, usuario_id: int) -> Optional[Tuple[str, bool]]:
+        """Obtiene solo el rol y si está activo un usuario, o None si no existe"""
+        fila = db.query(models.Usuario.rol, models.Usuario.activo)\
+                 .filter(models.Usuario.id == usuario_id)\
+                 .first()
+        if fila is None:
+            return None
+        return fila.rol, bool(fila.activo)
+    
+    @staticmethod
+    def actualizar_activo(db: Session, usuario_id: int, activo: bool) -> Optional[models.Usuario]:
+        """
+        Activa o desactiva un usuario. La desactivación se aplica al instante en
+        este proceso y, como máximo tras el TTL de la caché de principales, en el resto.
+        """
+        usuario = ServicioUsuarios.obtener_usuario_por_id(db, usuario_id)
+        if usuario:
+            usuario.activo = activo
+            db.commit()
+            db.refresh(usuario)
+            if activo:
+                cache_principales.restaurar(usuario_id)
+            else:
+                cache_principales.revocar(usuario_id)
+        return usuario
+    
     @staticmethod
     def crear_usuario(db: Session, usuario: schemas.UsuarioCrear) -> models.Usuario:
         """Crea un nuevo usuario"""
@@ -230,6 +431,7 @@ class ServicioUsuarios:
             rol=usuario.rol
         )
         db.add(db_usuario)
+        ServicioEstadisticas.aplicar_deltas(db, {TOTAL_USUARIOS: 1})
         db.commit()
         db.refresh(db_usuario)
         return db_usuario
@@ -243,16 +445,26 @@ class ServicioUsuarios:
         if not ServicioSeguridad.verificar_password(password, usuario.password_hash):
             return None
         
-        # Actualizar fecha de último acceso
-        usuario.fecha_ultimo_acceso = datetime.utcnow()
-        db.commit()
+        # Actualizar fecha de último acceso: se escribe en lote en segundo plano
+        # (ver BufferAccesos); el objeto ya la lleva para la respuesta del login
+        ahora = datetime.utcnow()
+        if buffer_accesos.registrar(usuario.id, ahora):
+            set_committed_value(usuario, "fecha_ultimo_acceso", ahora)
+        else:
+            usuario.fecha_ultimo_acceso = ahora
+            db.commit()
         
         return usuario
     
     @staticmethod
-    def obtener_usuarios(db: Session, saltar: int = 0, limite: int = 100) -> List[models.Usuario]:
-        """Obtiene lista de usuarios con paginación"""
-        return db.query(models.Usuario)\
+    def obtener_usuarios(
+        db: Session,
+        saltar: int = 0,
+        limite: int = 100,
+        campos: Optional[Sequence[str]] = None
+    ) -> List[models.Usuario]:
+        """Obtiene lista de usuarios con paginación (solo las columnas de `campos`, si se indican)"""
+        return cargar_solo(db.query(models.Usuario), models.Usuario, campos)\
                  .order_by(desc(models.Usuario.fecha_creacion))\
                  .offset(saltar)\
                  .limit(limite)\
@@ -264,29 +476,58 @@ class ServicioPedidos:
     """
     
     @staticmethod
-    def crear_pedido(db: Session, pedido: schemas.PedidoCrear, usuario_id: int) -> models.Pedido:
-        """Crea un nuevo pedido y actualiza el stock"""
-        # Verificar stock disponible para todos los items
-        total = 0
-        items_verificados = []
+    def crear_pedido(
+        db: Session,
+        pedido: schemas.PedidoCrear,
+        usuario_id: int,
+        reserva_idempotencia: Optional[Reserva] = None
+    ) -> models.Pedido:
+        """
+        Crea un nuevo pedido y actualiza el stock.
+        
+        El stock se descuenta con UPDATE condicionales (`cantidad >= :n`) antes
+        de leer los artículos, de modo que la comprobación y el descuento son una
+        sola operación atómica: dos pedidos simultáneos nunca pueden dejar el
+        stock en negativo. Todo el pedido usa un número fijo de sentencias,
+        independiente del número de items.
         
+        Con `reserva_idempotencia` (de ServicioIdempotencia.reservar), la clave
+        se marca como completada en la misma transacción que el pedido. Si otra
+        petición tomó la reserva, se deshace todo y se lanza ReservaPerdida.
+        """
+        # Agrupar items repetidos del mismo artículo
+        cantidades: Dict[int, int] = {}
         for item in pedido.items:
-            articulo = ServicioInventario.obtener_articulo(db, item.articulo_id)
-            if not articulo:
-                raise ValueError(f"Artículo con ID {item.articulo_id} no encontrado")
-            
-            if articulo.cantidad < item.cantidad:
-                raise ValueError(f"Stock insuficiente para {articulo.nombre}. Disponible: {articulo.cantidad}, Solicitado: {item.cantidad}")
-            
-            subtotal = articulo.precio * item.cantidad
-            total += subtotal
-            
-            items_verificados.append({
-                'articulo': articulo,
-                'cantidad': item.cantidad,
-                'precio_unitario': articulo.precio,
-                'subtotal': subtotal
-            })
+            cantidades[item.articulo_id] = cantidades.get(item.articulo_id, 0) + item.cantidad
+        
+        # Descontar stock solo donde alcanza
+        tabla_articulos = models.ArticuloInventario.__table__
+        descuento = tabla_articulos.update()\
+            .where(tabla_articulos.c.id == bindparam("p_articulo_id"))\
+            .where(tabla_articulos.c.cantidad >= bindparam("p_cantidad"))\
+            .values(cantidad=tabla_articulos.c.cantidad - bindparam("p_cantidad"))
+        parametros = [
+            {"p_articulo_id": articulo_id, "p_cantidad": cantidad}
+            for articulo_id, cantidad in cantidades.items()
+        ]
+        if db.get_bind().dialect.supports_sane_multi_rowcount:
+            actualizados = db.execute(descuento, parametros).rowcount
+        else:
+            actualizados = sum(db.execute(descuento, fila).rowcount for fila in parametros)
+        
+        if actualizados != len(cantidades):
+            db.rollback()
+            ServicioPedidos._verificar_stock(db, cantidades)
+            raise ValueError("Stock insuficiente para completar el pedido")
+        
+        # Leer los artículos ya descontados (dentro de la misma transacción)
+        articulos = db.query(
+            models.ArticuloInventario.id,
+            models.ArticuloInventario.precio,
+            models.ArticuloInventario.cantidad
+        ).filter(models.ArticuloInventario.id.in_(list(cantidades))).all()
+        
+        total = sum(articulo.precio * cantidades[articulo.id] for articulo in articulos)
         
         # Crear el pedido
         db_pedido = models.Pedido(
@@ -298,33 +539,82 @@ class ServicioPedidos:
         db.add(db_pedido)
         db.flush()  # Para obtener el ID del pedido
         
-        # Agregar items al pedido y actualizar stock
-        for item_data in items_verificados:
-            articulo = item_data['articulo']
-            cantidad = item_data['cantidad']
-            precio_unitario = item_data['precio_unitario']
-            
-            # Actualizar stock del artículo
-            articulo.cantidad -= cantidad
-            
-            # Agregar relación en la tabla intermedia
-            db.execute(
-                models.pedido_articulos.insert().values(
-                    pedido_id=db_pedido.id,
-                    articulo_id=articulo.id,
-                    cantidad=cantidad,
-                    precio_unitario=precio_unitario
-                )
+        # Agregar todos los items al pedido con una sola sentencia
+        db.execute(
+            models.pedido_articulos.insert(),
+            [
+                {
+                    "pedido_id": db_pedido.id,
+                    "articulo_id": articulo.id,
+                    "cantidad": cantidades[articulo.id],
+                    "precio_unitario": articulo.precio
+                }
+                for articulo in articulos
+            ]
+        )
+        
+        deltas_estadisticas = {TOTAL_PEDIDOS: 1}
+        for articulo in articulos:
+            deltas = ServicioEstadisticas.deltas_cambio_articulo(
+                articulo.cantidad + cantidades[articulo.id], articulo.precio, articulo.cantidad, articulo.precio
             )
+            for clave, delta in deltas.items():
+                deltas_estadisticas[clave] = deltas_estadisticas.get(clave, 0) + delta
         
+        ServicioEstadisticas.aplicar_deltas(db, deltas_estadisticas)
+        # El stock de los artículos ha cambiado
+        ServicioEstadisticas.marcar_cambio_catalogo(db)
+        if reserva_idempotencia is not None:
+            try:
+                ServicioIdempotencia.asociar_pedido(db, reserva_idempotencia, db_pedido.id, 201)
+            except ReservaPerdida:
+                db.rollback()
+                raise
         db.commit()
+        for articulo in articulos:
+            hub_eventos.publicar_articulo(articulo.id, articulo.cantidad, articulo.precio)
         db.refresh(db_pedido)
         return db_pedido
     
     @staticmethod
-    def obtener_pedidos_usuario(db: Session, usuario_id: int) -> List[models.Pedido]:
-        """Obtiene todos los pedidos de un usuario"""
-        return db.query(models.Pedido)\
+    def _verificar_stock(db: Session, cantidades: Dict[int, int]) -> None:
+        """
+        Explica por qué no se pudo descontar el stock de un pedido.
+        Lanza ValueError con el primer artículo inexistente o sin stock suficiente.
+        """
+        articulos = {
+            articulo.id: articulo
+            for articulo in db.query(models.ArticuloInventario)
+                              .filter(models.ArticuloInventario.id.in_(list(cantidades)))
+        }
+        for articulo_id, cantidad in cantidades.items():
+            articulo = articulos.get(articulo_id)
+            if not articulo:
+                raise ValueError(f"Artículo con ID {articulo_id} no encontrado")
+            if articulo.cantidad < cantidad:
+                raise ValueError(f"Stock insuficiente para {articulo.nombre}. Disponible: {articulo.cantidad}, Solicitado: {cantidad}")
+    
+    @staticmethod
+    def _consulta_pedidos(db: Session, campos: Optional[Sequence[str]] = None):
+        """
+        Consulta de pedidos con el usuario precargado. Con `campos`, solo lee
+        esas columnas y solo une la tabla de usuarios si se pide `usuario_email`.
+        """
+        if campos is None:
+            return db.query(models.Pedido).options(joinedload(models.Pedido.usuario))
+        query = cargar_solo(db.query(models.Pedido), models.Pedido, campos)
+        if "usuario_email" in campos:
+            query = query.options(joinedload(models.Pedido.usuario).load_only(models.Usuario.email))
+        return query
+    
+    @staticmethod
+    def obtener_pedidos_usuario(
+        db: Session,
+        usuario_id: int,
+        campos: Optional[Sequence[str]] = None
+    ) -> List[models.Pedido]:
+        """Obtiene todos los pedidos de un usuario (ver `_consulta_pedidos` para `campos`)"""
+        return ServicioPedidos._consulta_pedidos(db, campos)\
                  .filter(models.Pedido.usuario_id == usuario_id)\
                  .order_by(desc(models.Pedido.fecha_pedido))\
                  .all()
@@ -332,12 +622,20 @@ class ServicioPedidos:
     @staticmethod
     def obtener_pedido_por_id(db: Session, pedido_id: int) -> Optional[models.Pedido]:
         """Obtiene un pedido por su ID"""
-        return db.query(models.Pedido).filter(models.Pedido.id == pedido_id).first()
+        return db.query(models.Pedido)\
+                 .options(joinedload(models.Pedido.usuario))\
+                 .filter(models.Pedido.id == pedido_id)\
+                 .first()
     
     @staticmethod
-    def obtener_todos_pedidos(db: Session, saltar: int = 0, limite: int = 100) -> List[models.Pedido]:
-        """Obtiene todos los pedidos (solo para admins)"""
-        return db.query(models.Pedido)\
+    def obtener_todos_pedidos(
+        db: Session,
+        saltar: int = 0,
+        limite: int = 100,
+        campos: Optional[Sequence[str]] = None
+    ) -> List[models.Pedido]:
+        """Obtiene todos los pedidos (solo para admins; ver `_consulta_pedidos` para `campos`)"""
+        return ServicioPedidos._consulta_pedidos(db, campos)\
                  .order_by(desc(models.Pedido.fecha_pedido))\
                  .offset(saltar)\
                  .limit(limite)\
@@ -353,3 +651,41 @@ class ServicioPedidos:
             db.commit()
             db.refresh(pedido)
         return pedido
+    
+    @staticmethod
+    def obtener_items_pedidos(db: Session, pedido_ids: List[int]) -> Dict[int, List[schemas.PedidoItem]]:
+        """
+        Obtiene los items de varios pedidos con una sola consulta.
+        
+        Args:
+            db: Sesión de base de datos
+            pedido_ids: IDs de los pedidos
+            
+        Returns:
+            Diccionario {pedido_id: lista de items} (listas vacías para pedidos sin items)
+        """
+        items_por_pedido: Dict[int, List[schemas.PedidoItem]] = {pedido_id: [] for pedido_id in pedido_ids}
+        if not pedido_ids:
+            return items_por_pedido
+        
+        filas = db.execute(
+            select(
+                models.pedido_articulos.c.pedido_id,
+                models.pedido_articulos.c.articulo_id,
+                models.pedido_articulos.c.cantidad,
+                models.pedido_articulos.c.precio_unitario,
+                models.ArticuloInventario.nombre
+            )
+            .join(models.ArticuloInventario, models.pedido_articulos.c.articulo_id == models.ArticuloInventario.id)
+            .where(models.pedido_articulos.c.pedido_id.in_(pedido_ids))
+        ).all()
+        
+        for pedido_id, articulo_id, cantidad, precio_unitario, nombre in filas:
+            items_por_pedido[pedido_id].append(schemas.PedidoItem(
+                articulo_id=articulo_id,
+                nombre_articulo=nombre,
+                cantidad=cantidad,
+                precio_unitario=precio_unitario,
+                subtotal=cantidad * precio_unitario
+            ))
+        return items_por_pedido
@@ -1,37 +1,240 @@
+import logging
 import os
-from sqlalchemy import create_engine
+import time
+from pathlib import Path
+from typing import Any, Dict
+from urllib.parse import quote
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as TimeoutPool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from .metricas import metricas
+from .instrumentacion import instrumentar_motor
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Los mensajes de arranque salen junto a los de uvicorn
+logger = logging.getLogger("uvicorn.error")
+
 # URL de la base de datos
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./inventario.db")
 
-# Configuración especial para SQLite para resolver problemas de threading
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
+# Hilos disponibles para ejecutar las rutas síncronas que acceden a la base de datos
+TAMANO_THREADPOOL_DB = int(os.getenv("DB_THREADPOOL_SIZE", "40"))
+
+# Pool de conexiones: conexiones permanentes, extra bajo picos, espera máxima
+# por una conexión libre y renovación periódica (en segundos)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+
+# Perfil del motor SQLite:
+# - "produccion": WAL (los lectores no esperan a los escritores) y pragmas de rendimiento
+# - "compatible": journal clásico de SQLite, solo con el timeout de bloqueo
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "produccion")
+
+# Pragmas del perfil de producción
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "20000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# URL de la réplica de lectura. En SQLite, si no se indica, las lecturas usan
+# un pool aparte de conexiones de solo lectura (mode=ro) al mismo archivo
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# Segundos durante los que un cliente que acaba de escribir lee de la base de
+# datos principal, por si la réplica aún no tiene sus cambios
+DB_READ_YOUR_WRITES_SECONDS = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+
+# Cookie y cabecera para leer de la base de datos principal
+COOKIE_LEER_PRIMARIA = "leer_primaria"
+CABECERA_LEER_PRIMARIA = "x-leer-primaria"
+
+ES_SQLITE = DATABASE_URL.startswith("sqlite")
+
+if ES_SQLITE and SQLITE_PROFILE not in ("produccion", "compatible"):
+    raise ValueError(f"SQLITE_PROFILE no válido: '{SQLITE_PROFILE}' (usa 'produccion' o 'compatible')")
+
+def es_sqlite_memoria(url: str) -> bool:
+    """Indica si la URL es una base de datos SQLite en memoria"""
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+def pragmas_sqlite(memoria: bool = False, solo_lectura: bool = False) -> Dict[str, Any]:
+    """Pragmas que se aplican a cada conexión SQLite nueva según el perfil"""
+    pragmas: Dict[str, Any] = {"busy_timeout": SQLITE_BUSY_TIMEOUT_MS}
+    if SQLITE_PROFILE == "produccion":
+        # El modo WAL queda guardado en el archivo: lo activan las conexiones de escritura
+        if not memoria and not solo_lectura:
+            pragmas["journal_mode"] = "WAL"
+        pragmas.update({
+            "synchronous": SQLITE_SYNCHRONOUS,
+            "cache_size": -SQLITE_CACHE_SIZE_KB,  # Negativo: tamaño en KiB en lugar de páginas
+            "mmap_size": SQLITE_MMAP_SIZE,
+            "temp_store": "MEMORY",
+        })
+    return pragmas
+
+class PoolMedido(QueuePool):
+    """
+    QueuePool que registra en las métricas cuánto esperan las peticiones por
+    una conexión libre y cuántas agotan el timeout.
+    """
+
+    nombre_metricas = "principal"
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except TimeoutPool:
+            metricas.incrementar("db_pool_timeouts_total", engine=self.nombre_metricas)
+            raise
+        metricas.observar("db_pool_checkout_wait_seconds", time.perf_counter() - inicio, engine=self.nombre_metricas)
+        return conexion
+
+    def recreate(self):
+        # engine.dispose() sustituye el pool por uno nuevo: conservar el nombre
+        pool = super().recreate()
+        pool.nombre_metricas = self.nombre_metricas
+        return pool
+
+def medir_pool(motor, nombre: str):
+    """Registra los checkouts y el estado del pool de un engine en las métricas"""
+    motor.pool.nombre_metricas = nombre
+
+    @event.listens_for(motor, "checkout")
+    def contar_checkout(*_):
+        metricas.incrementar("db_pool_checkouts_total", engine=nombre)
+
+    def recolectar(registro):
+        pool = motor.pool
+        if isinstance(pool, QueuePool):
+            registro.fijar("db_pool_size", pool.size(), engine=nombre)
+            registro.fijar("db_pool_checked_out", pool.checkedout(), engine=nombre)
+            registro.fijar("db_pool_overflow", max(pool.overflow(), 0), engine=nombre)
+
+    metricas.agregar_recolector(recolectar)
+
+def crear_motor(url: str, solo_lectura: bool = False):
+    """
+    Crea un engine con la configuración de pool y, en SQLite, los pragmas del perfil.
+    """
+    if not url.startswith("sqlite"):
+        # Para otras bases de datos (PostgreSQL, MySQL, etc.)
+        return create_engine(
+            url,
+            poolclass=PoolMedido,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+        )
+
+    # Configuración especial para SQLite para resolver problemas de threading.
+    # SQLAlchemy no reutiliza conexiones a archivos SQLite por defecto; con un
+    # pool los pragmas se aplican una vez por conexión y no en cada petición
+    memoria = es_sqlite_memoria(url)
+    opciones_pool = {} if memoria else {
+        "poolclass": PoolMedido,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    motor = create_engine(
+        url,
         connect_args={
             "check_same_thread": False,  # Permitir acceso desde múltiples threads
-            "timeout": 20  # Timeout de 20 segundos para evitar bloqueos
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000  # Esperar al bloqueo en lugar de fallar
         },
         echo=False,  # Cambiar a True para debug SQL
-        pool_pre_ping=True,  # Verificar conexiones antes de usar
-        pool_recycle=300  # Renovar conexiones cada 5 minutos
+        # Un archivo local no pierde conexiones: sin ping en cada checkout
+        pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "false").lower() == "true",
+        **opciones_pool
     )
+    pragmas = pragmas_sqlite(memoria, solo_lectura)
+
+    @event.listens_for(motor, "connect")
+    def aplicar_pragmas(conexion_dbapi, _registro):
+        """Aplica los pragmas del perfil al abrir cada conexión del pool"""
+        cursor = conexion_dbapi.cursor()
+        for nombre, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nombre}={valor}")
+        cursor.close()
+
+    return motor
+
+def url_solo_lectura_sqlite(url: str) -> str:
+    """Convierte la URL de un archivo SQLite en una URI de solo lectura (mode=ro)"""
+    ruta = Path(make_url(url).database).resolve()
+    return f"sqlite:///file:{quote(ruta.as_posix())}?mode=ro&uri=true"
+
+# Engine principal: escrituras y lecturas que necesitan los datos más recientes
+engine = crear_motor(DATABASE_URL)
+
+# Engine de lectura: réplica configurada, conexiones de solo lectura al archivo
+# SQLite o, si no hay ninguna de las dos, el mismo engine principal
+if DATABASE_READ_URL:
+    engine_lectura = crear_motor(DATABASE_READ_URL, solo_lectura=True)
+elif ES_SQLITE and not es_sqlite_memoria(DATABASE_URL):
+    engine_lectura = crear_motor(url_solo_lectura_sqlite(DATABASE_URL), solo_lectura=True)
 else:
-    # Para otras bases de datos (PostgreSQL, MySQL, etc.)
-    engine = create_engine(DATABASE_URL)
+    engine_lectura = engine
+
+medir_pool(engine, "principal")
+instrumentar_motor(engine)
+if engine_lectura is not engine:
+    medir_pool(engine_lectura, "lectura")
+    instrumentar_motor(engine_lectura)
 
-# Crear el sessionmaker
+# Crear los sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLectura = sessionmaker(autocommit=False, autoflush=False, bind=engine_lectura)
 
 # Base para los modelos
 Base = declarative_base()
 
+def obtener_configuracion_db(motor=None) -> Dict[str, Any]:
+    """
+    Devuelve la configuración efectiva de un engine (por defecto el principal):
+    pool y, en SQLite, el valor real de cada pragma leído de una conexión del pool.
+    """
+    motor = motor or engine
+    pool = motor.pool
+    configuracion: Dict[str, Any] = {
+        "dialecto": motor.dialect.name,
+        "pool": type(pool).__name__,
+        "pool_size": pool.size() if isinstance(pool, QueuePool) else None,
+        "max_overflow": pool._max_overflow if isinstance(pool, QueuePool) else None,
+        "pool_pre_ping": pool._pre_ping,
+    }
+    if motor.dialect.name == "sqlite":
+        configuracion["perfil"] = SQLITE_PROFILE
+        with motor.connect() as conexion:
+            for nombre in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size", "temp_store"):
+                configuracion[nombre] = conexion.exec_driver_sql(f"PRAGMA {nombre}").scalar()
+    return configuracion
+
+def registrar_configuracion_db():
+    """Escribe en el log la configuración efectiva de los engines de escritura y lectura"""
+    motores = {"principal": engine}
+    if engine_lectura is not engine:
+        motores["lectura"] = engine_lectura
+    for nombre, motor in motores.items():
+        logger.info(
+            "Base de datos (%s): %s",
+            nombre,
+            ", ".join(f"{clave}={valor}" for clave, valor in obtener_configuracion_db(motor).items())
+        )
+
 # Dependencia para obtener la sesión de base de datos
 def obtener_db():
     """
@@ -43,3 +246,22 @@ def obtener_db():
         yield db
     finally:
         db.close()
+
+def obtener_db_lectura(request: Request):
+    """
+    Generador que proporciona una sesión para rutas de solo lectura.
+
+    Usa el engine de lectura salvo que el cliente acabe de escribir (cookie
+    `leer_primaria`) o pida explícitamente la base de datos principal con la
+    cabecera `X-Leer-Primaria`, para que siempre vea sus propios cambios.
+    """
+    leer_primaria = (
+        engine_lectura is engine
+        or CABECERA_LEER_PRIMARIA in request.headers
+        or COOKIE_LEER_PRIMARIA in request.cookies
+    )
+    db = SessionLocal() if leer_primaria else SessionLectura()
+    try:
+        yield db
+    finally:
+        db.close()
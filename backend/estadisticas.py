@@ -0,0 +1,232 @@
+import math
+import time
+from typing import Dict, Optional
+from sqlalchemy import BigInteger, bindparam, case, cast, func, select
+from sqlalchemy.orm import Session
+from . import models
+
+# Claves de los contadores mantenidos en la tabla estadisticas_contadores
+TOTAL_ARTICULOS = "total_articulos"
+PRODUCTOS_CON_STOCK = "productos_con_stock"
+PRODUCTOS_SIN_STOCK = "productos_sin_stock"
+STOCK_TOTAL = "stock_total"
+# En céntimos: los deltas son enteros exactos y la suma no acumula error de redondeo
+VALOR_TOTAL_INVENTARIO = "valor_total_inventario"
+TOTAL_USUARIOS = "total_usuarios"
+TOTAL_PEDIDOS = "total_pedidos"
+
+# Versión del catálogo: marca de tiempo en microsegundos de su último cambio,
+# que crece en cada escritura de artículos. Sirve de ETag y Last-Modified
+VERSION_CATALOGO = "version_catalogo"
+
+CLAVES = [
+    TOTAL_ARTICULOS,
+    PRODUCTOS_CON_STOCK,
+    PRODUCTOS_SIN_STOCK,
+    STOCK_TOTAL,
+    VALOR_TOTAL_INVENTARIO,
+    TOTAL_USUARIOS,
+    TOTAL_PEDIDOS,
+    VERSION_CATALOGO,
+]
+
+class ServicioEstadisticas:
+    """
+    Servicio de estadísticas de la tienda basado en contadores.
+
+    Los servicios de inventario, usuarios y pedidos aplican deltas a los
+    contadores dentro de su propia transacción (sin hacer commit aquí), de modo
+    que leer las estadísticas es una única consulta sobre una tabla pequeña con
+    una fila por clave de CLAVES (los contadores y la versión del catálogo).
+    """
+
+    @staticmethod
+    def centimos(cantidad: int, precio: float) -> int:
+        """
+        Valor en céntimos de `cantidad` unidades a `precio` euros, redondeado
+        al céntimo más cercano (igual que ROUND en `recalcular`).
+        """
+        return int(math.floor(cantidad * precio * 100 + 0.5))
+
+    @staticmethod
+    def deltas_articulo(cantidad: int, precio: float, signo: int = 1) -> Dict[str, int]:
+        """
+        Calcula los deltas que aporta (signo=1) o retira (signo=-1) un artículo.
+
+        Args:
+            cantidad: Cantidad en stock del artículo
+            precio: Precio unitario del artículo
+            signo: 1 al crear el artículo, -1 al eliminarlo
+
+        Returns:
+            Diccionario {clave: delta}
+        """
+        return {
+            TOTAL_ARTICULOS: signo,
+            PRODUCTOS_CON_STOCK: signo if cantidad > 0 else 0,
+            PRODUCTOS_SIN_STOCK: signo if cantidad == 0 else 0,
+            STOCK_TOTAL: signo * cantidad,
+            VALOR_TOTAL_INVENTARIO: signo * ServicioEstadisticas.centimos(cantidad, precio),
+        }
+
+    @staticmethod
+    def deltas_cambio_articulo(
+        cantidad_anterior: int,
+        precio_anterior: float,
+        cantidad_nueva: int,
+        precio_nuevo: float
+    ) -> Dict[str, int]:
+        """
+        Calcula los deltas de modificar la cantidad o el precio de un artículo.
+
+        Returns:
+            Diccionario {clave: delta}
+        """
+        retirado = ServicioEstadisticas.deltas_articulo(cantidad_anterior, precio_anterior, signo=-1)
+        aportado = ServicioEstadisticas.deltas_articulo(cantidad_nueva, precio_nuevo)
+        return {clave: retirado[clave] + aportado[clave] for clave in retirado}
+
+    @staticmethod
+    def aplicar_deltas(db: Session, deltas: Dict[str, int]) -> None:
+        """
+        Aplica deltas a los contadores con UPDATE atómicos (valor = valor + delta).
+        No hace commit: el llamador lo hace junto con el resto de su transacción.
+
+        Args:
+            db: Sesión de base de datos
+            deltas: Diccionario {clave: delta}
+        """
+        parametros = [
+            {"c_clave": clave, "c_delta": delta}
+            for clave, delta in deltas.items()
+            if delta
+        ]
+        if not parametros:
+            return
+
+        tabla = models.ContadorEstadistica.__table__
+        db.execute(
+            tabla.update()
+            .where(tabla.c.clave == bindparam("c_clave"))
+            .values(valor=tabla.c.valor + bindparam("c_delta")),
+            parametros
+        )
+
+    @staticmethod
+    def marcar_cambio_catalogo(db: Session) -> None:
+        """
+        Avanza la versión del catálogo hasta la hora actual (o en uno si el reloj
+        no ha avanzado). Se llama en la misma transacción que cualquier escritura
+        que cambie los artículos, sin hacer commit.
+
+        Args:
+            db: Sesión de base de datos
+        """
+        tabla = models.ContadorEstadistica.__table__
+        ahora = ServicioEstadisticas._marca_tiempo()
+        db.execute(
+            tabla.update()
+            .where(tabla.c.clave == VERSION_CATALOGO)
+            .values(valor=case((tabla.c.valor + 1 > ahora, tabla.c.valor + 1), else_=ahora))
+        )
+
+    @staticmethod
+    def obtener_version_catalogo(db: Session) -> Optional[int]:
+        """
+        Obtiene la versión actual del catálogo con una consulta por clave primaria.
+
+        Args:
+            db: Sesión de base de datos
+
+        Returns:
+            Versión del catálogo, o None si los contadores aún no están inicializados
+        """
+        valor = db.query(models.ContadorEstadistica.valor)\
+                  .filter(models.ContadorEstadistica.clave == VERSION_CATALOGO)\
+                  .scalar()
+        return int(valor) if valor is not None else None
+
+    @staticmethod
+    def _marca_tiempo() -> int:
+        """Hora actual en microsegundos (cabe en el BigInteger de los contadores)"""
+        return time.time_ns() // 1000
+
+    @staticmethod
+    def recalcular(db: Session) -> Dict[str, int]:
+        """
+        Recalcula todos los contadores con agregados SQL y los guarda.
+        Se usa para inicializar la tabla en bases de datos existentes y
+        después de cargas de datos que no pasan por los servicios.
+
+        Los agregados se calculan y se escriben en una única sentencia
+        INSERT ... ON CONFLICT DO UPDATE, así dos procesos que recalculan a la
+        vez (por ejemplo, varios workers al arrancar) no pueden escribir
+        valores leídos antes de una escritura del otro.
+
+        Args:
+            db: Sesión de base de datos
+
+        Returns:
+            Diccionario {clave: valor} con los contadores recalculados
+        """
+        articulo = models.ArticuloInventario
+        tabla = models.ContadorEstadistica.__table__
+
+        def agregado(expresion, modelo=articulo):
+            return select(cast(func.coalesce(expresion, 0), BigInteger)).select_from(modelo).scalar_subquery()
+
+        valores = {
+            TOTAL_ARTICULOS: agregado(func.count(articulo.id)),
+            PRODUCTOS_CON_STOCK: agregado(func.sum(case((articulo.cantidad > 0, 1), else_=0))),
+            PRODUCTOS_SIN_STOCK: agregado(func.sum(case((articulo.cantidad == 0, 1), else_=0))),
+            STOCK_TOTAL: agregado(func.sum(articulo.cantidad)),
+            VALOR_TOTAL_INVENTARIO: agregado(func.sum(func.round(articulo.cantidad * articulo.precio * 100))),
+            TOTAL_USUARIOS: agregado(func.count(models.Usuario.id), models.Usuario),
+            TOTAL_PEDIDOS: agregado(func.count(models.Pedido.id), models.Pedido),
+            VERSION_CATALOGO: ServicioEstadisticas._marca_tiempo(),
+        }
+
+        insertar = ServicioEstadisticas._insert_con_conflicto(db)(tabla)\
+            .values([{"clave": clave, "valor": valor} for clave, valor in valores.items()])
+        # Tras un recálculo (por ejemplo después de una carga masiva) el
+        # catálogo puede haber cambiado: la versión avanza a la hora actual o,
+        # si el reloj no ha avanzado, en uno, para invalidar las copias en caché
+        version = case(
+            (tabla.c.valor + 1 > insertar.excluded.valor, tabla.c.valor + 1),
+            else_=insertar.excluded.valor
+        )
+        db.execute(insertar.on_conflict_do_update(
+            index_elements=[tabla.c.clave],
+            set_={"valor": case((tabla.c.clave == VERSION_CATALOGO, version), else_=insertar.excluded.valor)}
+        ))
+        db.commit()
+
+        return {clave: int(valor) for clave, valor in db.query(tabla.c.clave, tabla.c.valor).all()}
+
+    @staticmethod
+    def _insert_con_conflicto(db: Session):
+        """`insert` del dialecto de la sesión con soporte de ON CONFLICT (SQLite o PostgreSQL)"""
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert
+
+    @staticmethod
+    def obtener_estadisticas(db: Session) -> Dict[str, int]:
+        """
+        Obtiene los contadores de la tienda. Si la tabla aún no está
+        inicializada, la calcula a partir de los datos actuales.
+
+        Args:
+            db: Sesión de base de datos
+
+        Returns:
+            Diccionario {clave: valor}
+        """
+        valores: Dict[str, int] = dict(
+            db.query(models.ContadorEstadistica.clave, models.ContadorEstadistica.valor).all()
+        )
+        if any(clave not in valores for clave in CLAVES):
+            return ServicioEstadisticas.recalcular(db)
+        return valores
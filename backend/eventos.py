@@ -0,0 +1,128 @@
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Optional, Set
+
+from .metricas import metricas
+
+# Eventos pendientes por suscriptor; si un cliente lento la llena se le desconecta
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+# Suscriptores simultáneos por worker; por encima se responde 503
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "1000"))
+
+# Segundos entre comentarios de keepalive, para que los proxies no cierren la conexión
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+# Milisegundos que espera el navegador antes de reconectar
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "3000"))
+
+EVENTO_ARTICULO = "articulo"
+EVENTO_RECARGAR = "recargar"
+
+class HubSaturado(Exception):
+    """Se lanza cuando el worker ya tiene EVENTS_MAX_SUBSCRIBERS suscriptores"""
+    pass
+
+class Suscripcion:
+    """Cola acotada de eventos ya formateados de un cliente"""
+
+    def __init__(self, tamano_cola: int):
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=tamano_cola)
+        self.desbordada = False
+
+class HubEventos:
+    """
+    Difusión de los cambios del catálogo a los clientes conectados por
+    Server-Sent Events.
+
+    Las rutas que modifican artículos o stock se ejecutan en el threadpool y
+    publican tras el commit; la difusión se hace en el event loop, que reparte
+    cada evento (formateado una sola vez) entre las colas de los suscriptores.
+    Un suscriptor con la cola llena no frena a los demás: se le desconecta con
+    un evento `recargar` para que vuelva a pedir el catálogo completo.
+
+    El hub es por proceso: con varios workers, cada cliente solo recibe los
+    cambios hechos en el worker que atiende su conexión.
+    """
+
+    def __init__(self, tamano_cola: int, maximo_suscriptores: int):
+        self.tamano_cola = tamano_cola
+        self.maximo_suscriptores = maximo_suscriptores
+        self._suscripciones: Set[Suscripcion] = set()
+        self._bucle: Optional[asyncio.AbstractEventLoop] = None
+        self._secuencia = 0
+
+    def iniciar(self, bucle: asyncio.AbstractEventLoop) -> None:
+        """Fija el event loop en el que se reparten los eventos (al arrancar la app)"""
+        self._bucle = bucle
+
+    def suscribir(self) -> Suscripcion:
+        """
+        Registra un nuevo suscriptor. Se llama desde el event loop.
+
+        Raises:
+            HubSaturado: Si ya hay EVENTS_MAX_SUBSCRIBERS suscriptores
+        """
+        if len(self._suscripciones) >= self.maximo_suscriptores:
+            raise HubSaturado("Demasiados clientes conectados a los eventos, inténtalo de nuevo más tarde")
+        suscripcion = Suscripcion(self.tamano_cola)
+        self._suscripciones.add(suscripcion)
+        metricas.fijar("sse_subscribers", len(self._suscripciones))
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion) -> None:
+        """Da de baja a un suscriptor (al desconectarse el cliente)"""
+        self._suscripciones.discard(suscripcion)
+        metricas.fijar("sse_subscribers", len(self._suscripciones))
+
+    def publicar_articulo(self, articulo_id: int, cantidad: int, precio: float, eliminado: bool = False) -> None:
+        """Publica el nuevo estado de un artículo. Se puede llamar desde cualquier hilo"""
+        self._publicar(EVENTO_ARTICULO, {"id": articulo_id, "cantidad": cantidad, "precio": precio, "eliminado": eliminado})
+
+    def publicar_recarga(self) -> None:
+        """Pide a los clientes que vuelvan a cargar el catálogo (cambios masivos como una importación)"""
+        self._publicar(EVENTO_RECARGAR, {})
+
+    def _publicar(self, tipo: str, datos: dict) -> None:
+        # Sin event loop (scripts) o sin suscriptores no hay nada que repartir
+        if self._bucle is None or not self._suscripciones:
+            return
+        try:
+            self._bucle.call_soon_threadsafe(self._difundir, tipo, json.dumps(datos, separators=(",", ":")))
+        except RuntimeError:
+            # El event loop ya se ha cerrado
+            pass
+
+    def _difundir(self, tipo: str, datos: str) -> None:
+        self._secuencia += 1
+        mensaje = f"id: {self._secuencia}\nevent: {tipo}\ndata: {datos}\n\n"
+        for suscripcion in list(self._suscripciones):
+            try:
+                suscripcion.cola.put_nowait(mensaje)
+            except asyncio.QueueFull:
+                suscripcion.desbordada = True
+                self.cancelar(suscripcion)
+                metricas.incrementar("sse_dropped_subscribers_total")
+
+    async def transmitir(self, suscripcion: Suscripcion) -> AsyncIterator[str]:
+        """
+        Cuerpo de la respuesta text/event-stream de un suscriptor. Termina cuando
+        el cliente se desconecta (Starlette cancela el generador) o se desborda.
+        """
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n"
+            while not suscripcion.desbordada:
+                try:
+                    yield await asyncio.wait_for(suscripcion.cola.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+            yield f"event: {EVENTO_RECARGAR}\ndata: {{}}\n\n"
+        finally:
+            self.cancelar(suscripcion)
+
+metricas.describir("sse_subscribers", "gauge", "Clientes conectados a /api/articulos/eventos")
+metricas.describir("sse_dropped_subscribers_total", "counter", "Clientes de eventos desconectados por no consumir a tiempo")
+
+# Hub compartido por todo el proceso
+hub_eventos = HubEventos(EVENTS_QUEUE_SIZE, EVENTS_MAX_SUBSCRIBERS)
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# Hilos dedicados a bcrypt (bcrypt libera el GIL mientras calcula el hash)
+TAMANO_POOL_HASH = int(os.getenv("HASH_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+
+# Operaciones que pueden esperar turno antes de rechazar nuevas peticiones
+PROFUNDIDAD_COLA_HASH = int(os.getenv("HASH_POOL_QUEUE", "32"))
+
+class PoolHashingSaturado(Exception):
+    """Se lanza cuando el pool de hashing tiene todos los hilos ocupados y la cola llena"""
+    pass
+
+class PoolHashing:
+    """
+    Pool de hilos acotado para las operaciones de bcrypt.
+
+    Limita cuántos hashes se calculan a la vez (para que un pico de logins no
+    se quede con toda la CPU del worker) y cuántos pueden esperar en cola. Si
+    no queda sitio, falla inmediatamente con PoolHashingSaturado en lugar de
+    acumular peticiones.
+    """
+
+    def __init__(self, trabajadores: int, profundidad_cola: int):
+        self.trabajadores = trabajadores
+        self.profundidad_cola = profundidad_cola
+        self._executor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="hashing")
+        self._plazas = threading.BoundedSemaphore(trabajadores + profundidad_cola)
+        self._lock = threading.Lock()
+        self._en_sistema = 0
+        self._en_curso = 0
+        self._completadas = 0
+        self._rechazadas = 0
+        self._segundos_espera = 0.0
+        self._segundos_ejecucion = 0.0
+
+    def ejecutar(self, funcion: Callable[..., Any], *args: Any) -> Any:
+        """
+        Ejecuta `funcion(*args)` en el pool y espera su resultado.
+
+        Raises:
+            PoolHashingSaturado: Si el pool y su cola están llenos
+        """
+        if not self._plazas.acquire(blocking=False):
+            with self._lock:
+                self._rechazadas += 1
+            raise PoolHashingSaturado("El servicio de autenticación está saturado, inténtalo de nuevo en unos segundos")
+
+        encolada = time.perf_counter()
+        with self._lock:
+            self._en_sistema += 1
+
+        def tarea():
+            inicio = time.perf_counter()
+            with self._lock:
+                self._en_curso += 1
+                self._segundos_espera += inicio - encolada
+            try:
+                return funcion(*args)
+            finally:
+                duracion = time.perf_counter() - inicio
+                with self._lock:
+                    self._en_curso -= 1
+                    self._en_sistema -= 1
+                    self._completadas += 1
+                    self._segundos_ejecucion += duracion
+                self._plazas.release()
+
+        return self._executor.submit(tarea).result()
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """Devuelve las métricas de uso del pool para poder dimensionarlo"""
+        with self._lock:
+            completadas = self._completadas
+            return {
+                "trabajadores": self.trabajadores,
+                "profundidad_cola": self.profundidad_cola,
+                "en_curso": self._en_curso,
+                "en_cola": self._en_sistema - self._en_curso,
+                "utilizacion": round(self._en_curso / self.trabajadores, 2),
+                "completadas": completadas,
+                "rechazadas": self._rechazadas,
+                "espera_media_ms": round(self._segundos_espera / completadas * 1000, 2) if completadas else 0.0,
+                "ejecucion_media_ms": round(self._segundos_ejecucion / completadas * 1000, 2) if completadas else 0.0,
+            }
+
+# Pool compartido por todo el proceso
+pool_hashing = PoolHashing(TAMANO_POOL_HASH, PROFUNDIDAD_COLA_HASH)
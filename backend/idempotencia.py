@@ -0,0 +1,254 @@
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Horas durante las que se recuerda una clave y su respuesta
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+
+# Segundos que un duplicado espera a que termine la petición original antes de responder 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+
+# Segundos tras los que una reserva en curso se considera abandonada (worker
+# caído a mitad de la petición) y otra petición con la misma clave puede tomarla.
+# Si la original solo era lenta, ya no puede crear su pedido (ver `asociar_pedido`)
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+# Segundos entre limpiezas de claves caducadas (las hace cada worker)
+IDEMPOTENCY_CLEANUP_SECONDS = float(os.getenv("IDEMPOTENCY_CLEANUP_SECONDS", "3600"))
+
+LONGITUD_MAXIMA_CLAVE = 255
+
+EN_CURSO = "en_curso"
+COMPLETADA = "completada"
+
+# Pausa entre comprobaciones mientras se espera a la petición original
+INTERVALO_ESPERA = 0.05
+
+class ClaveReutilizada(Exception):
+    """Se lanza cuando una clave ya usada llega con un cuerpo distinto"""
+    pass
+
+class PeticionEnCurso(Exception):
+    """Se lanza cuando la petición original sigue en curso tras IDEMPOTENCY_WAIT_SECONDS"""
+    pass
+
+class ReservaPerdida(Exception):
+    """Se lanza cuando otra petición tomó la reserva de la clave antes de que esta creara el pedido"""
+    pass
+
+class Reserva:
+    """
+    Resultado de `ServicioIdempotencia.reservar`: o bien la clave queda
+    reservada para la petición actual (`original` es None), o bien la
+    petición original ya terminó y `original` es su clave completada.
+
+    `fecha` es la fecha_creacion con la que se tomó la reserva e identifica a
+    su titular: si otra petición la toma, la fila pasa a tener otra fecha.
+    """
+
+    def __init__(
+        self,
+        clave: str,
+        usuario_id: int,
+        fecha: Optional[datetime] = None,
+        original: Optional[models.ClaveIdempotencia] = None
+    ):
+        self.clave = clave
+        self.usuario_id = usuario_id
+        self.fecha = fecha
+        self.original = original
+
+class ServicioIdempotencia:
+    """
+    Servicio de claves Idempotency-Key para la creación de pedidos.
+
+    La primera petición con una clave la reserva (fila "en_curso", confirmada
+    antes de hacer el trabajo). Las peticiones concurrentes con la misma clave
+    chocan con la clave primaria y esperan a que la original termine: así solo
+    una crea el pedido. La reserva se marca como completada en la misma
+    transacción que crea el pedido (`asociar_pedido`), de modo que un pedido
+    nunca puede quedar creado con la clave todavía libre.
+
+    Una reserva en curso más antigua que IDEMPOTENCY_LOCK_SECONDS puede
+    tomarla otra petición. Todas las escrituras sobre la clave comprueban que
+    la reserva sigue siendo suya (misma fecha_creacion), así que si la
+    petición original solo era lenta su pedido se deshace en lugar de
+    crearse dos veces.
+    """
+
+    @staticmethod
+    def calcular_hash(cuerpo: str) -> str:
+        """Hash del cuerpo de la petición, para detectar claves reutilizadas con otros datos"""
+        return hashlib.sha256(cuerpo.encode()).hexdigest()
+
+    @staticmethod
+    def reservar(
+        db: Session,
+        clave: str,
+        usuario_id: int,
+        hash_peticion: str
+    ) -> Reserva:
+        """
+        Reserva la clave para la petición actual o espera a la original.
+
+        Args:
+            db: Sesión de base de datos
+            clave: Valor de la cabecera Idempotency-Key
+            usuario_id: ID del usuario autenticado (las claves son por usuario)
+            hash_peticion: Hash del cuerpo de la petición
+
+        Returns:
+            Reserva de esta petición (hay que crear el pedido), o con `original`
+            si la petición original ya terminó
+
+        Raises:
+            ClaveReutilizada: Si la clave se usó con otro cuerpo
+            PeticionEnCurso: Si la petición original no termina a tiempo
+        """
+        limite_espera = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            ahora = datetime.utcnow()
+            if ServicioIdempotencia._insertar(db, clave, usuario_id, hash_peticion, ahora):
+                return Reserva(clave, usuario_id, fecha=ahora)
+
+            existente = db.query(models.ClaveIdempotencia)\
+                          .filter_by(clave=clave, usuario_id=usuario_id)\
+                          .populate_existing()\
+                          .first()
+            if existente is None:
+                # Se borró entre el INSERT y la lectura: volver a intentarlo
+                continue
+            if existente.fecha_creacion < ahora - timedelta(hours=IDEMPOTENCY_TTL_HOURS):
+                # Clave caducada pendiente de limpieza: se trata como nueva
+                ServicioIdempotencia._eliminar(db, existente)
+                continue
+            if existente.hash_peticion != hash_peticion:
+                raise ClaveReutilizada(
+                    "La clave Idempotency-Key ya se usó con una petición distinta"
+                )
+            if existente.estado == COMPLETADA:
+                return Reserva(clave, usuario_id, original=existente)
+
+            if existente.fecha_creacion < ahora - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS):
+                if ServicioIdempotencia._tomar_reserva(db, existente, ahora):
+                    return Reserva(clave, usuario_id, fecha=ahora)
+                continue
+            if time.monotonic() >= limite_espera:
+                raise PeticionEnCurso(
+                    "Hay otra petición con la misma clave Idempotency-Key en curso, inténtalo de nuevo en unos segundos"
+                )
+            db.rollback()
+            time.sleep(INTERVALO_ESPERA)
+
+    @staticmethod
+    def asociar_pedido(db: Session, reserva: Reserva, pedido_id: int, codigo_respuesta: int) -> None:
+        """
+        Marca la clave como completada con el pedido creado. No hace commit:
+        se llama dentro de la transacción que crea el pedido.
+
+        Raises:
+            ReservaPerdida: Si otra petición tomó la reserva mientras tanto; el
+                llamador debe deshacer la transacción para no crear el pedido
+        """
+        asociadas = ServicioIdempotencia._filtrar_reserva(db, reserva).update(
+            {"estado": COMPLETADA, "pedido_id": pedido_id, "codigo_respuesta": codigo_respuesta},
+            synchronize_session=False
+        )
+        if asociadas != 1:
+            raise ReservaPerdida(
+                "Otra petición con la misma clave Idempotency-Key tomó la reserva, consulta tus pedidos antes de reintentar"
+            )
+
+    @staticmethod
+    def guardar_respuesta(db: Session, reserva: Reserva, respuesta: str) -> None:
+        """Guarda el cuerpo de la respuesta original para devolverlo tal cual en los reintentos"""
+        db.query(models.ClaveIdempotencia)\
+          .filter_by(clave=reserva.clave, usuario_id=reserva.usuario_id, fecha_creacion=reserva.fecha)\
+          .update({"respuesta": respuesta}, synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def liberar(db: Session, reserva: Reserva) -> None:
+        """
+        Libera una reserva cuya petición falló (por ejemplo, por falta de stock),
+        para que el cliente pueda reintentar con la misma clave. Si otra
+        petición ya la tomó, no la toca.
+        """
+        db.rollback()
+        ServicioIdempotencia._filtrar_reserva(db, reserva).delete(synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def limpiar_expiradas(db: Session) -> int:
+        """
+        Elimina las claves más antiguas que IDEMPOTENCY_TTL_HOURS.
+
+        Returns:
+            Número de claves eliminadas
+        """
+        limite = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+        eliminadas = db.query(models.ClaveIdempotencia)\
+                       .filter(models.ClaveIdempotencia.fecha_creacion < limite)\
+                       .delete(synchronize_session=False)
+        db.commit()
+        return eliminadas
+
+    @staticmethod
+    def _insertar(db: Session, clave: str, usuario_id: int, hash_peticion: str, ahora: datetime) -> bool:
+        """Intenta crear la reserva; devuelve False si la clave ya existe"""
+        try:
+            db.execute(models.ClaveIdempotencia.__table__.insert().values(
+                clave=clave,
+                usuario_id=usuario_id,
+                hash_peticion=hash_peticion,
+                estado=EN_CURSO,
+                fecha_creacion=ahora
+            ))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+
+    @staticmethod
+    def _eliminar(db: Session, existente: models.ClaveIdempotencia) -> None:
+        """Elimina una clave caducada si nadie la ha renovado mientras tanto"""
+        db.query(models.ClaveIdempotencia)\
+          .filter_by(clave=existente.clave, usuario_id=existente.usuario_id, fecha_creacion=existente.fecha_creacion)\
+          .delete(synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def _filtrar_reserva(db: Session, reserva: Reserva):
+        """Consulta de la clave solo si sigue en curso y reservada por `reserva`"""
+        return db.query(models.ClaveIdempotencia)\
+                 .filter_by(
+                     clave=reserva.clave,
+                     usuario_id=reserva.usuario_id,
+                     estado=EN_CURSO,
+                     fecha_creacion=reserva.fecha
+                 )
+
+    @staticmethod
+    def _tomar_reserva(db: Session, existente: models.ClaveIdempotencia, ahora: datetime) -> bool:
+        """
+        Toma una reserva abandonada. El UPDATE condicional garantiza que solo
+        una de las peticiones que lo intenten a la vez lo consigue.
+        """
+        tomadas = db.query(models.ClaveIdempotencia)\
+                    .filter_by(
+                        clave=existente.clave,
+                        usuario_id=existente.usuario_id,
+                        estado=EN_CURSO,
+                        fecha_creacion=existente.fecha_creacion
+                    )\
+                    .update({"fecha_creacion": ahora}, synchronize_session=False)
+        db.commit()
+        return tomadas == 1
@@ -0,0 +1,151 @@
+import codecs
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from . import models, schemas
+from .estadisticas import ServicioEstadisticas
+from .eventos import hub_eventos
+
+# Formatos aceptados por la importación masiva (Content-Type)
+FORMATO_CSV = "text/csv"
+FORMATOS_NDJSON = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+# Errores que se detallan en el informe; el resto solo se cuenta
+MAX_ERRORES_DETALLADOS = 1000
+
+class ServicioImportacion:
+    """
+    Servicio para importar artículos en bloque desde CSV o NDJSON.
+
+    Lee el cuerpo de la petición de forma incremental y procesa las filas por
+    lotes: valida cada fila con ArticuloInventarioCrear, resuelve los nombres
+    repetidos con una sola consulta por lote e inserta con executemany,
+    haciendo un commit por lote. Nunca tiene en memoria más de un lote.
+    """
+
+    @staticmethod
+    def leer_lineas(fragmentos: Iterable[bytes]) -> Iterator[str]:
+        """
+        Convierte fragmentos de bytes en líneas de texto (con su salto de línea).
+        """
+        decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+        pendiente = ""
+        for fragmento in fragmentos:
+            pendiente += decodificador.decode(fragmento)
+            *lineas, pendiente = pendiente.split("\n")
+            for linea in lineas:
+                yield linea + "\n"
+        pendiente += decodificador.decode(b"", final=True)
+        if pendiente:
+            yield pendiente
+
+    @staticmethod
+    def leer_filas(fragmentos: Iterable[bytes], formato: str) -> Iterator[Tuple[int, Any]]:
+        """
+        Genera (número de fila, datos) a partir del cuerpo recibido.
+
+        En CSV la primera línea es la cabecera (nombre,descripcion,cantidad,precio)
+        y los campos vacíos se tratan como ausentes. En NDJSON cada línea no vacía
+        es un objeto JSON; si una línea no es JSON válido se devuelve la excepción
+        en lugar de los datos.
+        """
+        lineas = ServicioImportacion.leer_lineas(fragmentos)
+        if formato == FORMATO_CSV:
+            for numero, fila in enumerate(csv.DictReader(lineas), start=1):
+                yield numero, {
+                    campo: valor for campo, valor in fila.items()
+                    if campo is not None and valor not in ("", None)
+                }
+        else:
+            numero = 0
+            for linea in lineas:
+                if not linea.strip():
+                    continue
+                numero += 1
+                try:
+                    yield numero, json.loads(linea)
+                except ValueError as e:
+                    yield numero, e
+
+    @staticmethod
+    def importar_articulos(
+        db: Session,
+        filas: Iterable[Tuple[int, Any]],
+        tamano_lote: int = 500
+    ) -> schemas.ResultadoImportacion:
+        """
+        Importa artículos por lotes y devuelve el informe de errores por fila.
+
+        Args:
+            db: Sesión de base de datos
+            filas: Pares (número de fila, datos) como los de `leer_filas`
+            tamano_lote: Filas por transacción
+
+        Returns:
+            Resultado con filas procesadas, importadas y errores
+        """
+        resultado = schemas.ResultadoImportacion(filas_procesadas=0, importados=0, total_errores=0, errores=[])
+        lote: List[Tuple[int, schemas.ArticuloInventarioCrear]] = []
+
+        def registrar_error(numero: int, mensaje: str):
+            resultado.total_errores += 1
+            if len(resultado.errores) < MAX_ERRORES_DETALLADOS:
+                resultado.errores.append(schemas.ErrorImportacion(fila=numero, error=mensaje))
+
+        def procesar_lote():
+            # Nombres que ya existen en la base de datos (incluidos los de lotes
+            # anteriores, ya confirmados): una consulta por lote
+            existentes = {
+                nombre for (nombre,) in db.query(models.ArticuloInventario.nombre)
+                .filter(models.ArticuloInventario.nombre.in_([articulo.nombre for _, articulo in lote]))
+            }
+
+            nuevos: List[Dict[str, Any]] = []
+            nombres_lote = set()
+            for numero, articulo in lote:
+                if articulo.nombre in existentes:
+                    registrar_error(numero, f"Ya existe un artículo con el nombre '{articulo.nombre}'")
+                elif articulo.nombre in nombres_lote:
+                    registrar_error(numero, f"Nombre '{articulo.nombre}' repetido en el archivo")
+                else:
+                    nombres_lote.add(articulo.nombre)
+                    nuevos.append(articulo.model_dump())
+
+            if nuevos:
+                db.execute(models.ArticuloInventario.__table__.insert(), nuevos)
+                deltas: Dict[str, int] = {}
+                for datos in nuevos:
+                    for clave, delta in ServicioEstadisticas.deltas_articulo(datos["cantidad"], datos["precio"]).items():
+                        deltas[clave] = deltas.get(clave, 0) + delta
+                ServicioEstadisticas.aplicar_deltas(db, deltas)
+                ServicioEstadisticas.marcar_cambio_catalogo(db)
+                db.commit()
+                resultado.importados += len(nuevos)
+            lote.clear()
+
+        for numero, datos in filas:
+            resultado.filas_procesadas += 1
+            if isinstance(datos, Exception):
+                registrar_error(numero, f"JSON no válido: {datos}")
+                continue
+            if not isinstance(datos, dict):
+                registrar_error(numero, "Cada fila debe ser un objeto")
+                continue
+            try:
+                lote.append((numero, schemas.ArticuloInventarioCrear(**datos)))
+            except ValidationError as e:
+                registrar_error(numero, "; ".join(
+                    f"{'.'.join(str(parte) for parte in error['loc'])}: {error['msg']}" for error in e.errors()
+                ))
+                continue
+            if len(lote) >= tamano_lote:
+                procesar_lote()
+
+        if lote:
+            procesar_lote()
+        if resultado.importados:
+            hub_eventos.publicar_recarga()
+        resultado.errores.sort(key=lambda error: error.fila)
+        return resultado
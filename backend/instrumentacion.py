@@ -0,0 +1,171 @@
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger("uvicorn.error")
+
+# Las consultas que tarden más que esto (en milisegundos) se escriben en el log
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+
+# Detección de posibles N+1: activa por defecto fuera de producción
+SQL_DETECT_N_PLUS_ONE = os.getenv(
+    "SQL_DETECT_N_PLUS_ONE",
+    "false" if os.getenv("ENVIRONMENT") == "production" else "true"
+).lower() == "true"
+
+# Ejecuciones de la misma sentencia en una petición a partir de las que se avisa
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+class ConsultasPeticion:
+    """Consultas SQL ejecutadas durante una petición (o un bloque de `contar_consultas`)"""
+
+    def __init__(self, guardar_sentencias: bool = False):
+        self.consultas = 0
+        self.segundos = 0.0
+        self.sentencias: Optional[Counter] = Counter() if guardar_sentencias else None
+
+    def registrar(self, sentencia: str, duracion: float) -> None:
+        self.consultas += 1
+        self.segundos += duracion
+        if self.sentencias is not None:
+            self.sentencias[sentencia] += 1
+
+# Consultas de la petición en curso. El objeto se crea en el middleware y se
+# modifica desde los hilos del threadpool, que heredan una copia del contexto
+_consultas_actuales: ContextVar[Optional[ConsultasPeticion]] = ContextVar("consultas_actuales", default=None)
+
+def _resumir(sentencia: str, longitud: int = 300) -> str:
+    sentencia = " ".join(sentencia.split())
+    return sentencia if len(sentencia) <= longitud else sentencia[:longitud] + "..."
+
+def instrumentar_motor(motor) -> None:
+    """
+    Mide cada sentencia ejecutada por el engine: la suma a las consultas de la
+    petición en curso y escribe en el log las que superan SQL_SLOW_QUERY_MS.
+    """
+
+    @event.listens_for(motor, "before_cursor_execute")
+    def iniciar_consulta(conexion, cursor, sentencia, parametros, contexto, executemany):
+        if contexto is not None:
+            contexto._inicio_consulta = time.perf_counter()
+
+    @event.listens_for(motor, "after_cursor_execute")
+    def terminar_consulta(conexion, cursor, sentencia, parametros, contexto, executemany):
+        inicio = getattr(contexto, "_inicio_consulta", None)
+        if inicio is None:
+            return
+        duracion = time.perf_counter() - inicio
+        consultas = _consultas_actuales.get()
+        if consultas is not None:
+            consultas.registrar(sentencia, duracion)
+        if duracion * 1000 >= SQL_SLOW_QUERY_MS:
+            logger.warning("Consulta lenta (%.1f ms): %s", duracion * 1000, _resumir(sentencia))
+
+class MiddlewareConsultas:
+    """
+    Cuenta las consultas SQL y el tiempo en base de datos de cada petición y
+    los devuelve en la cabecera `Server-Timing` (visible en las herramientas
+    de desarrollo del navegador) y en `X-Consultas-DB`.
+
+    Con SQL_DETECT_N_PLUS_ONE avisa en el log cuando una petición ejecuta la
+    misma sentencia SQL_N_PLUS_ONE_THRESHOLD veces o más, señal de una consulta
+    dentro de un bucle.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        consultas = ConsultasPeticion(guardar_sentencias=SQL_DETECT_N_PLUS_ONE)
+        token = _consultas_actuales.set(consultas)
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                cabeceras = MutableHeaders(scope=mensaje)
+                cabeceras.append(
+                    "server-timing",
+                    f'db;dur={consultas.segundos * 1000:.2f};desc="{consultas.consultas} consultas", '
+                    f"app;dur={(time.perf_counter() - inicio) * 1000:.2f}"
+                )
+                cabeceras.append("x-consultas-db", str(consultas.consultas))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _consultas_actuales.reset(token)
+            if consultas.sentencias:
+                self._avisar_n_mas_uno(scope, consultas)
+
+    @staticmethod
+    def _avisar_n_mas_uno(scope, consultas: ConsultasPeticion) -> None:
+        ruta = getattr(scope.get("route"), "path", scope["path"])
+        for sentencia, repeticiones in consultas.sentencias.items():
+            if repeticiones >= SQL_N_PLUS_ONE_THRESHOLD:
+                logger.warning(
+                    "Posible N+1 en %s %s: %d ejecuciones de %s",
+                    scope["method"], ruta, repeticiones, _resumir(sentencia)
+                )
+
+class ConsultasContadas:
+    """Resultado de `contar_consultas`: número de consultas y sentencias ejecutadas"""
+
+    def __init__(self):
+        self.sentencias: List[str] = []
+
+    @property
+    def consultas(self) -> int:
+        return len(self.sentencias)
+
+@contextmanager
+def contar_consultas(motores=None) -> Iterator[ConsultasContadas]:
+    """
+    Cuenta las sentencias que ejecutan los engines (por defecto el principal y
+    el de lectura) dentro del bloque, desde cualquier hilo. Pensado para tests
+    y benchmarks, donde la petición se atiende en otro hilo que el que mide.
+    """
+    if motores is None:
+        from .database import engine, engine_lectura
+        motores = {engine, engine_lectura}
+
+    resultado = ConsultasContadas()
+
+    def contar(conexion, cursor, sentencia, *_):
+        resultado.sentencias.append(sentencia)
+
+    for motor in motores:
+        event.listen(motor, "before_cursor_execute", contar)
+    try:
+        yield resultado
+    finally:
+        for motor in motores:
+            event.remove(motor, "before_cursor_execute", contar)
+
+@contextmanager
+def presupuesto_consultas(maximo: int, motores=None) -> Iterator[ConsultasContadas]:
+    """
+    Falla con AssertionError si el bloque ejecuta más de `maximo` sentencias SQL.
+
+    Ejemplo:
+        with presupuesto_consultas(3):
+            cliente.get("/api/pedidos", headers=cabeceras_admin)
+    """
+    with contar_consultas(motores) as resultado:
+        yield resultado
+    if resultado.consultas > maximo:
+        detalle = "\n".join(f"  {i}. {_resumir(s, 200)}" for i, s in enumerate(resultado.sentencias, 1))
+        raise AssertionError(
+            f"Se esperaban como máximo {maximo} consultas SQL y se ejecutaron {resultado.consultas}:\n{detalle}"
+        )
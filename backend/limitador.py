@@ -0,0 +1,257 @@
+import ipaddress
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from fastapi import Request
+
+from .metricas import metricas
+
+# Limitación de peticiones de /api/auth/login y /api/auth/registro
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+# "memoria" (cada worker cuenta por separado) o "sqlite" (estado compartido
+# por todos los workers de la máquina en RATE_LIMIT_SQLITE_PATH)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memoria")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "limites.db")
+
+# Proxies (IPs o redes separadas por comas) de los que se acepta la IP del
+# cliente en X-Forwarded-For / X-Real-IP, como el nginx del frontend. Sin
+# ellos, detrás de un proxy todas las peticiones compartirían la cubeta de su IP
+RATE_LIMIT_TRUSTED_PROXIES = os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.1,::1")
+
+# Cubetas que se recuerdan como máximo; al superarlo se descartan las usadas hace más tiempo
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+# El backend SQLite descarta las cubetas sobrantes cada tantas claves nuevas
+INTERVALO_RECORTE = 100
+
+# Reglas en formato "peticiones/segundos": capacidad de la cubeta y tiempo en
+# rellenarla entera. Se limita por IP y por email de forma independiente
+REGLAS_POR_DEFECTO = {
+    "login_ip": "20/60",
+    "login_email": "5/60",
+    "registro_ip": "5/300",
+    "registro_email": "3/300",
+}
+
+class LimiteExcedido(Exception):
+    """Se lanza cuando una cubeta no tiene tokens para la petición"""
+
+    def __init__(self, regla: str, reintentar_en: float):
+        super().__init__("Demasiados intentos, inténtalo de nuevo más tarde")
+        self.regla = regla
+        self.reintentar_en = reintentar_en
+
+class Regla:
+    """Cubeta de tokens: `capacidad` peticiones seguidas y `capacidad` más cada `periodo` segundos"""
+
+    def __init__(self, nombre: str, definicion: str):
+        capacidad, periodo = definicion.split("/")
+        self.nombre = nombre
+        self.capacidad = float(capacidad)
+        self.tokens_por_segundo = self.capacidad / float(periodo)
+
+def _repostar(tokens: float, actualizado: float, ahora: float, regla: Regla) -> float:
+    return min(regla.capacidad, tokens + (ahora - actualizado) * regla.tokens_por_segundo)
+
+def _espera(tokens: float, regla: Regla) -> float:
+    """Segundos hasta que la cubeta tenga un token"""
+    return (1 - tokens) / regla.tokens_por_segundo
+
+class BackendMemoria:
+    """Cubetas en un diccionario LRU del proceso"""
+
+    def __init__(self, maximo_claves: int):
+        self.maximo_claves = maximo_claves
+        self._cubetas: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave: str, regla: Regla) -> float:
+        """
+        Consume un token de la cubeta `clave`.
+
+        Returns:
+            0 si la petición se acepta, o los segundos hasta que haya un token
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, actualizado = self._cubetas.pop(clave, (regla.capacidad, ahora))
+            tokens = _repostar(tokens, actualizado, ahora, regla)
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = _espera(tokens, regla)
+            self._cubetas[clave] = (tokens, ahora)
+            while len(self._cubetas) > self.maximo_claves:
+                self._cubetas.popitem(last=False)
+        return espera
+
+class BackendSQLite:
+    """
+    Cubetas en un archivo SQLite local, compartido por todos los workers de la
+    máquina. Cada consumo es una transacción BEGIN IMMEDIATE, así que dos
+    workers no pueden gastar el mismo token.
+    """
+
+    def __init__(self, ruta: str, maximo_claves: int):
+        self.ruta = ruta
+        self.maximo_claves = maximo_claves
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._claves_nuevas = 0
+
+    def _conexion(self) -> sqlite3.Connection:
+        """Conexión del hilo actual; la primera crea la tabla si no existe"""
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=OFF")
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS cubetas ("
+                "clave TEXT PRIMARY KEY, tokens REAL NOT NULL, actualizado REAL NOT NULL)"
+            )
+            conexion.execute("CREATE INDEX IF NOT EXISTS ix_cubetas_actualizado ON cubetas (actualizado)")
+            self._local.conexion = conexion
+        return conexion
+
+    def _toca_recortar(self) -> bool:
+        """Recortar la tabla cada INTERVALO_RECORTE claves nuevas, no en cada una"""
+        with self._lock:
+            self._claves_nuevas += 1
+            return self._claves_nuevas % INTERVALO_RECORTE == 0
+
+    def consumir(self, clave: str, regla: Regla) -> float:
+        """
+        Consume un token de la cubeta `clave`.
+
+        Returns:
+            0 si la petición se acepta, o los segundos hasta que haya un token
+        """
+        # Reloj de pared: el monotónico no es comparable entre procesos
+        ahora = time.time()
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            fila = conexion.execute("SELECT tokens, actualizado FROM cubetas WHERE clave = ?", (clave,)).fetchone()
+            tokens, actualizado = fila if fila else (regla.capacidad, ahora)
+            tokens = _repostar(tokens, min(actualizado, ahora), ahora, regla)
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = _espera(tokens, regla)
+            conexion.execute(
+                "INSERT OR REPLACE INTO cubetas (clave, tokens, actualizado) VALUES (?, ?, ?)",
+                (clave, tokens, ahora)
+            )
+            if fila is None and self._toca_recortar():
+                conexion.execute(
+                    "DELETE FROM cubetas WHERE clave IN ("
+                    "SELECT clave FROM cubetas ORDER BY actualizado DESC LIMIT -1 OFFSET ?)",
+                    (self.maximo_claves,)
+                )
+            conexion.execute("COMMIT")
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            raise
+        return espera
+
+Red = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+def leer_redes(definicion: str) -> List[Red]:
+    """Convierte "10.0.0.0/8,127.0.0.1" en la lista de redes correspondiente"""
+    return [ipaddress.ip_network(red.strip(), strict=False) for red in definicion.split(",") if red.strip()]
+
+def _es_de_confianza(ip: str, proxies: List[Red]) -> bool:
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(direccion in red for red in proxies)
+
+def ip_cliente(request: Request, proxies: List[Red]) -> str:
+    """
+    IP del cliente de la petición. Si la conexión llega de un proxy de
+    confianza, se toma de X-Forwarded-For (la última dirección que no es un
+    proxy de confianza, porque las anteriores las puede escribir el cliente)
+    o, si no la hay, de X-Real-IP.
+    """
+    ip = request.client.host if request.client else "desconocida"
+    if not _es_de_confianza(ip, proxies):
+        return ip
+    reenviadas = [
+        direccion.strip()
+        for direccion in request.headers.get("x-forwarded-for", "").split(",")
+        if direccion.strip()
+    ]
+    for direccion in reversed(reenviadas):
+        if not _es_de_confianza(direccion, proxies):
+            return direccion
+    if reenviadas:
+        return reenviadas[0]
+    return request.headers.get("x-real-ip", "").strip() or ip
+
+class LimitadorPeticiones:
+    """
+    Limitador de peticiones por cubetas de tokens para las rutas que calculan
+    un hash de bcrypt. Comprueba una cubeta por IP y otra por email, antes de
+    tocar la base de datos o el pool de hashing.
+    """
+
+    def __init__(self, backend, reglas: Dict[str, str], activo: bool = True, proxies: str = ""):
+        self.backend = backend
+        self.activo = activo
+        self.proxies = leer_redes(proxies)
+        self.reglas = {nombre: Regla(nombre, definicion) for nombre, definicion in reglas.items()}
+
+    def comprobar(self, request: Request, ruta: str, email: Optional[str] = None) -> None:
+        """
+        Consume un token de las cubetas de la IP y del email para `ruta`
+        ("login" o "registro").
+
+        Raises:
+            LimiteExcedido: Si alguna de las cubetas está vacía
+        """
+        if not self.activo:
+            return
+        self._consumir(f"{ruta}_ip", ip_cliente(request, self.proxies))
+        if email:
+            self._consumir(f"{ruta}_email", email.strip().lower())
+
+    def _consumir(self, nombre_regla: str, valor: str) -> None:
+        regla = self.reglas[nombre_regla]
+        espera = self.backend.consumir(f"{nombre_regla}:{valor}", regla)
+        if espera > 0:
+            metricas.incrementar("rate_limit_rejections_total", regla=nombre_regla)
+            raise LimiteExcedido(nombre_regla, espera)
+
+    @staticmethod
+    def segundos_reintento(e: LimiteExcedido) -> str:
+        """Valor de la cabecera Retry-After (segundos enteros, redondeando hacia arriba)"""
+        return str(max(1, math.ceil(e.reintentar_en)))
+
+def crear_backend():
+    """Crea el backend configurado en RATE_LIMIT_BACKEND"""
+    if RATE_LIMIT_BACKEND == "sqlite":
+        return BackendSQLite(RATE_LIMIT_SQLITE_PATH, RATE_LIMIT_MAX_KEYS)
+    if RATE_LIMIT_BACKEND != "memoria":
+        raise ValueError(f"RATE_LIMIT_BACKEND desconocido: {RATE_LIMIT_BACKEND}")
+    return BackendMemoria(RATE_LIMIT_MAX_KEYS)
+
+def leer_reglas() -> Dict[str, str]:
+    """Reglas por defecto, cada una sustituible con RATE_LIMIT_<REGLA> (p. ej. RATE_LIMIT_LOGIN_EMAIL=5/60)"""
+    return {nombre: os.getenv(f"RATE_LIMIT_{nombre.upper()}", definicion) for nombre, definicion in REGLAS_POR_DEFECTO.items()}
+
+metricas.describir("rate_limit_rejections_total", "counter", "Peticiones rechazadas con 429 por regla de limitación")
+
+# Limitador compartido por todo el proceso
+limitador = LimitadorPeticiones(
+    crear_backend(), leer_reglas(), activo=RATE_LIMIT_ENABLED, proxies=RATE_LIMIT_TRUSTED_PROXIES
+)
@@ -1,42 +1,227 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query
+from fastapi import APIRouter, FastAPI, Depends, Header, HTTPException, status, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import MutableHeaders
+from anyio import from_thread, to_thread
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from pydantic import BaseModel
+from typing import List, Optional, Tuple, Union
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 from datetime import timedelta
 
-from .database import engine, obtener_db
+from .database import (
+    engine, engine_lectura, SessionLocal, obtener_db, obtener_db_lectura, registrar_configuracion_db, logger,
+    TAMANO_THREADPOOL_DB, COOKIE_LEER_PRIMARIA, DB_READ_YOUR_WRITES_SECONDS
+)
 from .models import Base
 from .crud import ServicioInventario, ServicioUsuarios, ServicioPedidos, ServicioSeguridad, ACCESS_TOKEN_EXPIRE_MINUTES
 from .auth import obtener_usuario_actual, obtener_usuario_admin
-from . import schemas, models
-
-# Crear las tablas de la base de datos
-Base.metadata.create_all(bind=engine)
-
-# Inicializar la aplicación FastAPI
-app = FastAPI(
-    title="Sistema de Gestión de Inventario",
-    description="API para gestionar inventario de productos con interfaz web integrada",
-    version="1.0.0",
-    docs_url="/api/docs",
-    redoc_url="/api/redoc"
+from .busqueda import ServicioBusqueda
+from .migraciones import ServicioMigraciones
+from .estadisticas import ServicioEstadisticas
+from .hashing import pool_hashing, PoolHashingSaturado
+from .metricas import metricas, DIRECTORIO_METRICAS, INTERVALO_VOLCADO_METRICAS
+from .instrumentacion import MiddlewareConsultas
+from .serializacion import (
+    RespuestaJSON, respuesta_json, construir_sin_validar,
+    ADAPTADOR_ARTICULO, ADAPTADOR_ARTICULOS, ADAPTADOR_LOTE_ARTICULOS, ADAPTADOR_PAGINA_ARTICULOS, ADAPTADOR_USUARIOS, ADAPTADOR_PEDIDOS
 )
-
-# Configurar CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # En producción, especificar dominios específicos
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from .idempotencia import (
+    ServicioIdempotencia, ClaveReutilizada, PeticionEnCurso, ReservaPerdida, LONGITUD_MAXIMA_CLAVE,
+    IDEMPOTENCY_CLEANUP_SECONDS
 )
+from .limitador import limitador, LimiteExcedido
+from .eventos import hub_eventos, HubSaturado
+from .accesos import buffer_accesos, LAST_ACCESS_FLUSH_SECONDS
+from .cache_http import cabeceras_catalogo, respuesta_no_modificada
+from .proyeccion import parsear_campos, modelo_proyectado, adaptador_proyeccion, adaptador_pagina_proyeccion
+from .importacion import ServicioImportacion, FORMATO_CSV, FORMATOS_NDJSON
+from . import schemas, models, estadisticas
+
+# Crear las tablas y aplicar las migraciones pendientes al arrancar. Con varios
+# workers conviene desactivarlo y ejecutar `python migrar_db.py` antes de lanzarlos
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true"
+
+# Rutas POST que solo leen (el cuerpo lleva los parámetros de la consulta):
+# no marcan al cliente para leer de la base de datos principal
+RUTAS_POST_SOLO_LECTURA = frozenset({"/api/articulos/lote"})
+
+class MiddlewareLecturaPropia:
+    """
+    Marca con una cookie de corta duración a los clientes que acaban de
+    escribir, para que durante unos segundos sus lecturas vayan a la base de
+    datos principal y vean sus propios cambios (ver `obtener_db_lectura`).
+    Las peticiones GET, HEAD y OPTIONS y las de RUTAS_POST_SOLO_LECTURA no
+    cuentan como escrituras.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in ("GET", "HEAD", "OPTIONS")
+            or (scope["method"] == "POST" and scope["path"] in RUTAS_POST_SOLO_LECTURA)
+            or engine_lectura is engine
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] < 400:
+                MutableHeaders(scope=mensaje).append(
+                    "set-cookie",
+                    f"{COOKIE_LEER_PRIMARIA}=1; Max-Age={DB_READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
+
+class MiddlewareMetricas:
+    """
+    Registra en las métricas cada petición HTTP: peticiones en curso, número
+    de peticiones por ruta y código de estado, y latencia por ruta.
+    
+    La ruta se etiqueta con su plantilla (`/api/articulos/{articulo_id}`) para
+    que el número de series no crezca con cada ID; las peticiones que no
+    coinciden con ninguna ruta se agrupan en "sin_ruta".
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        estado = 500
+        inicio = time.perf_counter()
+        
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+        
+        metodo = scope["method"]
+        metricas.sumar_indicador("http_requests_in_flight", 1)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            metricas.sumar_indicador("http_requests_in_flight", -1)
+            # FastAPI guarda en el scope la ruta que ha atendido la petición
+            ruta = scope.get("route")
+            plantilla = getattr(ruta, "path", None) or "sin_ruta"
+            metricas.observar("http_request_duration_seconds", time.perf_counter() - inicio, method=metodo, route=plantilla)
+            metricas.incrementar("http_requests_total", method=metodo, route=plantilla, status=str(estado))
+
+def preparar_base_datos():
+    """
+    Prepara la base de datos al arrancar: esquema y migraciones (si
+    DB_AUTO_MIGRATE está activo; incluyen el índice de búsqueda de texto
+    completo), reparación de ese índice y contadores de estadísticas.
+    """
+    if DB_AUTO_MIGRATE:
+        Base.metadata.create_all(bind=engine)
+        ServicioMigraciones.actualizar(engine)
+
+    # Reconstruir el índice de búsqueda si una carga masiva se quedó a medias
+    ServicioBusqueda.reparar_indice(engine)
+
+    # Inicializar los contadores de estadísticas en la base de datos principal:
+    # las lecturas pueden ir a conexiones de solo lectura que no pueden crearlos
+    with SessionLocal() as db:
+        ServicioEstadisticas.obtener_estadisticas(db)
+
+    registrar_configuracion_db()
+
+def limpiar_claves_idempotencia():
+    """Elimina las claves Idempotency-Key caducadas"""
+    with SessionLocal() as db:
+        ServicioIdempotencia.limpiar_expiradas(db)
+
+async def limpiar_claves_periodicamente():
+    """Limpia las claves Idempotency-Key caducadas cada IDEMPOTENCY_CLEANUP_SECONDS"""
+    while True:
+        try:
+            await run_in_threadpool(limpiar_claves_idempotencia)
+        except Exception:
+            logger.exception("Error al limpiar las claves de idempotencia")
+        await asyncio.sleep(IDEMPOTENCY_CLEANUP_SECONDS)
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    """
+    Arranque y parada de la aplicación. Importar este módulo no toca la base
+    de datos: todo el trabajo de arranque se hace aquí, una vez por worker.
+    """
+    # Dimensionar el threadpool donde FastAPI ejecuta las rutas y dependencias
+    # síncronas. Todas las rutas que usan la base de datos se declaran con `def`
+    # para que las consultas no bloqueen el event loop.
+    to_thread.current_default_thread_limiter().total_tokens = TAMANO_THREADPOOL_DB
+    await run_in_threadpool(preparar_base_datos)
+    hub_eventos.iniciar(asyncio.get_running_loop())
+    buffer_accesos.iniciar(engine, LAST_ACCESS_FLUSH_SECONDS)
+    # Con varios workers, cada uno vuelca sus métricas para que se puedan sumar
+    if DIRECTORIO_METRICAS:
+        metricas.iniciar_volcado(DIRECTORIO_METRICAS, INTERVALO_VOLCADO_METRICAS)
+    limpieza_idempotencia = asyncio.create_task(limpiar_claves_periodicamente())
+    yield
+    limpieza_idempotencia.cancel()
+    # Escribir los últimos accesos pendientes antes de cerrar las conexiones
+    await run_in_threadpool(buffer_accesos.detener)
+    if DIRECTORIO_METRICAS:
+        metricas.detener_volcado(DIRECTORIO_METRICAS)
+    engine.dispose()
+    if engine_lectura is not engine:
+        engine_lectura.dispose()
+
+def crear_app() -> FastAPI:
+    """
+    Crea la aplicación FastAPI con sus middlewares y rutas.
+    Se puede servir directamente con `uvicorn backend.main:crear_app --factory`.
+    """
+    # Inicializar la aplicación FastAPI
+    aplicacion = FastAPI(
+        title="Sistema de Gestión de Inventario",
+        description="API para gestionar inventario de productos con interfaz web integrada",
+        version="1.0.0",
+        docs_url="/api/docs",
+        redoc_url="/api/redoc",
+        default_response_class=RespuestaJSON,
+        lifespan=ciclo_de_vida
+    )
+
+    aplicacion.add_middleware(MiddlewareLecturaPropia)
+    aplicacion.add_middleware(MiddlewareConsultas)
+
+    # Configurar CORS
+    aplicacion.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # En producción, especificar dominios específicos
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # El último middleware añadido es el más externo: mide la petición completa
+    aplicacion.add_middleware(MiddlewareMetricas)
+
+    aplicacion.include_router(router)
+    return aplicacion
 
 # Rutas de la API
+router = APIRouter()
 
-@app.get("/")
+@router.get("/")
 async def raiz():
     """Página principal de la API"""
     return {
@@ -46,56 +231,213 @@ async def raiz():
         "estado": "funcionando"
     }
 
-@app.get("/api/salud")
+@router.get("/api/salud")
 async def verificar_salud():
     """Endpoint para verificar el estado de la API"""
     return {"mensaje": "API de inventario funcionando correctamente", "version": "1.0.0"}
 
-@app.get("/api/articulos", response_model=List[schemas.ArticuloInventario])
-async def listar_articulos(
+def leer_campos(campos: Optional[str], esquema):
+    """Valida el parámetro `campos` de un listado y convierte los errores en una respuesta 400"""
+    try:
+        return parsear_campos(campos, esquema)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+DESCRIPCION_CAMPOS = "Campos a devolver separados por comas (por ejemplo, nombre,precio,cantidad); id se incluye siempre"
+
+@router.get("/api/articulos", response_model=Union[List[schemas.ArticuloInventario], schemas.PaginaArticulos])
+def listar_articulos(
+    request: Request,
     saltar: int = Query(0, ge=0, description="Número de artículos a saltar"),
     limite: int = Query(100, ge=1, le=1000, description="Límite de artículos a devolver"),
-    buscar: Optional[str] = Query(None, description="Buscar artículos por nombre"),
-    db: Session = Depends(obtener_db)
+    buscar: Optional[str] = Query(None, description="Buscar artículos por nombre y descripción"),
+    cursor: Optional[str] = Query(None, description="Cursor de paginación (vacío para la primera página)"),
+    campos: Optional[str] = Query(None, description=DESCRIPCION_CAMPOS),
+    db: Session = Depends(obtener_db_lectura)
 ):
     """
     Obtiene la lista de artículos del inventario.
     
     - **saltar**: Número de artículos a saltar para paginación
     - **limite**: Máximo número de artículos a devolver
-    - **buscar**: Texto para buscar en los nombres de los artículos
+    - **buscar**: Texto para buscar en el nombre y la descripción de los artículos
+      (resultados ordenados por relevancia y paginados con saltar/limite)
+    - **cursor**: Activa la paginación por cursor. Se envía vacío para la primera
+      página y después el `siguiente_cursor` de la respuesta anterior. En este modo
+      la respuesta es un objeto con `articulos` y `siguiente_cursor`
+    - **campos**: Devuelve solo esos campos de cada artículo y solo lee esas
+      columnas (por ejemplo, `campos=nombre,precio,cantidad` para una cuadrícula
+      que no muestra la descripción)
+
+    Responde 304 sin consultar los artículos si la copia del cliente
+    (If-None-Match / If-Modified-Since) corresponde a la versión actual del catálogo.
     """
+    campos_articulo = leer_campos(campos, schemas.ArticuloInventario)
+    
+    cabeceras = cabeceras_catalogo(ServicioEstadisticas.obtener_version_catalogo(db))
+    no_modificada = respuesta_no_modificada(request, cabeceras)
+    if no_modificada:
+        return no_modificada
+    
+    if campos_articulo is None:
+        adaptador, adaptador_pagina = ADAPTADOR_ARTICULOS, ADAPTADOR_PAGINA_ARTICULOS
+    else:
+        adaptador = adaptador_proyeccion(schemas.ArticuloInventario, campos_articulo)
+        adaptador_pagina = adaptador_pagina_proyeccion(
+            schemas.PaginaArticulos, "articulos", schemas.ArticuloInventario, campos_articulo
+        )
+    
     try:
         if buscar:
-            articulos = ServicioInventario.buscar_articulos_por_nombre(db, buscar)
+            articulos = ServicioBusqueda.buscar_articulos(
+                db, buscar, saltar=saltar, limite=limite, campos=campos_articulo
+            )
+            respuesta = respuesta_json(adaptador, articulos)
+        elif cursor is not None:
+            articulos, siguiente_cursor = ServicioInventario.obtener_articulos_cursor(
+                db, cursor=cursor, limite=limite, campos=campos_articulo
+            )
+            respuesta = respuesta_json(
+                adaptador_pagina,
+                {"articulos": articulos, "siguiente_cursor": siguiente_cursor}
+            )
         else:
-            articulos = ServicioInventario.obtener_articulos(db, saltar=saltar, limite=limite)
-        return articulos
+            articulos = ServicioInventario.obtener_articulos(
+                db, saltar=saltar, limite=limite, campos=campos_articulo
+            )
+            respuesta = respuesta_json(adaptador, articulos)
+        respuesta.headers.update(cabeceras)
+        return respuesta
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener artículos: {str(e)}"
         )
 
-@app.get("/api/articulos/{articulo_id}", response_model=schemas.ArticuloInventario)
-async def obtener_articulo(articulo_id: int, db: Session = Depends(obtener_db)):
+@router.get("/api/articulos/eventos", response_class=StreamingResponse)
+async def eventos_articulos():
+    """
+    Stream de Server-Sent Events con los cambios del catálogo, para no tener
+    que volver a pedir el listado completo.
+    
+    - `articulo`: `{"id", "cantidad", "precio", "eliminado"}` tras crear,
+      modificar o eliminar un artículo y por cada artículo de un pedido
+    - `recargar`: el cliente debe volver a pedir el catálogo (importaciones o
+      cliente demasiado lento, en cuyo caso el servidor cierra la conexión)
+    """
+    try:
+        suscripcion = hub_eventos.suscribir()
+    except HubSaturado as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
+    return StreamingResponse(
+        hub_eventos.transmitir(suscripcion),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx no debe acumular el stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def responder_lote_articulos(db: Session, ids: List[int]) -> Response:
+    """
+    Busca los artículos con una sola consulta IN y los devuelve en el orden
+    pedido (sin repetir), junto con los IDs que no existen.
+    """
+    ids = list(dict.fromkeys(ids))
+    encontrados = ServicioInventario.obtener_articulos_por_ids(db, ids)
+    return respuesta_json(ADAPTADOR_LOTE_ARTICULOS, {
+        "articulos": [encontrados[articulo_id] for articulo_id in ids if articulo_id in encontrados],
+        "no_encontrados": [articulo_id for articulo_id in ids if articulo_id not in encontrados],
+    })
+
+@router.get("/api/articulos/lote", response_model=schemas.LoteArticulos)
+def obtener_lote_articulos(
+    request: Request,
+    ids: List[str] = Query([], description="IDs separados por comas (ids=1,2,3) o repetidos (ids=1&ids=2)"),
+    db: Session = Depends(obtener_db_lectura)
+):
+    """
+    Obtiene varios artículos por ID en una sola petición (por ejemplo, para
+    actualizar el precio y el stock de los artículos del carrito).
+    
+    Para carritos grandes, `POST /api/articulos/lote` acepta los IDs en el cuerpo.
+    Usa la versión del catálogo como ETag, igual que el listado.
+    """
+    try:
+        ids_pedidos = [int(valor) for texto in ids for valor in texto.split(",") if valor.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Los IDs deben ser números enteros separados por comas"
+        )
+    if not ids_pedidos or len(ids_pedidos) > schemas.MAX_IDS_LOTE:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Se deben pedir entre 1 y {schemas.MAX_IDS_LOTE} artículos"
+        )
+    
+    cabeceras = cabeceras_catalogo(ServicioEstadisticas.obtener_version_catalogo(db))
+    no_modificada = respuesta_no_modificada(request, cabeceras)
+    if no_modificada:
+        return no_modificada
+    
+    respuesta = responder_lote_articulos(db, ids_pedidos)
+    respuesta.headers.update(cabeceras)
+    return respuesta
+
+@router.post("/api/articulos/lote", response_model=schemas.LoteArticulos)
+def consultar_lote_articulos(
+    solicitud: schemas.SolicitudLoteArticulos,
+    db: Session = Depends(obtener_db_lectura)
+):
+    """
+    Variante de `GET /api/articulos/lote` con los IDs en el cuerpo, para
+    carritos que no caben en la URL.
+    """
+    return responder_lote_articulos(db, solicitud.ids)
+
+@router.get("/api/articulos/{articulo_id}", response_model=schemas.ArticuloInventario)
+def obtener_articulo(
+    articulo_id: int,
+    request: Request,
+    db: Session = Depends(obtener_db_lectura)
+):
     """
     Obtiene un artículo específico por su ID.
     
     - **articulo_id**: ID del artículo a obtener
+    
+    Usa la versión del catálogo como ETag, igual que el listado.
     """
+    cabeceras = cabeceras_catalogo(ServicioEstadisticas.obtener_version_catalogo(db))
+    no_modificada = respuesta_no_modificada(request, cabeceras)
+    if no_modificada:
+        return no_modificada
+    
     articulo = ServicioInventario.obtener_articulo(db, articulo_id)
     if articulo is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Artículo con ID {articulo_id} no encontrado"
         )
-    return articulo
+    respuesta = respuesta_json(ADAPTADOR_ARTICULO, articulo)
+    respuesta.headers.update(cabeceras)
+    return respuesta
 
-@app.post("/api/articulos", response_model=schemas.ArticuloInventario, status_code=status.HTTP_201_CREATED)
-async def crear_articulo(
+@router.post("/api/articulos", response_model=schemas.ArticuloInventario, status_code=status.HTTP_201_CREATED)
+def crear_articulo(
     articulo: schemas.ArticuloInventarioCrear, 
-    _: models.Usuario = Depends(obtener_usuario_admin),
+    _: schemas.UsuarioActual = Depends(obtener_usuario_admin),
     db: Session = Depends(obtener_db)
 ):
     """
@@ -121,11 +463,57 @@ async def crear_articulo(
             detail=f"Error al crear artículo: {str(e)}"
         )
 
-@app.put("/api/articulos/{articulo_id}", response_model=schemas.ArticuloInventario)
-async def actualizar_articulo(
+@router.post("/api/articulos/importar", response_model=schemas.ResultadoImportacion)
+async def importar_articulos(
+    request: Request,
+    tamano_lote: int = Query(500, ge=1, le=900, description="Filas por transacción"),
+    _: schemas.UsuarioActual = Depends(obtener_usuario_admin),
+    db: Session = Depends(obtener_db)
+):
+    """
+    Importa artículos en bloque desde el cuerpo de la petición (solo para administradores).
+    
+    - **Content-Type: text/csv**: cabecera `nombre,descripcion,cantidad,precio` y una fila por artículo
+    - **Content-Type: application/x-ndjson**: un objeto JSON por línea
+    - **tamano_lote**: Filas que se validan e insertan en cada transacción
+    
+    El cuerpo se procesa a medida que llega, sin cargarlo entero en memoria.
+    Las filas no válidas o con nombres ya existentes se omiten y se informan por número de fila.
+    """
+    formato = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if formato != FORMATO_CSV and formato not in FORMATOS_NDJSON:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Formato no soportado. Usa text/csv o application/x-ndjson"
+        )
+    
+    flujo = request.stream().__aiter__()
+    
+    def leer_fragmentos():
+        # Trae cada fragmento del cuerpo desde el event loop al hilo de la importación
+        while True:
+            try:
+                yield from_thread.run(flujo.__anext__)
+            except StopAsyncIteration:
+                return
+    
+    def importar():
+        filas = ServicioImportacion.leer_filas(leer_fragmentos(), formato)
+        return ServicioImportacion.importar_articulos(db, filas, tamano_lote=tamano_lote)
+    
+    try:
+        return await run_in_threadpool(importar)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al importar artículos: {str(e)}"
+        )
+
+@router.put("/api/articulos/{articulo_id}", response_model=schemas.ArticuloInventario)
+def actualizar_articulo(
     articulo_id: int, 
     articulo: schemas.ArticuloInventarioActualizar,
-    _: models.Usuario = Depends(obtener_usuario_admin),
+    _: schemas.UsuarioActual = Depends(obtener_usuario_admin),
     db: Session = Depends(obtener_db)
 ):
     """
@@ -158,10 +546,10 @@ async def actualizar_articulo(
             detail=f"Error al actualizar artículo: {str(e)}"
         )
 
-@app.delete("/api/articulos/{articulo_id}", response_model=schemas.MensajeRespuesta)
-async def eliminar_articulo(
+@router.delete("/api/articulos/{articulo_id}", response_model=schemas.MensajeRespuesta)
+def eliminar_articulo(
     articulo_id: int, 
-    _: models.Usuario = Depends(obtener_usuario_admin),
+    _: schemas.UsuarioActual = Depends(obtener_usuario_admin),
     db: Session = Depends(obtener_db)
 ):
     """
@@ -189,43 +577,27 @@ async def eliminar_articulo(
             detail=f"Error al eliminar artículo: {str(e)}"
         )
 
-@app.get("/api/estadisticas")
-async def obtener_estadisticas(db: Session = Depends(obtener_db)):
+@router.get("/api/estadisticas")
+def obtener_estadisticas(db: Session = Depends(obtener_db_lectura)):
     """
     Obtiene estadísticas completas del inventario y la tienda.
     """
     try:
-        # Estadísticas de inventario
-        total_articulos = ServicioInventario.obtener_total_articulos(db)
-        articulos = ServicioInventario.obtener_articulos(db, limite=1000)
-        
-        # Calcular estadísticas adicionales
-        productos_con_stock = len([a for a in articulos if a.cantidad > 0])
-        productos_sin_stock = len([a for a in articulos if a.cantidad == 0])
-        stock_total = sum(a.cantidad for a in articulos)
-        valor_total_inventario = sum(a.precio * a.cantidad for a in articulos)
-        
-        # Estadísticas de usuarios
-        usuarios = ServicioUsuarios.obtener_usuarios(db, limite=1000)
-        total_usuarios = len(usuarios)
-        
-        # Estadísticas de pedidos
-        pedidos = ServicioPedidos.obtener_todos_pedidos(db, limite=1000)
-        total_pedidos = len(pedidos)
+        contadores = ServicioEstadisticas.obtener_estadisticas(db)
         
         return {
             "inventario": {
-                "total_articulos": total_articulos,
-                "productos_con_stock": productos_con_stock,
-                "productos_sin_stock": productos_sin_stock,
-                "stock_total": stock_total,
-                "valor_total_inventario": round(valor_total_inventario, 2)
+                "total_articulos": int(contadores[estadisticas.TOTAL_ARTICULOS]),
+                "productos_con_stock": int(contadores[estadisticas.PRODUCTOS_CON_STOCK]),
+                "productos_sin_stock": int(contadores[estadisticas.PRODUCTOS_SIN_STOCK]),
+                "stock_total": int(contadores[estadisticas.STOCK_TOTAL]),
+                "valor_total_inventario": round(contadores[estadisticas.VALOR_TOTAL_INVENTARIO] / 100, 2)
             },
             "usuarios": {
-                "total_usuarios": total_usuarios
+                "total_usuarios": int(contadores[estadisticas.TOTAL_USUARIOS])
             },
             "pedidos": {
-                "total_pedidos": total_pedidos
+                "total_pedidos": int(contadores[estadisticas.TOTAL_PEDIDOS])
             },
             "mensaje": "Estadísticas obtenidas exitosamente"
         }
@@ -235,15 +607,58 @@ async def obtener_estadisticas(db: Session = Depends(obtener_db)):
             detail=f"Error al obtener estadísticas: {str(e)}"
         )
 
+@router.get("/api/metrics", response_class=PlainTextResponse)
+def exportar_metricas():
+    """
+    Métricas de la API en formato de texto de Prometheus: peticiones y
+    latencia por ruta, pool de conexiones y bcrypt. Con METRICS_DIR incluye
+    las de todos los workers.
+    
+    Se declara con `def` para ejecutarse en el threadpool: los recolectores
+    toman locks y con METRICS_DIR se leen los archivos de todos los workers.
+    """
+    return PlainTextResponse(
+        metricas.exportar(DIRECTORIO_METRICAS),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@router.get("/api/metricas/hashing")
+async def obtener_metricas_hashing(_: schemas.UsuarioActual = Depends(obtener_usuario_admin)):
+    """
+    Obtiene las métricas de uso del pool de hashing de contraseñas (solo para administradores).
+    """
+    return pool_hashing.obtener_metricas()
+
 # ===========================================
 # RUTAS DE AUTENTICACIÓN Y USUARIOS
 # ===========================================
 
-@app.post("/api/auth/registro", response_model=schemas.Token, status_code=status.HTTP_201_CREATED)
-async def registrar_usuario(usuario: schemas.UsuarioCrear, db: Session = Depends(obtener_db)):
+def error_hashing_saturado(e: PoolHashingSaturado) -> HTTPException:
+    """Convierte la saturación del pool de hashing en una respuesta 503"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": "1"}
+    )
+
+def comprobar_limite(request: Request, ruta: str, email: str) -> None:
+    """Aplica el limitador de peticiones y convierte un límite excedido en una respuesta 429"""
+    try:
+        limitador.comprobar(request, ruta, email)
+    except LimiteExcedido as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": limitador.segundos_reintento(e)}
+        )
+
+@router.post("/api/auth/registro", response_model=schemas.Token, status_code=status.HTTP_201_CREATED)
+def registrar_usuario(usuario: schemas.UsuarioCrear, request: Request, db: Session = Depends(obtener_db)):
     """
     Registra un nuevo usuario en el sistema.
     """
+    comprobar_limite(request, "registro", usuario.email)
+    
     # Verificar si el email ya existe
     usuario_existente = ServicioUsuarios.obtener_usuario_por_email(db, usuario.email)
     if usuario_existente:
@@ -258,8 +673,8 @@ async def registrar_usuario(usuario: schemas.UsuarioCrear, db: Session = Depends
         
         # Crear token de acceso
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = ServicioSeguridad.crear_access_token(
-            data={"sub": db_usuario.email}, expires_delta=access_token_expires
+        access_token = ServicioSeguridad.crear_token_usuario(
+            db_usuario, expires_delta=access_token_expires
         )
         
         return schemas.Token(
@@ -268,18 +683,26 @@ async def registrar_usuario(usuario: schemas.UsuarioCrear, db: Session = Depends
             usuario=schemas.Usuario.model_validate(db_usuario)
         )
         
+    except PoolHashingSaturado as e:
+        raise error_hashing_saturado(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al registrar usuario: {str(e)}"
         )
 
-@app.post("/api/auth/login", response_model=schemas.Token)
-async def login_usuario(credenciales: schemas.UsuarioLogin, db: Session = Depends(obtener_db)):
+@router.post("/api/auth/login", response_model=schemas.Token)
+def login_usuario(credenciales: schemas.UsuarioLogin, request: Request, db: Session = Depends(obtener_db)):
     """
     Autentica un usuario y devuelve un token de acceso.
     """
-    usuario = ServicioUsuarios.autenticar_usuario(db, credenciales.email, credenciales.password)
+    comprobar_limite(request, "login", credenciales.email)
+    
+    try:
+        usuario = ServicioUsuarios.autenticar_usuario(db, credenciales.email, credenciales.password)
+    except PoolHashingSaturado as e:
+        raise error_hashing_saturado(e)
+    
     if not usuario:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -288,8 +711,8 @@ async def login_usuario(credenciales: schemas.UsuarioLogin, db: Session = Depend
         )
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = ServicioSeguridad.crear_access_token(
-        data={"sub": usuario.email}, expires_delta=access_token_expires
+    access_token = ServicioSeguridad.crear_token_usuario(
+        usuario, expires_delta=access_token_expires
     )
     
     return schemas.Token(
@@ -298,82 +721,186 @@ async def login_usuario(credenciales: schemas.UsuarioLogin, db: Session = Depend
         usuario=schemas.Usuario.model_validate(usuario)
     )
 
-@app.get("/api/auth/perfil", response_model=schemas.Usuario)
-async def obtener_perfil(usuario_actual: models.Usuario = Depends(obtener_usuario_actual)):
+@router.get("/api/auth/perfil", response_model=schemas.Usuario)
+def obtener_perfil(
+    usuario_actual: schemas.UsuarioActual = Depends(obtener_usuario_actual),
+    db: Session = Depends(obtener_db_lectura)
+):
     """
     Obtiene el perfil del usuario autenticado.
     """
-    return schemas.Usuario.model_validate(usuario_actual)
+    usuario = ServicioUsuarios.obtener_usuario_por_id(db, usuario_actual.id)
+    if usuario is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado"
+        )
+    return schemas.Usuario.model_validate(usuario)
 
-@app.get("/api/usuarios", response_model=List[schemas.Usuario])
-async def listar_usuarios(
+@router.get("/api/usuarios", response_model=List[schemas.Usuario])
+def listar_usuarios(
     saltar: int = Query(0, ge=0),
     limite: int = Query(100, ge=1, le=1000),
-    _: models.Usuario = Depends(obtener_usuario_admin),
-    db: Session = Depends(obtener_db)
+    campos: Optional[str] = Query(None, description=DESCRIPCION_CAMPOS),
+    _: schemas.UsuarioActual = Depends(obtener_usuario_admin),
+    db: Session = Depends(obtener_db_lectura)
 ):
     """
     Lista todos los usuarios (solo para administradores).
+    
+    - **campos**: Devuelve solo esos campos de cada usuario y solo lee esas columnas
     """
+    campos_usuario = leer_campos(campos, schemas.Usuario)
     try:
-        usuarios = ServicioUsuarios.obtener_usuarios(db, saltar=saltar, limite=limite)
-        return [schemas.Usuario.model_validate(usuario) for usuario in usuarios]
+        usuarios = ServicioUsuarios.obtener_usuarios(db, saltar=saltar, limite=limite, campos=campos_usuario)
+        # Los datos de la base de datos ya se validaron al guardarse (EmailStr es caro)
+        if campos_usuario is None:
+            return respuesta_json(
+                ADAPTADOR_USUARIOS, construir_sin_validar(schemas.Usuario, usuarios), validar=False
+            )
+        esquema = modelo_proyectado(schemas.Usuario, campos_usuario)
+        return respuesta_json(
+            adaptador_proyeccion(schemas.Usuario, campos_usuario),
+            construir_sin_validar(esquema, usuarios),
+            validar=False
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener usuarios: {str(e)}"
         )
 
+@router.put("/api/usuarios/{usuario_id}/estado", response_model=schemas.Usuario)
+def actualizar_estado_usuario(
+    usuario_id: int,
+    activo: bool = Query(..., description="True para activar el usuario, False para desactivarlo"),
+    _: schemas.UsuarioActual = Depends(obtener_usuario_admin),
+    db: Session = Depends(obtener_db)
+):
+    """
+    Activa o desactiva un usuario (solo para administradores).
+    Los tokens de un usuario desactivado dejan de aceptarse como máximo tras
+    el TTL de la caché de autenticación (AUTH_CACHE_TTL).
+    """
+    usuario = ServicioUsuarios.actualizar_activo(db, usuario_id, activo)
+    if usuario is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Usuario con ID {usuario_id} no encontrado"
+        )
+    return schemas.Usuario.model_validate(usuario)
+
 # ===========================================
 # RUTAS DE PEDIDOS
 # ===========================================
 
-@app.post("/api/pedidos", response_model=schemas.Pedido, status_code=status.HTTP_201_CREATED)
-async def crear_pedido(
+@router.post("/api/pedidos", response_model=schemas.Pedido, status_code=status.HTTP_201_CREATED)
+def crear_pedido(
     pedido: schemas.PedidoCrear,
-    usuario_actual: models.Usuario = Depends(obtener_usuario_actual),
+    idempotency_key: Optional[str] = Header(
+        None, description="Clave única del pedido: los reintentos con la misma clave no crean otro pedido"
+    ),
+    usuario_actual: schemas.UsuarioActual = Depends(obtener_usuario_actual),
     db: Session = Depends(obtener_db)
 ):
     """
     Crea un nuevo pedido para el usuario autenticado.
+    
+    Con la cabecera `Idempotency-Key`, repetir la petición (por ejemplo, un
+    reintento tras un timeout) devuelve la respuesta original sin crear otro
+    pedido ni volver a descontar stock. Reutilizar la clave con otro cuerpo
+    devuelve 422 y, si la petición original sigue en curso, 409.
     """
+    reserva = None
+    if idempotency_key is not None:
+        if not idempotency_key or len(idempotency_key) > LONGITUD_MAXIMA_CLAVE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La cabecera Idempotency-Key debe tener entre 1 y {LONGITUD_MAXIMA_CLAVE} caracteres"
+            )
+        try:
+            reserva = ServicioIdempotencia.reservar(
+                db, idempotency_key, usuario_actual.id,
+                ServicioIdempotencia.calcular_hash(pedido.model_dump_json())
+            )
+        except ClaveReutilizada as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+        except PeticionEnCurso as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e), headers={"Retry-After": "1"})
+        if reserva.original is not None:
+            return repetir_respuesta_pedido(db, reserva.original)
+    
     try:
-        db_pedido = ServicioPedidos.crear_pedido(db, pedido, usuario_actual.id)
+        db_pedido = ServicioPedidos.crear_pedido(db, pedido, usuario_actual.id, reserva_idempotencia=reserva)
         
         # Construir respuesta con información completa
-        pedido_respuesta = construir_respuesta_pedido(db, db_pedido)
-        return pedido_respuesta
+        cuerpo = construir_respuesta_pedido(db, db_pedido).model_dump_json()
         
+    except ReservaPerdida as e:
+        # Otra petición con la misma clave tomó la reserva: el pedido no se ha creado
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e:
+        if reserva is not None:
+            ServicioIdempotencia.liberar(db, reserva)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
+        if reserva is not None:
+            ServicioIdempotencia.liberar(db, reserva)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al crear pedido: {str(e)}"
         )
+    
+    if reserva is not None:
+        ServicioIdempotencia.guardar_respuesta(db, reserva, cuerpo)
+    return Response(content=cuerpo, status_code=status.HTTP_201_CREATED, media_type="application/json")
+
+def repetir_respuesta_pedido(db: Session, original: models.ClaveIdempotencia) -> Response:
+    """
+    Devuelve la respuesta de la petición original de una clave Idempotency-Key.
+    Si no llegó a guardarse (el worker cayó justo después de crear el pedido),
+    se reconstruye a partir del pedido.
+    """
+    cuerpo = original.respuesta
+    if cuerpo is None:
+        pedido = ServicioPedidos.obtener_pedido_por_id(db, original.pedido_id)
+        cuerpo = construir_respuesta_pedido(db, pedido).model_dump_json()
+    return Response(
+        content=cuerpo,
+        status_code=original.codigo_respuesta or status.HTTP_201_CREATED,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"}
+    )
 
-@app.get("/api/pedidos", response_model=List[schemas.Pedido])
-async def listar_pedidos(
+@router.get("/api/pedidos", response_model=List[schemas.Pedido])
+def listar_pedidos(
     saltar: int = Query(0, ge=0),
     limite: int = Query(100, ge=1, le=1000),
-    usuario_actual: models.Usuario = Depends(obtener_usuario_actual),
-    db: Session = Depends(obtener_db)
+    campos: Optional[str] = Query(None, description=DESCRIPCION_CAMPOS),
+    usuario_actual: schemas.UsuarioActual = Depends(obtener_usuario_actual),
+    db: Session = Depends(obtener_db_lectura)
 ):
     """
     Lista los pedidos del usuario autenticado, o todos los pedidos si es admin.
+    
+    - **campos**: Devuelve solo esos campos de cada pedido. Sin `items` no se
+      consultan los items y sin `usuario_email` no se une la tabla de usuarios
     """
+    campos_pedido = leer_campos(campos, schemas.Pedido)
     try:
         if usuario_actual.rol == "admin":
             # Los admins pueden ver todos los pedidos
-            pedidos = ServicioPedidos.obtener_todos_pedidos(db, saltar=saltar, limite=limite)
+            pedidos = ServicioPedidos.obtener_todos_pedidos(db, saltar=saltar, limite=limite, campos=campos_pedido)
         else:
             # Los clientes solo ven sus propios pedidos
-            pedidos = ServicioPedidos.obtener_pedidos_usuario(db, usuario_actual.id)
+            pedidos = ServicioPedidos.obtener_pedidos_usuario(db, usuario_actual.id, campos=campos_pedido)
         
-        return [construir_respuesta_pedido(db, pedido) for pedido in pedidos]
+        # Los pedidos ya se construyen como esquemas: solo falta codificarlos
+        adaptador = ADAPTADOR_PEDIDOS if campos_pedido is None else adaptador_proyeccion(schemas.Pedido, campos_pedido)
+        return respuesta_json(adaptador, construir_respuestas_pedidos(db, pedidos, campos_pedido), validar=False)
         
     except Exception as e:
         raise HTTPException(
@@ -381,11 +908,11 @@ async def listar_pedidos(
             detail=f"Error al obtener pedidos: {str(e)}"
         )
 
-@app.get("/api/pedidos/{pedido_id}", response_model=schemas.Pedido)
-async def obtener_pedido(
+@router.get("/api/pedidos/{pedido_id}", response_model=schemas.Pedido)
+def obtener_pedido(
     pedido_id: int,
-    usuario_actual: models.Usuario = Depends(obtener_usuario_actual),
-    db: Session = Depends(obtener_db)
+    usuario_actual: schemas.UsuarioActual = Depends(obtener_usuario_actual),
+    db: Session = Depends(obtener_db_lectura)
 ):
     """
     Obtiene un pedido específico por ID.
@@ -406,11 +933,11 @@ async def obtener_pedido(
     
     return construir_respuesta_pedido(db, pedido)
 
-@app.put("/api/pedidos/{pedido_id}/estado", response_model=schemas.Pedido)
-async def actualizar_estado_pedido(
+@router.put("/api/pedidos/{pedido_id}/estado", response_model=schemas.Pedido)
+def actualizar_estado_pedido(
     pedido_id: int,
     nuevo_estado: str = Query(..., regex="^(pendiente|procesando|enviado|entregado|cancelado)$"),
-    _: models.Usuario = Depends(obtener_usuario_admin),
+    _: schemas.UsuarioActual = Depends(obtener_usuario_admin),
     db: Session = Depends(obtener_db)
 ):
     """
@@ -432,41 +959,71 @@ async def actualizar_estado_pedido(
             detail=f"Error al actualizar estado del pedido: {str(e)}"
         )
 
+def construir_respuestas_pedidos(
+    db: Session,
+    pedidos: List[models.Pedido],
+    campos: Optional[Tuple[str, ...]] = None
+) -> List[schemas.Pedido]:
+    """
+    Construye las respuestas completas de varios pedidos con todos sus items.
+    Los items de todos los pedidos se obtienen con una sola consulta; el usuario
+    de cada pedido debe venir precargado por ServicioPedidos.
+    
+    Con `campos` construye el esquema reducido con solo esos campos (los
+    pedidos deben venir de ServicioPedidos con los mismos `campos`).
+    """
+    if campos is not None:
+        return construir_respuestas_pedidos_proyectadas(db, pedidos, campos)
+    
+    items_por_pedido = ServicioPedidos.obtener_items_pedidos(db, [pedido.id for pedido in pedidos])
+    
+    return [
+        schemas.Pedido(
+            id=pedido.id,
+            usuario_id=pedido.usuario_id,
+            usuario_email=pedido.usuario.email,
+            total=pedido.total,
+            estado=pedido.estado,
+            fecha_pedido=pedido.fecha_pedido,
+            fecha_actualizacion=pedido.fecha_actualizacion,
+            direccion_envio=pedido.direccion_envio,
+            notas=pedido.notas,
+            items=items_por_pedido[pedido.id]
+        )
+        for pedido in pedidos
+    ]
+
+def construir_respuestas_pedidos_proyectadas(
+    db: Session,
+    pedidos: List[models.Pedido],
+    campos: Tuple[str, ...]
+) -> List[BaseModel]:
+    """Construye las respuestas de varios pedidos con solo `campos`, sin leer lo que no se pide"""
+    items_por_pedido = {}
+    if "items" in campos:
+        items_por_pedido = ServicioPedidos.obtener_items_pedidos(db, [pedido.id for pedido in pedidos])
+    valores = {
+        "usuario_email": lambda pedido: pedido.usuario.email,
+        "items": lambda pedido: items_por_pedido[pedido.id],
+    }
+    
+    esquema = modelo_proyectado(schemas.Pedido, campos)
+    return [
+        esquema.model_construct(**{
+            campo: valores[campo](pedido) if campo in valores else getattr(pedido, campo)
+            for campo in campos
+        })
+        for pedido in pedidos
+    ]
+
 def construir_respuesta_pedido(db: Session, pedido: models.Pedido) -> schemas.Pedido:
     """
     Construye la respuesta completa de un pedido con todos sus items.
     """
-    # Obtener items del pedido
-    items_query = db.execute(
-        "SELECT pa.articulo_id, pa.cantidad, pa.precio_unitario, ai.nombre "
-        "FROM pedido_articulos pa "
-        "JOIN articulos_inventario ai ON pa.articulo_id = ai.id "
-        "WHERE pa.pedido_id = :pedido_id",
-        {"pedido_id": pedido.id}
-    ).fetchall()
-    
-    items = []
-    for item in items_query:
-        items.append(schemas.PedidoItem(
-            articulo_id=item[0],
-            nombre_articulo=item[3],
-            cantidad=item[1],
-            precio_unitario=item[2],
-            subtotal=item[1] * item[2]
-        ))
-    
-    return schemas.Pedido(
-        id=pedido.id,
-        usuario_id=pedido.usuario_id,
-        usuario_email=pedido.usuario.email,
-        total=pedido.total,
-        estado=pedido.estado,
-        fecha_pedido=pedido.fecha_pedido,
-        fecha_actualizacion=pedido.fecha_actualizacion,
-        direccion_envio=pedido.direccion_envio,
-        notas=pedido.notas,
-        items=items
-    )
+    return construir_respuestas_pedidos(db, [pedido])[0]
+
+# Aplicación que sirven uvicorn y gunicorn (backend.main:app)
+app = crear_app()
 
 # Montar archivos estáticos del frontend (opcional)
 # frontend_build_path = Path("frontend/build")
@@ -0,0 +1,229 @@
+import glob
+import json
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Directorio compartido por los workers para agregar sus métricas. Sin él, cada
+# worker solo expone las suyas (suficiente con un único proceso)
+DIRECTORIO_METRICAS = os.getenv("METRICS_DIR")
+
+# Segundos entre volcados de las métricas de cada worker al directorio compartido
+INTERVALO_VOLCADO_METRICAS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# Límites (en segundos) de las cubetas de los histogramas de latencia
+CUBETAS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+class RegistroMetricas:
+    """
+    Registro en memoria de métricas al estilo Prometheus (contadores,
+    indicadores e histogramas con etiquetas), sin dependencias externas.
+
+    Registrar una observación es un incremento bajo un lock, así que se puede
+    dejar activo con toda la carga. Con varios workers, cada uno vuelca
+    periódicamente sus valores a un archivo en DIRECTORIO_METRICAS y la ruta de
+    métricas suma los de todos los procesos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores: Dict[Tuple[str, Etiquetas], float] = {}
+        self._indicadores: Dict[Tuple[str, Etiquetas], float] = {}
+        self._histogramas: Dict[Tuple[str, Etiquetas], List[float]] = {}
+        self._ayuda: Dict[str, Tuple[str, str]] = {}
+        self._recolectores: List[Callable[["RegistroMetricas"], None]] = []
+        self._detener_volcado: Optional[threading.Event] = None
+
+    def describir(self, nombre: str, tipo: str, ayuda: str) -> None:
+        """Declara el tipo (counter, gauge, histogram) y la descripción de una métrica"""
+        self._ayuda[nombre] = (tipo, ayuda)
+
+    def incrementar(self, nombre: str, valor: float = 1, **etiquetas: str) -> None:
+        """Suma `valor` a un contador"""
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def fijar(self, nombre: str, valor: float, **etiquetas: str) -> None:
+        """Fija el valor actual de un indicador"""
+        with self._lock:
+            self._indicadores[(nombre, tuple(sorted(etiquetas.items())))] = valor
+
+    def sumar_indicador(self, nombre: str, valor: float, **etiquetas: str) -> None:
+        """Suma `valor` (puede ser negativo) a un indicador"""
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._indicadores[clave] = self._indicadores.get(clave, 0) + valor
+
+    def observar(self, nombre: str, valor: float, **etiquetas: str) -> None:
+        """Registra una observación en un histograma con las cubetas de latencia"""
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        indice = bisect_left(CUBETAS_LATENCIA, valor)
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                # Un valor por cubeta, la cubeta +Inf, la suma y el número de observaciones
+                histograma = self._histogramas[clave] = [0.0] * (len(CUBETAS_LATENCIA) + 3)
+            histograma[indice] += 1
+            histograma[-2] += valor
+            histograma[-1] += 1
+
+    def agregar_recolector(self, recolector: Callable[["RegistroMetricas"], None]) -> None:
+        """
+        Añade una función que actualiza indicadores justo antes de exportar
+        (por ejemplo, el estado del pool de conexiones).
+        """
+        self._recolectores.append(recolector)
+
+    def instantanea(self) -> dict:
+        """Devuelve una copia serializable de todas las métricas de este proceso"""
+        for recolector in self._recolectores:
+            recolector(self)
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "contadores": [[n, list(e), v] for (n, e), v in self._contadores.items()],
+                "indicadores": [[n, list(e), v] for (n, e), v in self._indicadores.items()],
+                "histogramas": [[n, list(e), list(h)] for (n, e), h in self._histogramas.items()],
+            }
+
+    # Agregación entre workers
+
+    def volcar(self, directorio: str) -> None:
+        """Escribe la instantánea de este proceso en el directorio compartido"""
+        ruta = os.path.join(directorio, f"metricas-{os.getpid()}.json")
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(self.instantanea(), archivo)
+        os.replace(temporal, ruta)
+
+    def iniciar_volcado(self, directorio: str, intervalo: float) -> None:
+        """Vuelca las métricas al directorio compartido cada `intervalo` segundos en segundo plano"""
+        os.makedirs(directorio, exist_ok=True)
+        self._detener_volcado = detener = threading.Event()
+
+        def volcar_periodicamente():
+            while not detener.wait(intervalo):
+                self.volcar(directorio)
+
+        self.volcar(directorio)
+        threading.Thread(target=volcar_periodicamente, name="volcado-metricas", daemon=True).start()
+
+    def detener_volcado(self, directorio: str) -> None:
+        """Detiene el volcado periódico y hace un último volcado"""
+        if self._detener_volcado is not None:
+            self._detener_volcado.set()
+            self._detener_volcado = None
+            self.volcar(directorio)
+
+    @staticmethod
+    def _proceso_vivo(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def agregar(self, directorio: Optional[str]) -> dict:
+        """
+        Suma las métricas de todos los workers. Los contadores e histogramas de
+        workers ya terminados se conservan (Prometheus espera que no bajen);
+        los indicadores solo cuentan los de procesos vivos.
+        """
+        instantaneas = {os.getpid(): self.instantanea()}
+        if directorio:
+            for ruta in glob.glob(os.path.join(directorio, "metricas-*.json")):
+                try:
+                    with open(ruta, encoding="utf-8") as archivo:
+                        datos = json.load(archivo)
+                except (OSError, ValueError):
+                    continue
+                instantaneas.setdefault(datos["pid"], datos)
+
+        contadores: Dict[Tuple[str, Etiquetas], float] = {}
+        indicadores: Dict[Tuple[str, Etiquetas], float] = {}
+        histogramas: Dict[Tuple[str, Etiquetas], List[float]] = {}
+        for pid, datos in instantaneas.items():
+            for nombre, etiquetas, valor in datos["contadores"]:
+                clave = (nombre, tuple(map(tuple, etiquetas)))
+                contadores[clave] = contadores.get(clave, 0) + valor
+            if pid == os.getpid() or self._proceso_vivo(pid):
+                for nombre, etiquetas, valor in datos["indicadores"]:
+                    clave = (nombre, tuple(map(tuple, etiquetas)))
+                    indicadores[clave] = indicadores.get(clave, 0) + valor
+            for nombre, etiquetas, valores in datos["histogramas"]:
+                clave = (nombre, tuple(map(tuple, etiquetas)))
+                acumulado = histogramas.setdefault(clave, [0.0] * len(valores))
+                for i, valor in enumerate(valores):
+                    acumulado[i] += valor
+        return {"contadores": contadores, "indicadores": indicadores, "histogramas": histogramas}
+
+    # Exportación
+
+    @staticmethod
+    def _formatear_etiquetas(etiquetas: Etiquetas, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pares = tuple(etiquetas) + extra
+        if not pares:
+            return ""
+        valores = ",".join(
+            f'{clave}="{str(valor).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+            for clave, valor in pares
+        )
+        return "{" + valores + "}"
+
+    @staticmethod
+    def _formatear_numero(valor: float) -> str:
+        return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+    def exportar(self, directorio: Optional[str] = None) -> str:
+        """Devuelve las métricas (de todos los workers si hay directorio) en formato de texto de Prometheus"""
+        datos = self.agregar(directorio)
+        lineas: List[str] = []
+        series: Dict[str, List[str]] = {}
+
+        for (nombre, etiquetas), valor in sorted(datos["contadores"].items()):
+            series.setdefault(nombre, []).append(
+                f"{nombre}{self._formatear_etiquetas(etiquetas)} {self._formatear_numero(valor)}"
+            )
+        for (nombre, etiquetas), valor in sorted(datos["indicadores"].items()):
+            series.setdefault(nombre, []).append(
+                f"{nombre}{self._formatear_etiquetas(etiquetas)} {self._formatear_numero(valor)}"
+            )
+        for (nombre, etiquetas), valores in sorted(datos["histogramas"].items()):
+            acumulado = 0.0
+            for limite, cantidad in zip(CUBETAS_LATENCIA + (float("inf"),), valores):
+                acumulado += cantidad
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                series.setdefault(nombre, []).append(
+                    f"{nombre}_bucket{self._formatear_etiquetas(etiquetas, (('le', le),))} {self._formatear_numero(acumulado)}"
+                )
+            series[nombre].append(f"{nombre}_sum{self._formatear_etiquetas(etiquetas)} {repr(float(valores[-2]))}")
+            series[nombre].append(f"{nombre}_count{self._formatear_etiquetas(etiquetas)} {self._formatear_numero(valores[-1])}")
+
+        for nombre in sorted(series):
+            if nombre in self._ayuda:
+                tipo, ayuda = self._ayuda[nombre]
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+            lineas.extend(series[nombre])
+        return "\n".join(lineas) + "\n"
+
+# Registro compartido por todo el proceso
+metricas = RegistroMetricas()
+
+metricas.describir("http_requests_total", "counter", "Peticiones HTTP atendidas por método, ruta y código de estado")
+metricas.describir("http_request_duration_seconds", "histogram", "Latencia de las peticiones HTTP por método y ruta")
+metricas.describir("http_requests_in_flight", "gauge", "Peticiones HTTP en curso")
+metricas.describir("db_pool_checkouts_total", "counter", "Conexiones entregadas por el pool de base de datos")
+metricas.describir("db_pool_checkout_wait_seconds", "histogram", "Tiempo de espera por una conexión del pool")
+metricas.describir("db_pool_timeouts_total", "counter", "Esperas por una conexión del pool que agotaron el timeout")
+metricas.describir("db_pool_size", "gauge", "Tamaño configurado del pool de conexiones")
+metricas.describir("db_pool_checked_out", "gauge", "Conexiones del pool en uso")
+metricas.describir("db_pool_overflow", "gauge", "Conexiones abiertas por encima del tamaño del pool")
+metricas.describir("bcrypt_operations_total", "counter", "Operaciones de bcrypt por operación y resultado")
+metricas.describir("bcrypt_duration_seconds", "histogram", "Duración de las operaciones de bcrypt, incluida la espera en el pool de hashing")
@@ -0,0 +1,96 @@
+"""
+Migraciones versionadas del esquema de la base de datos.
+
+`Base.metadata.create_all` solo crea lo que falta en tablas nuevas, así que los
+cambios sobre tablas existentes (índices, columnas) se hacen con migraciones.
+Cada migración es un módulo de este paquete llamado `mNNNN_descripcion.py`
+con una constante DESCRIPCION y una función `aplicar(conexion)`; se aplican
+en orden de versión y cada una se registra en la tabla `migraciones_esquema`.
+
+Las migraciones también se ejecutan sobre bases de datos recién creadas con
+`create_all`, por lo que deben poder repetirse sin error (por ejemplo,
+`CREATE INDEX IF NOT EXISTS`).
+"""
+
+import importlib
+import pkgutil
+import re
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from .. import models
+
+PATRON_MIGRACION = re.compile(r"^m(\d{4})_\w+$")
+
+class ServicioMigraciones:
+    """
+    Servicio para consultar y aplicar las migraciones de esquema.
+    """
+
+    @staticmethod
+    def listar_migraciones() -> List[Tuple[int, str, ModuleType]]:
+        """
+        Devuelve las migraciones disponibles como (versión, nombre, módulo), ordenadas.
+        """
+        migraciones = []
+        for modulo in pkgutil.iter_modules(__path__):
+            coincidencia = PATRON_MIGRACION.match(modulo.name)
+            if coincidencia:
+                migraciones.append((
+                    int(coincidencia.group(1)),
+                    modulo.name,
+                    importlib.import_module(f"{__name__}.{modulo.name}")
+                ))
+        migraciones.sort(key=lambda migracion: migracion[0])
+
+        versiones = [version for version, _, _ in migraciones]
+        if len(versiones) != len(set(versiones)):
+            raise ValueError("Hay migraciones con el mismo número de versión")
+        return migraciones
+
+    @staticmethod
+    def obtener_versiones_aplicadas(engine: Engine) -> Dict[int, str]:
+        """
+        Devuelve {versión: nombre} de las migraciones ya aplicadas.
+        """
+        tabla = models.MigracionEsquema.__table__
+        with engine.begin() as conexion:
+            tabla.create(conexion, checkfirst=True)
+            return dict(conexion.execute(select(tabla.c.version, tabla.c.nombre)).all())
+
+    @staticmethod
+    def obtener_pendientes(engine: Engine) -> List[Tuple[int, str, ModuleType]]:
+        """
+        Devuelve las migraciones que aún no se han aplicado.
+        """
+        aplicadas = ServicioMigraciones.obtener_versiones_aplicadas(engine)
+        return [migracion for migracion in ServicioMigraciones.listar_migraciones() if migracion[0] not in aplicadas]
+
+    @staticmethod
+    def actualizar(engine: Engine, hasta: Optional[int] = None) -> List[str]:
+        """
+        Aplica en orden las migraciones pendientes.
+
+        Args:
+            engine: Engine de la base de datos principal
+            hasta: Última versión a aplicar (todas si es None)
+
+        Returns:
+            Nombres de las migraciones aplicadas
+        """
+        tabla = models.MigracionEsquema.__table__
+        aplicadas = []
+        for version, nombre, modulo in ServicioMigraciones.obtener_pendientes(engine):
+            if hasta is not None and version > hasta:
+                break
+            try:
+                with engine.begin() as conexion:
+                    modulo.aplicar(conexion)
+                    conexion.execute(tabla.insert(), {"version": version, "nombre": nombre})
+            except IntegrityError:
+                # Otro proceso (por ejemplo, otro worker al arrancar) la aplicó a la vez
+                continue
+            aplicadas.append(nombre)
+        return aplicadas
@@ -0,0 +1,25 @@
+"""
+Índices para las consultas más frecuentes:
+- pedidos de un usuario ordenados por fecha (obtener_pedidos_usuario)
+- todos los pedidos ordenados por fecha (obtener_todos_pedidos)
+- usuarios ordenados por fecha de alta (obtener_usuarios)
+- líneas de pedido por artículo (la clave primaria empieza por pedido_id)
+- paginación por cursor de artículos (fecha de creación e ID)
+"""
+
+from sqlalchemy import text
+
+DESCRIPCION = "Índices de rendimiento para pedidos, usuarios y artículos"
+
+INDICES = (
+    "CREATE INDEX IF NOT EXISTS ix_pedidos_usuario_id_fecha_pedido ON pedidos (usuario_id, fecha_pedido)",
+    "CREATE INDEX IF NOT EXISTS ix_pedidos_fecha_pedido ON pedidos (fecha_pedido)",
+    "CREATE INDEX IF NOT EXISTS ix_usuarios_fecha_creacion ON usuarios (fecha_creacion)",
+    "CREATE INDEX IF NOT EXISTS ix_pedido_articulos_articulo_id ON pedido_articulos (articulo_id)",
+    "CREATE INDEX IF NOT EXISTS ix_articulos_inventario_fecha_creacion_id ON articulos_inventario (fecha_creacion, id)",
+)
+
+def aplicar(conexion):
+    """Crea los índices que falten"""
+    for sentencia in INDICES:
+        conexion.execute(text(sentencia))
@@ -0,0 +1,35 @@
+"""
+Tabla de claves Idempotency-Key para POST /api/pedidos: un reintento con la
+misma clave devuelve la respuesta original en lugar de crear otro pedido.
+
+El DDL está escrito a mano (y no tomado de models.ClaveIdempotencia) para que
+la migración cree siempre la misma tabla aunque el modelo cambie después.
+"""
+
+from sqlalchemy import text
+
+DESCRIPCION = "Tabla de claves de idempotencia de pedidos"
+
+SENTENCIAS = (
+    """
+    CREATE TABLE IF NOT EXISTS claves_idempotencia (
+        clave VARCHAR(255) NOT NULL,
+        usuario_id INTEGER NOT NULL,
+        hash_peticion VARCHAR(64) NOT NULL,
+        estado VARCHAR(20) NOT NULL,
+        pedido_id INTEGER,
+        codigo_respuesta INTEGER,
+        respuesta TEXT,
+        fecha_creacion TIMESTAMP NOT NULL,
+        PRIMARY KEY (clave, usuario_id),
+        FOREIGN KEY (usuario_id) REFERENCES usuarios (id),
+        FOREIGN KEY (pedido_id) REFERENCES pedidos (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_claves_idempotencia_fecha_creacion ON claves_idempotencia (fecha_creacion)",
+)
+
+def aplicar(conexion):
+    """Crea la tabla (y su índice por fecha) si no existe"""
+    for sentencia in SENTENCIAS:
+        conexion.execute(text(sentencia))
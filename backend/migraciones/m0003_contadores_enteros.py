@@ -0,0 +1,28 @@
+"""
+Contadores de estadísticas enteros: el valor del inventario pasa a guardarse
+en céntimos para que los deltas sumados no acumulen error de coma flotante.
+
+La tabla solo guarda agregados que se pueden recalcular a partir de los
+datos, así que se vuelve a crear vacía y `ServicioEstadisticas` la rellena
+con `recalcular` en el siguiente arranque.
+"""
+
+from sqlalchemy import text
+
+DESCRIPCION = "Contadores de estadísticas enteros (valor del inventario en céntimos)"
+
+SENTENCIAS = (
+    "DROP TABLE IF EXISTS estadisticas_contadores",
+    """
+    CREATE TABLE estadisticas_contadores (
+        clave VARCHAR(50) NOT NULL,
+        valor BIGINT NOT NULL,
+        PRIMARY KEY (clave)
+    )
+    """,
+)
+
+def aplicar(conexion):
+    """Vuelve a crear la tabla de contadores con valores enteros"""
+    for sentencia in SENTENCIAS:
+        conexion.execute(text(sentencia))
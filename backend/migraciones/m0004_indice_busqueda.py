@@ -0,0 +1,73 @@
+"""
+Índice de búsqueda de texto completo de los artículos (tabla virtual FTS5 de
+contenido externo y los triggers que la mantienen al día), ver backend/busqueda.py.
+
+Solo en SQLite. Si SQLite está compilado sin FTS5 la migración no hace nada y
+la búsqueda sigue usando ILIKE; el índice se puede crear más adelante con
+`python reconstruir_busqueda.py`.
+"""
+
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger("uvicorn.error")
+
+DESCRIPCION = "Índice de búsqueda de texto completo (FTS5) de los artículos"
+
+TABLA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS articulos_busqueda USING fts5(
+    nombre,
+    descripcion,
+    content='articulos_inventario',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+"""
+
+TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS articulos_busqueda_ai AFTER INSERT ON articulos_inventario BEGIN
+        INSERT INTO articulos_busqueda(rowid, nombre, descripcion)
+        VALUES (new.id, new.nombre, new.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articulos_busqueda_ad AFTER DELETE ON articulos_inventario BEGIN
+        INSERT INTO articulos_busqueda(articulos_busqueda, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articulos_busqueda_au AFTER UPDATE OF nombre, descripcion ON articulos_inventario BEGIN
+        INSERT INTO articulos_busqueda(articulos_busqueda, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+        INSERT INTO articulos_busqueda(rowid, nombre, descripcion)
+        VALUES (new.id, new.nombre, new.descripcion);
+    END
+    """,
+)
+
+def aplicar(conexion):
+    """Crea el índice y sus triggers si no existen y, si el índice es nuevo, indexa los artículos"""
+    if conexion.dialect.name != "sqlite":
+        return
+
+    existia = conexion.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articulos_busqueda'")
+    ).first() is not None
+    try:
+        conexion.execute(text(TABLA))
+    except OperationalError:
+        # SQLite compilado sin FTS5: la migración queda aplicada, así que avisar
+        # de cómo crear el índice si más adelante se usa un SQLite con FTS5
+        logger.warning(
+            "SQLite no incluye FTS5: la búsqueda usará ILIKE. Con un SQLite que lo "
+            "incluya, crea el índice con `python reconstruir_busqueda.py`"
+        )
+        return
+    for sentencia in TRIGGERS:
+        conexion.execute(text(sentencia))
+    if not existia:
+        conexion.execute(text("INSERT INTO articulos_busqueda(articulos_busqueda) VALUES ('rebuild')"))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Text, Boolean, ForeignKey, Table, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -8,7 +8,7 @@ pedido_articulos = Table(
     'pedido_articulos',
     Base.metadata,
     Column('pedido_id', Integer, ForeignKey('pedidos.id'), primary_key=True),
-    Column('articulo_id', Integer, ForeignKey('articulos_inventario.id'), primary_key=True),
+    Column('articulo_id', Integer, ForeignKey('articulos_inventario.id'), primary_key=True, index=True),
     Column('cantidad', Integer, nullable=False),
     Column('precio_unitario', Float, nullable=False)
 )
@@ -30,7 +30,7 @@ class Usuario(Base):
     password_hash = Column(String(255), nullable=False)
     rol = Column(String(20), nullable=False, default="cliente")  # "admin" o "cliente"
     activo = Column(Boolean, default=True)
-    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     fecha_ultimo_acceso = Column(DateTime(timezone=True), nullable=True)
 
     # Relación con pedidos
@@ -53,6 +53,11 @@ class ArticuloInventario(Base):
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
     fecha_actualizacion = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Índice para la paginación por cursor (orden por fecha de creación e ID)
+    __table_args__ = (
+        Index("ix_articulos_inventario_fecha_creacion_id", "fecha_creacion", "id"),
+    )
+
     def __repr__(self):
         return f"<ArticuloInventario(id={self.id}, nombre='{self.nombre}', cantidad={self.cantidad}, precio={self.precio})>"
 
@@ -66,14 +71,68 @@ class Pedido(Base):
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
     total = Column(Float, nullable=False)
     estado = Column(String(20), nullable=False, default="pendiente")  # "pendiente", "procesando", "enviado", "entregado", "cancelado"
-    fecha_pedido = Column(DateTime(timezone=True), server_default=func.now())
+    fecha_pedido = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     fecha_actualizacion = Column(DateTime(timezone=True), onupdate=func.now())
     direccion_envio = Column(Text, nullable=True)
     notas = Column(Text, nullable=True)
 
+    # Índice para los pedidos de un usuario ordenados por fecha
+    __table_args__ = (
+        Index("ix_pedidos_usuario_id_fecha_pedido", "usuario_id", "fecha_pedido"),
+    )
+
     # Relaciones
     usuario = relationship("Usuario", back_populates="pedidos")
     articulos = relationship("ArticuloInventario", secondary=pedido_articulos)
 
     def __repr__(self):
         return f"<Pedido(id={self.id}, usuario_id={self.usuario_id}, total={self.total}, estado='{self.estado}')>"
+
+class ContadorEstadistica(Base):
+    """
+    Contadores agregados de la tienda (stock total, valor del inventario, etc.).
+    Se mantienen en la misma transacción que las escrituras de los servicios,
+    así las estadísticas se leen sin recorrer las tablas. Todos son enteros:
+    el valor del inventario se guarda en céntimos.
+    """
+    __tablename__ = "estadisticas_contadores"
+
+    clave = Column(String(50), primary_key=True)
+    valor = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ContadorEstadistica(clave='{self.clave}', valor={self.valor})>"
+
+class ClaveIdempotencia(Base):
+    """
+    Claves Idempotency-Key de la creación de pedidos (ver backend/idempotencia.py).
+    Guardan qué petición reservó cada clave y, una vez completada, el pedido
+    creado y la respuesta que se devolvió, para repetirla en los reintentos.
+    """
+    __tablename__ = "claves_idempotencia"
+
+    clave = Column(String(255), primary_key=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), primary_key=True)
+    hash_peticion = Column(String(64), nullable=False)
+    estado = Column(String(20), nullable=False, default="en_curso")  # "en_curso", "completada"
+    pedido_id = Column(Integer, ForeignKey("pedidos.id"), nullable=True)
+    codigo_respuesta = Column(Integer, nullable=True)
+    respuesta = Column(Text, nullable=True)
+    # En UTC desde Python: se compara con el TTL y el bloqueo de las reservas
+    fecha_creacion = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ClaveIdempotencia(clave='{self.clave}', usuario_id={self.usuario_id}, estado='{self.estado}')>"
+
+class MigracionEsquema(Base):
+    """
+    Registro de las migraciones de esquema aplicadas (ver backend/migraciones).
+    """
+    __tablename__ = "migraciones_esquema"
+
+    version = Column(Integer, primary_key=True)
+    nombre = Column(String(100), nullable=False)
+    fecha_aplicacion = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<MigracionEsquema(version={self.version}, nombre='{self.nombre}')>"
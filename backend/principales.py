@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Segundos que se confía en el estado (rol, activo) cacheado de un usuario antes
+# de volver a consultarlo. Es el tiempo máximo que tarda en aplicarse en todos
+# los workers la desactivación o el cambio de rol de un usuario.
+TTL_CACHE_PRINCIPALES = float(os.getenv("AUTH_CACHE_TTL", "30"))
+
+# Número máximo de usuarios cacheados por proceso
+MAX_CACHE_PRINCIPALES = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+class CachePrincipales:
+    """
+    Caché en proceso del estado de autenticación de los usuarios.
+
+    Guarda (rol, activo) por ID de usuario durante un TTL corto para que las
+    peticiones autenticadas no consulten la base de datos, y mantiene una
+    lista de usuarios revocados que se comprueba antes que la caché para que
+    las desactivaciones hechas en este proceso se apliquen al instante.
+    """
+
+    def __init__(self, ttl: float, tamano_maximo: int, duracion_revocacion: float):
+        self.ttl = ttl
+        self.tamano_maximo = tamano_maximo
+        self.duracion_revocacion = duracion_revocacion
+        self._entradas: "OrderedDict[int, Tuple[float, str, bool]]" = OrderedDict()
+        self._revocados: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, usuario_id: int) -> Optional[Tuple[str, bool]]:
+        """Devuelve (rol, activo) si está cacheado y vigente, o None"""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(usuario_id)
+            if entrada is None:
+                return None
+            expira, rol, activo = entrada
+            if expira <= ahora:
+                del self._entradas[usuario_id]
+                return None
+            self._entradas.move_to_end(usuario_id)
+            return rol, activo
+
+    def guardar(self, usuario_id: int, rol: str, activo: bool) -> None:
+        """Cachea el estado de un usuario durante el TTL"""
+        with self._lock:
+            self._entradas[usuario_id] = (time.monotonic() + self.ttl, rol, activo)
+            self._entradas.move_to_end(usuario_id)
+            while len(self._entradas) > self.tamano_maximo:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, usuario_id: int) -> None:
+        """Elimina un usuario de la caché para forzar una nueva consulta"""
+        with self._lock:
+            self._entradas.pop(usuario_id, None)
+
+    def revocar(self, usuario_id: int) -> None:
+        """Rechaza de inmediato los tokens de un usuario en este proceso"""
+        with self._lock:
+            self._entradas.pop(usuario_id, None)
+            self._revocados[usuario_id] = time.monotonic() + self.duracion_revocacion
+
+    def restaurar(self, usuario_id: int) -> None:
+        """Quita a un usuario de la lista de revocados"""
+        with self._lock:
+            self._revocados.pop(usuario_id, None)
+            self._entradas.pop(usuario_id, None)
+
+    def esta_revocado(self, usuario_id: int) -> bool:
+        """Indica si el usuario está en la lista de revocados"""
+        ahora = time.monotonic()
+        with self._lock:
+            expira = self._revocados.get(usuario_id)
+            if expira is None:
+                return False
+            if expira <= ahora:
+                # Pasado este tiempo la caché ya refleja el estado de la base de datos
+                del self._revocados[usuario_id]
+                return False
+            return True
+
+# Caché compartida por todo el proceso. Las revocaciones se mantienen un poco
+# más que el TTL: después, una desactivación ya la recoge la propia caché.
+cache_principales = CachePrincipales(
+    TTL_CACHE_PRINCIPALES,
+    MAX_CACHE_PRINCIPALES,
+    duracion_revocacion=TTL_CACHE_PRINCIPALES * 2
+)
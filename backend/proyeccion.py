@@ -0,0 +1,81 @@
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, create_model
+from sqlalchemy.orm import load_only
+
+# Combinaciones de campos distintas cuyos modelos y adaptadores se guardan
+MAX_PROYECCIONES_CACHE = 128
+
+def parsear_campos(campos: Optional[str], esquema: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """
+    Convierte el parámetro `campos` ("nombre,precio") en la tupla de campos
+    del esquema a devolver, siempre con `id` y en el orden del esquema (así
+    "precio,nombre" y "nombre,precio" comparten modelo y caché).
+
+    Returns:
+        None si no se pide proyección (respuesta completa)
+
+    Raises:
+        ValueError: Si algún campo no existe en el esquema
+    """
+    if campos is None:
+        return None
+    pedidos = {campo.strip() for campo in campos.split(",") if campo.strip()}
+    desconocidos = pedidos - set(esquema.model_fields)
+    if desconocidos:
+        raise ValueError(
+            f"Campos desconocidos: {', '.join(sorted(desconocidos))}. "
+            f"Disponibles: {', '.join(esquema.model_fields)}"
+        )
+    if "id" in esquema.model_fields:
+        pedidos.add("id")
+    return tuple(campo for campo in esquema.model_fields if campo in pedidos)
+
+@lru_cache(maxsize=MAX_PROYECCIONES_CACHE)
+def modelo_proyectado(esquema: Type[BaseModel], campos: Tuple[str, ...]) -> Type[BaseModel]:
+    """Esquema reducido con solo `campos`, con los mismos tipos y descripciones que el original"""
+    return create_model(
+        esquema.__name__,
+        __config__=esquema.model_config,
+        **{campo: (esquema.model_fields[campo].annotation, esquema.model_fields[campo]) for campo in campos}
+    )
+
+@lru_cache(maxsize=MAX_PROYECCIONES_CACHE)
+def adaptador_proyeccion(esquema: Type[BaseModel], campos: Tuple[str, ...]) -> TypeAdapter:
+    """Adaptador de una lista del esquema reducido (ver `respuesta_json`)"""
+    return TypeAdapter(List[modelo_proyectado(esquema, campos)])
+
+def columnas_proyeccion(modelo, campos: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """Columnas de la tabla del modelo que hacen falta para `campos` (None: todas)"""
+    if campos is None:
+        return None
+    return [campo for campo in campos if campo in modelo.__table__.columns]
+
+def cargar_solo(query, modelo, campos: Optional[Sequence[str]]):
+    """
+    Limita el SELECT de la consulta a las columnas de `campos` con `load_only`
+    (la clave primaria se carga siempre). Sin campos devuelve la consulta tal cual.
+    Acceder a una columna no cargada lanzaría una consulta por fila: las rutas
+    solo serializan los campos pedidos.
+    """
+    columnas = columnas_proyeccion(modelo, campos)
+    if columnas is None:
+        return query
+    return query.options(load_only(*(getattr(modelo, columna) for columna in columnas)))
+
+@lru_cache(maxsize=MAX_PROYECCIONES_CACHE)
+def adaptador_pagina_proyeccion(
+    pagina: Type[BaseModel],
+    lista: str,
+    esquema: Type[BaseModel],
+    campos: Tuple[str, ...]
+) -> TypeAdapter:
+    """Adaptador de una página (como PaginaArticulos) cuyo campo `lista` usa el esquema reducido"""
+    return TypeAdapter(create_model(
+        pagina.__name__,
+        **{
+            nombre: (List[modelo_proyectado(esquema, campos)] if nombre == lista else campo.annotation, campo)
+            for nombre, campo in pagina.model_fields.items()
+        }
+    ))
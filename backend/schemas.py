@@ -29,6 +29,38 @@ class ArticuloInventario(ArticuloInventarioBase):
     fecha_creacion: datetime = Field(..., description="Fecha de creación")
     fecha_actualizacion: Optional[datetime] = Field(None, description="Fecha de última actualización")
 
+class PaginaArticulos(BaseModel):
+    """Esquema para una página de artículos paginada por cursor"""
+    articulos: List[ArticuloInventario] = Field(..., description="Artículos de la página")
+    siguiente_cursor: Optional[str] = Field(None, description="Cursor para obtener la siguiente página (None si no hay más)")
+
+# Artículos que se pueden pedir en una consulta por lote
+MAX_IDS_LOTE = 500
+
+class SolicitudLoteArticulos(BaseModel):
+    """Esquema para pedir varios artículos por ID en una sola petición"""
+    ids: List[int] = Field(
+        ..., min_length=1, max_length=MAX_IDS_LOTE,
+        description="IDs de los artículos, en el orden en que se quieren recibir"
+    )
+
+class LoteArticulos(BaseModel):
+    """Esquema para la respuesta de la consulta de artículos por lote"""
+    articulos: List[ArticuloInventario] = Field(..., description="Artículos encontrados, en el orden pedido")
+    no_encontrados: List[int] = Field(..., description="IDs pedidos que no existen")
+
+class ErrorImportacion(BaseModel):
+    """Esquema para el error de una fila en la importación masiva"""
+    fila: int = Field(..., description="Número de fila (sin contar la cabecera CSV)")
+    error: str = Field(..., description="Descripción del error")
+
+class ResultadoImportacion(BaseModel):
+    """Esquema para el informe de una importación masiva de artículos"""
+    filas_procesadas: int = Field(..., description="Filas leídas del archivo")
+    importados: int = Field(..., description="Artículos creados")
+    total_errores: int = Field(..., description="Filas rechazadas")
+    errores: List[ErrorImportacion] = Field(..., description="Detalle de las filas rechazadas (limitado a las primeras 1000)")
+
 # Esquemas para Usuarios
 class UsuarioBase(BaseModel):
     """Esquema base para usuarios"""
@@ -67,6 +99,12 @@ class TokenData(BaseModel):
     """Esquema para datos del token"""
     email: Optional[str] = None
 
+class UsuarioActual(BaseModel):
+    """Esquema del usuario autenticado, construido a partir del token sin consultar la base de datos"""
+    id: int = Field(..., description="ID único del usuario")
+    email: str = Field(..., description="Email del usuario")
+    rol: str = Field(..., description="Rol del usuario")
+
 # Esquemas para Pedidos
 class ItemPedido(BaseModel):
     """Esquema para un item dentro del pedido"""
@@ -0,0 +1,49 @@
+from typing import Any, Iterable, List, Type
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from . import schemas
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+# Clase de respuesta por defecto de la app: orjson si está instalado
+RespuestaJSON = ORJSONResponse if orjson is not None else JSONResponse
+
+# Adaptadores de las respuestas de artículos y listas. Se crean una vez: construir el
+# validador y el serializador de pydantic-core es lo caro
+ADAPTADOR_ARTICULO = TypeAdapter(schemas.ArticuloInventario)
+ADAPTADOR_ARTICULOS = TypeAdapter(List[schemas.ArticuloInventario])
+ADAPTADOR_LOTE_ARTICULOS = TypeAdapter(schemas.LoteArticulos)
+ADAPTADOR_PAGINA_ARTICULOS = TypeAdapter(schemas.PaginaArticulos)
+ADAPTADOR_USUARIOS = TypeAdapter(List[schemas.Usuario])
+ADAPTADOR_PEDIDOS = TypeAdapter(List[schemas.Pedido])
+
+def construir_sin_validar(esquema: Type[BaseModel], objetos: Iterable[Any]) -> List[BaseModel]:
+    """
+    Construye instancias del esquema a partir de objetos ORM sin validarlos.
+
+    Solo para datos que ya se validaron al guardarse: validar de nuevo un
+    EmailStr en cada respuesta cuesta más que todo el resto de la serialización.
+    """
+    campos = tuple(esquema.model_fields)
+    return [esquema.model_construct(**{campo: getattr(objeto, campo) for campo in campos}) for objeto in objetos]
+
+def respuesta_json(adaptador: TypeAdapter, datos: Any, validar: bool = True) -> Response:
+    """
+    Serializa `datos` directamente a JSON con pydantic-core y devuelve la respuesta.
+
+    FastAPI, con `response_model`, vuelve a validar lo que devuelve la ruta (en
+    el threadpool si la ruta es síncrona), lo convierte a objetos de Python y
+    después lo codifica a JSON. Aquí los objetos ORM se validan una sola vez
+    (`from_attributes`) y se codifican sin pasos intermedios; con
+    `validar=False` los datos deben ser ya instancias de los esquemas.
+    El `response_model` de la ruta se mantiene para la documentación.
+    """
+    if validar:
+        datos = adaptador.validate_python(datos, from_attributes=True)
+    return Response(content=adaptador.dump_json(datos), media_type="application/json")
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga de la API.
+
+Siembra un conjunto de datos configurable (artículos, usuarios y pedidos) en
+una base de datos SQLite temporal y ejecuta escenarios realistas:
+- navegacion: listado paginado y detalle de artículos, sin autenticar
+- busqueda: búsqueda de texto en el catálogo
+- login: POST /api/auth/login (bcrypt)
+- compra: POST /api/pedidos de clientes autenticados
+- admin_pedidos: listado de todos los pedidos como administrador
+- mixto: mezcla ponderada de todo lo anterior
+
+Para cada escenario informa de peticiones por segundo, latencia p50/p95/p99,
+errores y consultas SQL por petición. Las consultas se cuentan en una pasada
+secuencial dentro del proceso (no dependen de la concurrencia). El resultado
+se imprime y se guarda en JSON para comparar entre commits.
+
+Uso:
+    python benchmarks/benchmark_api.py --modo uvicorn --salida resultado.json
+    python benchmarks/benchmark_api.py --modo proceso --escenarios navegacion,busqueda
+    python benchmarks/benchmark_api.py --comparar anterior.json
+
+Requiere httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.utilidades import RAIZ, iniciar_servidor, detener_servidor, percentil
+
+PASSWORD = "benchmark123"
+EMAIL_ADMIN = "admin-benchmark@example.com"
+
+PRODUCTOS = ["Laptop", "Monitor", "Teclado", "Ratón", "Auriculares", "Tablet", "Impresora", "Altavoz", "Cámara", "Router"]
+MARCAS = ["ASUS", "Dell", "Logitech", "Sony", "Samsung", "HP", "Lenovo", "Apple", "Razer", "TP-Link"]
+ADJETIVOS = ["Gaming", "Inalámbrico", "Profesional", "Compacto", "Mecánico", "Ultra", "Portátil", "Pro", "4K", "Ergonómico"]
+
+# Peso de cada escenario dentro del escenario mixto
+MEZCLA = {"navegacion": 60, "busqueda": 15, "login": 2, "compra": 13, "admin_pedidos": 10}
+
+ESCENARIOS = ["navegacion", "busqueda", "login", "compra", "admin_pedidos", "mixto"]
+
+def parsear_argumentos():
+    """Lee los parámetros del benchmark de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la API")
+    parser.add_argument("--articulos", type=int, default=5000, help="Artículos a sembrar")
+    parser.add_argument("--usuarios", type=int, default=500, help="Clientes a sembrar")
+    parser.add_argument("--pedidos", type=int, default=2000, help="Pedidos a sembrar")
+    parser.add_argument("--peticiones", type=int, default=500, help="Peticiones por escenario")
+    parser.add_argument("--peticiones-login", type=int, default=40,
+                        help="Peticiones del escenario de login (bcrypt es deliberadamente lento)")
+    parser.add_argument("--concurrencia", type=int, default=10, help="Peticiones simultáneas")
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS), help="Escenarios separados por comas")
+    parser.add_argument("--modo", choices=["uvicorn", "proceso"], default="uvicorn",
+                        help="Servidor uvicorn local en otro proceso o la app ASGI en este proceso")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla de los datos y las peticiones")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar el resultado")
+    parser.add_argument("--comparar", help="Resultado JSON anterior con el que comparar")
+    return parser.parse_args()
+
+def sembrar_datos(engine, args) -> dict:
+    """
+    Inserta artículos, usuarios y pedidos con inserciones masivas de Core.
+    Devuelve los IDs y tokens que necesitan los escenarios.
+    """
+    from backend import models
+    from backend.crud import ServicioSeguridad
+
+    aleatorio = random.Random(args.semilla)
+    password_hash = ServicioSeguridad.obtener_password_hash(PASSWORD)
+
+    with engine.begin() as conexion:
+        conexion.execute(
+            models.ArticuloInventario.__table__.insert(),
+            [
+                {
+                    "nombre": f"{PRODUCTOS[i % 10]} {MARCAS[i // 10 % 10]} {ADJETIVOS[i // 100 % 10]} {i}",
+                    "descripcion": f"{PRODUCTOS[i % 10]} {ADJETIVOS[aleatorio.randrange(10)].lower()} de {MARCAS[i // 10 % 10]}",
+                    # Stock de sobra para que las compras del benchmark no fallen
+                    "cantidad": 1_000_000,
+                    "precio": round(aleatorio.uniform(5, 2000), 2),
+                }
+                for i in range(args.articulos)
+            ]
+        )
+        conexion.execute(
+            models.Usuario.__table__.insert(),
+            [{"email": EMAIL_ADMIN, "nombre": "Admin", "password_hash": password_hash, "rol": "admin"}] + [
+                {"email": f"cliente{i}@example.com", "nombre": f"Cliente {i}", "password_hash": password_hash, "rol": "cliente"}
+                for i in range(args.usuarios)
+            ]
+        )
+        usuarios = conexion.execute(models.Usuario.__table__.select()).all()
+        articulos = dict(conexion.execute(
+            models.ArticuloInventario.__table__.select().with_only_columns(
+                models.ArticuloInventario.id, models.ArticuloInventario.precio
+            )
+        ).all())
+        clientes = [usuario for usuario in usuarios if usuario.rol == "cliente"]
+        ids_articulos = list(articulos)
+
+        pedidos, items = [], []
+        for pedido_id in range(1, args.pedidos + 1):
+            lineas = {
+                articulo_id: aleatorio.randint(1, 3)
+                for articulo_id in aleatorio.sample(ids_articulos, aleatorio.randint(1, 4))
+            }
+            pedidos.append({
+                "id": pedido_id,
+                "usuario_id": aleatorio.choice(clientes).id,
+                "total": round(sum(articulos[a] * n for a, n in lineas.items()), 2),
+                "estado": aleatorio.choice(["pendiente", "procesando", "enviado", "entregado"]),
+            })
+            items.extend(
+                {"pedido_id": pedido_id, "articulo_id": a, "cantidad": n, "precio_unitario": articulos[a]}
+                for a, n in lineas.items()
+            )
+        if pedidos:
+            conexion.execute(models.Pedido.__table__.insert(), pedidos)
+            conexion.execute(models.pedido_articulos.insert(), items)
+
+    admin = next(usuario for usuario in usuarios if usuario.rol == "admin")
+    return {
+        "articulos": ids_articulos,
+        "emails": [cliente.email for cliente in clientes],
+        "tokens": [ServicioSeguridad.crear_token_usuario(cliente) for cliente in clientes],
+        "token_admin": ServicioSeguridad.crear_token_usuario(admin),
+    }
+
+def generar_peticion(escenario: str, datos: dict, aleatorio: random.Random) -> tuple:
+    """Devuelve (nombre, método, ruta, parámetros, json, cabeceras) de una petición del escenario"""
+    if escenario == "mixto":
+        escenario = aleatorio.choices(list(MEZCLA), weights=list(MEZCLA.values()))[0]
+
+    if escenario == "navegacion":
+        if aleatorio.random() < 0.7:
+            pagina = {"saltar": aleatorio.randrange(0, min(len(datos["articulos"]), 2000), 20), "limite": 20}
+            return "listado", "GET", "/api/articulos", pagina, None, None
+        return "detalle", "GET", f"/api/articulos/{aleatorio.choice(datos['articulos'])}", None, None, None
+    if escenario == "busqueda":
+        termino = aleatorio.choice([aleatorio.choice(PRODUCTOS), aleatorio.choice(MARCAS), aleatorio.choice(ADJETIVOS)[:4]])
+        return "busqueda", "GET", "/api/articulos", {"buscar": termino, "limite": 20}, None, None
+    if escenario == "login":
+        email = aleatorio.choice(datos["emails"])
+        return "login", "POST", "/api/auth/login", None, {"email": email, "password": PASSWORD}, None
+    if escenario == "compra":
+        items = [
+            {"articulo_id": articulo_id, "cantidad": aleatorio.randint(1, 2)}
+            for articulo_id in aleatorio.sample(datos["articulos"], aleatorio.randint(1, 3))
+        ]
+        cabeceras = {"Authorization": f"Bearer {aleatorio.choice(datos['tokens'])}"}
+        return "compra", "POST", "/api/pedidos", None, {"items": items}, cabeceras
+    cabeceras = {"Authorization": f"Bearer {datos['token_admin']}"}
+    return "admin_pedidos", "GET", "/api/pedidos", {"saltar": aleatorio.randrange(0, 500, 50), "limite": 50}, None, cabeceras
+
+async def ejecutar_escenario(cliente, escenario: str, total: int, datos: dict, args) -> dict:
+    """Lanza `total` peticiones del escenario con la concurrencia indicada y devuelve las métricas"""
+    aleatorio = random.Random(f"{args.semilla}-{escenario}")
+    peticiones = [generar_peticion(escenario, datos, aleatorio) for _ in range(total)]
+    latencias = []
+    estados = Counter()
+
+    async def trabajador():
+        while peticiones:
+            _, metodo, ruta, parametros, cuerpo, cabeceras = peticiones.pop()
+            inicio = time.perf_counter()
+            respuesta = await cliente.request(metodo, ruta, params=parametros, json=cuerpo, headers=cabeceras)
+            latencias.append(time.perf_counter() - inicio)
+            estados[respuesta.status_code] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(args.concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    return {
+        "peticiones": total,
+        "errores": sum(n for estado, n in estados.items() if estado >= 400),
+        "peticiones_por_segundo": round(total / duracion, 1),
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "p99_ms": round(percentil(latencias, 99), 2),
+    }
+
+async def medir_consultas(app, escenarios, datos: dict, args, muestras: int = 20) -> dict:
+    """
+    Ejecuta secuencialmente unas cuantas peticiones de cada escenario contra la
+    app en este proceso y devuelve la media de sentencias SQL por petición.
+    """
+    import httpx
+    from backend.instrumentacion import contar_consultas
+
+    resultado = {}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+        for escenario in escenarios:
+            aleatorio = random.Random(f"{args.semilla}-consultas-{escenario}")
+            with contar_consultas() as consultas:
+                for _ in range(muestras):
+                    _, metodo, ruta, parametros, cuerpo, cabeceras = generar_peticion(escenario, datos, aleatorio)
+                    await cliente.request(metodo, ruta, params=parametros, json=cuerpo, headers=cabeceras)
+            resultado[escenario] = round(consultas.consultas / muestras, 2)
+    return resultado
+
+async def ejecutar_benchmark(args, datos: dict) -> dict:
+    """Ejecuta los escenarios en el modo elegido y añade las consultas por petición"""
+    import httpx
+    from backend.main import app
+
+    escenarios = [escenario.strip() for escenario in args.escenarios.split(",") if escenario.strip()]
+    desconocidos = set(escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        raise SystemExit(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    resultados = {}
+    limites = httpx.Limits(max_connections=args.concurrencia)
+    async with app.router.lifespan_context(app):
+        if args.modo == "uvicorn":
+            servidor, url = iniciar_servidor("backend.main:app")
+            try:
+                async with httpx.AsyncClient(base_url=url, limits=limites, timeout=120) as cliente:
+                    for escenario in escenarios:
+                        total = args.peticiones_login if escenario == "login" else args.peticiones
+                        resultados[escenario] = await ejecutar_escenario(cliente, escenario, total, datos, args)
+            finally:
+                detener_servidor(servidor)
+        else:
+            transporte = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=120) as cliente:
+                for escenario in escenarios:
+                    total = args.peticiones_login if escenario == "login" else args.peticiones
+                    resultados[escenario] = await ejecutar_escenario(cliente, escenario, total, datos, args)
+
+        consultas = await medir_consultas(app, escenarios, datos, args)
+
+    for escenario, media in consultas.items():
+        resultados[escenario]["consultas_por_peticion"] = media
+    return resultados
+
+def obtener_commit() -> str:
+    """Devuelve el commit actual (o 'desconocido' fuera de un repositorio git)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(RAIZ), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+def comparar(anterior: dict, actual: dict):
+    """Muestra la variación de cada métrica respecto a un resultado anterior"""
+    print(f"\n🔁 Comparación con {anterior.get('commit', '?')} → {actual['commit']}")
+    for escenario, metricas in actual["escenarios"].items():
+        previas = anterior.get("escenarios", {}).get(escenario)
+        if not previas:
+            continue
+        cambios = []
+        for clave in ("peticiones_por_segundo", "p50_ms", "p95_ms", "p99_ms", "consultas_por_peticion"):
+            if previas.get(clave):
+                variacion = (metricas[clave] - previas[clave]) / previas[clave] * 100
+                cambios.append(f"{clave} {variacion:+.1f}%")
+        print(f"   {escenario}: {' | '.join(cambios)}")
+
+def main():
+    """Función principal del benchmark"""
+    args = parsear_argumentos()
+
+    # La base de datos temporal debe configurarse antes de importar el backend
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/benchmark.db"
+    # Todas las peticiones salen de la misma IP: el limitador cortaría el escenario de login
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    from backend.database import engine
+    from backend.migraciones import ServicioMigraciones
+    from backend.models import Base
+
+    print("⏱️  Benchmark de la API")
+    print("=" * 50)
+    print(f"   Modo: {args.modo} | Artículos: {args.articulos} | Usuarios: {args.usuarios} | "
+          f"Pedidos: {args.pedidos} | Concurrencia: {args.concurrencia}")
+
+    Base.metadata.create_all(bind=engine)
+    ServicioMigraciones.actualizar(engine)
+    inicio = time.perf_counter()
+    datos = sembrar_datos(engine, args)
+    print(f"   Datos sembrados en {time.perf_counter() - inicio:.1f} s")
+
+    resultado = {
+        "commit": obtener_commit(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "configuracion": {
+            clave: valor for clave, valor in vars(args).items() if clave not in ("salida", "comparar")
+        },
+        "escenarios": asyncio.run(ejecutar_benchmark(args, datos)),
+    }
+
+    for escenario, metricas in resultado["escenarios"].items():
+        print(f"\n📊 {escenario}")
+        for nombre, valor in metricas.items():
+            print(f"   {nombre}: {valor}")
+
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n💾 Resultado guardado en {args.salida}")
+    if args.comparar:
+        comparar(json.loads(Path(args.comparar).read_text(encoding="utf-8")), resultado)
+
+if __name__ == "__main__":
+    main()
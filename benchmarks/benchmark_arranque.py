@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark del arranque de la API.
+
+Cada repetición lanza un intérprete nuevo (como un worker de gunicorn o un
+reinicio con --reload) sobre una base de datos SQLite temporal ya creada y mide:
+- importación de `backend.main`
+- arranque (lifespan: migraciones, índice de búsqueda, contadores)
+- primera petición de lectura (GET /api/articulos)
+- primer login (incluye la carga bajo demanda de passlib y jose)
+
+Uso:
+    python benchmarks/benchmark_arranque.py --repeticiones 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.utilidades import RAIZ
+
+EMAIL = "arranque@example.com"
+PASSWORD = "arranque123"
+
+def parsear_argumentos():
+    """Lee los parámetros del benchmark de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Benchmark del arranque de la API")
+    parser.add_argument("--repeticiones", type=int, default=10, help="Arranques a medir")
+    parser.add_argument("--articulos", type=int, default=1000, help="Artículos a sembrar")
+    parser.add_argument("--medir", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def medir_arranque():
+    """Mide un arranque en este proceso e imprime los tiempos en JSON (modo hijo)"""
+    inicio = time.perf_counter()
+    import backend.main
+    importacion = time.perf_counter() - inicio
+    crypto_importado = "jose" in sys.modules or "passlib.context" in sys.modules
+
+    from fastapi.testclient import TestClient
+    cliente = TestClient(backend.main.app)
+
+    inicio = time.perf_counter()
+    cliente.__enter__()
+    arranque = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    cliente.get("/api/articulos", params={"limite": 20}).raise_for_status()
+    primera_peticion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    cliente.post("/api/auth/login", json={"email": EMAIL, "password": PASSWORD}).raise_for_status()
+    primer_login = time.perf_counter() - inicio
+
+    print(json.dumps({
+        "importacion_ms": importacion * 1000,
+        "arranque_ms": arranque * 1000,
+        "primera_peticion_ms": primera_peticion * 1000,
+        "primer_login_ms": primer_login * 1000,
+        "crypto_en_importacion": crypto_importado,
+    }), flush=True)
+    # Salir sin esperar al hilo del TestClient
+    os._exit(0)
+
+def preparar_base_datos(args):
+    """Crea la base de datos temporal con su esquema, artículos y un usuario"""
+    from backend import models
+    from backend.database import engine
+    from backend.migraciones import ServicioMigraciones
+    from backend.crud import ServicioSeguridad
+
+    models.Base.metadata.create_all(bind=engine)
+    ServicioMigraciones.actualizar(engine)
+    with engine.begin() as conexion:
+        conexion.execute(
+            models.ArticuloInventario.__table__.insert(),
+            [{"nombre": f"Artículo {i}", "cantidad": i % 50, "precio": 10 + i % 500} for i in range(args.articulos)]
+        )
+        conexion.execute(
+            models.Usuario.__table__.insert(),
+            {"email": EMAIL, "nombre": "Arranque", "password_hash": ServicioSeguridad.obtener_password_hash(PASSWORD)}
+        )
+    engine.dispose()
+
+def main():
+    """Función principal del benchmark"""
+    args = parsear_argumentos()
+    if args.medir:
+        medir_arranque()
+
+    # La base de datos temporal debe configurarse antes de importar el backend
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/arranque.db"
+    preparar_base_datos(args)
+
+    print("🚀 Benchmark de arranque")
+    print("=" * 50)
+    print(f"   Repeticiones: {args.repeticiones} | Artículos: {args.articulos}")
+
+    mediciones = []
+    for _ in range(args.repeticiones):
+        salida = subprocess.run(
+            [sys.executable, __file__, "--medir"],
+            cwd=str(RAIZ), capture_output=True, text=True, check=True
+        )
+        mediciones.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+
+    print()
+    for clave in ("importacion_ms", "arranque_ms", "primera_peticion_ms", "primer_login_ms"):
+        valores = [medicion[clave] for medicion in mediciones]
+        print(f"   {clave}: mediana {statistics.median(valores):.1f} | máx {max(valores):.1f}")
+    print(f"   passlib/jose importados al importar la app: {any(m['crypto_en_importacion'] for m in mediciones)}")
+
+if __name__ == "__main__":
+    main()
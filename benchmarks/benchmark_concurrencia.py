@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia del acceso a base de datos.
+
+Compara el throughput con peticiones concurrentes entre:
+- antes: rutas `async def` que llaman a la sesión síncrona dentro del event loop
+- después: las rutas reales de la API, ejecutadas en el threadpool dimensionado
+
+La carga mezcla listados de artículos (acceso a la base de datos) con
+/api/salud (sin base de datos) mientras un escritor en segundo plano mantiene
+periódicamente el bloqueo de escritura de SQLite, como haría una escritura
+lenta o una importación. Con rutas bloqueantes cada espera por el bloqueo
+congela el event loop y todas las peticiones en vuelo; con el threadpool solo
+esperan las peticiones que necesitan la base de datos. Cada escenario levanta
+un servidor uvicorn local en otro proceso sobre una base de datos SQLite temporal.
+
+Uso:
+    python benchmarks/benchmark_concurrencia.py --concurrencia 20 --peticiones 2000 --escritura-lenta-ms 100
+
+Requiere httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.utilidades import iniciar_servidor, detener_servidor, percentil
+
+def parsear_argumentos():
+    """Lee los parámetros del benchmark de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia de la API")
+    parser.add_argument("--articulos", type=int, default=1000, help="Artículos a sembrar")
+    parser.add_argument("--limite", type=int, default=20, help="Artículos por petición de listado")
+    parser.add_argument("--escritura-lenta-ms", type=int, default=100,
+                        help="Duración del bloqueo de escritura simulado (0 para desactivarlo)")
+    parser.add_argument("--intervalo-escritura-ms", type=int, default=300,
+                        help="Tiempo entre escrituras lentas")
+    parser.add_argument("--concurrencia", type=int, default=20, help="Peticiones simultáneas")
+    parser.add_argument("--peticiones", type=int, default=2000, help="Peticiones totales por escenario")
+    return parser.parse_args()
+
+def sembrar_articulos(engine, total: int):
+    """Inserta `total` artículos con un único executemany"""
+    from backend import models
+
+    with engine.begin() as conexion:
+        conexion.execute(
+            models.ArticuloInventario.__table__.insert(),
+            [
+                {
+                    "nombre": f"Artículo {i}",
+                    "descripcion": f"Descripción del artículo de prueba {i}",
+                    "cantidad": i % 50,
+                    "precio": 10 + i % 500,
+                }
+                for i in range(total)
+            ]
+        )
+
+def escritor_lento(engine, args, detener: threading.Event):
+    """Mantiene periódicamente el bloqueo exclusivo de SQLite durante una escritura lenta"""
+    conexion = sqlite3.connect(engine.url.database, isolation_level=None, timeout=20)
+    while not detener.wait(args.intervalo_escritura_ms / 1000):
+        conexion.execute("BEGIN EXCLUSIVE")
+        conexion.execute("UPDATE articulos_inventario SET cantidad = cantidad WHERE id = 1")
+        time.sleep(args.escritura_lenta_ms / 1000)
+        conexion.execute("COMMIT")
+    conexion.close()
+
+def crear_app_bloqueante():
+    """Reproduce las rutas originales: `async def` con la sesión síncrona en el event loop"""
+    from typing import List
+    from fastapi import FastAPI
+    from backend import schemas
+    from backend.crud import ServicioInventario
+    from backend.database import SessionLocal
+
+    app = FastAPI()
+
+    @app.get("/api/articulos", response_model=List[schemas.ArticuloInventario])
+    async def listar_articulos(saltar: int = 0, limite: int = 100):
+        db = SessionLocal()
+        try:
+            return ServicioInventario.obtener_articulos(db, saltar=saltar, limite=limite)
+        finally:
+            db.close()
+
+    @app.get("/api/salud")
+    async def verificar_salud():
+        return {"mensaje": "API de inventario funcionando correctamente", "version": "1.0.0"}
+
+    return app
+
+async def ejecutar_carga(url: str, args) -> dict:
+    """Lanza la carga concurrente contra `url` y devuelve las métricas"""
+    import httpx
+
+    latencias = {"/api/articulos": [], "/api/salud": []}
+    pendientes = list(range(args.peticiones))
+    parametros_listado = {"limite": args.limite}
+    limites = httpx.Limits(max_connections=args.concurrencia)
+
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+
+        async def trabajador(ruta: str, parametros):
+            while pendientes:
+                pendientes.pop()
+                inicio = time.perf_counter()
+                respuesta = await cliente.get(ruta, params=parametros)
+                latencias[ruta].append(time.perf_counter() - inicio)
+                respuesta.raise_for_status()
+
+        # La mitad de los trabajadores usa la base de datos y la otra mitad no
+        trabajadores = [
+            trabajador("/api/articulos", parametros_listado) if i % 2 == 0 else trabajador("/api/salud", None)
+            for i in range(args.concurrencia)
+        ]
+        inicio = time.perf_counter()
+        await asyncio.gather(*trabajadores)
+        duracion = time.perf_counter() - inicio
+
+    return {
+        "peticiones_por_segundo": round(args.peticiones / duracion, 1),
+        "duracion_s": round(duracion, 2),
+        **{
+            f"{ruta} p50/p95 (ms)": f"{percentil(valores, 50):.1f} / {percentil(valores, 95):.1f}"
+            for ruta, valores in latencias.items()
+        },
+    }
+
+def ejecutar_escenario(aplicacion: str, engine, args, factory: bool = False) -> dict:
+    """Sirve `aplicacion` con uvicorn, ejecuta la carga junto al escritor lento y detiene todo"""
+    servidor, url = iniciar_servidor(aplicacion, factory)
+    detener = threading.Event()
+    if args.escritura_lenta_ms > 0:
+        threading.Thread(target=escritor_lento, args=(engine, args, detener), daemon=True).start()
+    try:
+        return asyncio.run(ejecutar_carga(url, args))
+    finally:
+        detener.set()
+        detener_servidor(servidor)
+
+def main():
+    """Función principal del benchmark"""
+    args = parsear_argumentos()
+
+    # La base de datos temporal debe configurarse antes de importar el backend
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/benchmark.db"
+    from backend.database import engine, TAMANO_THREADPOOL_DB
+    from backend.models import Base
+
+    print("⏱️  Benchmark de concurrencia")
+    print("=" * 50)
+    print(f"   Artículos: {args.articulos} | Concurrencia: {args.concurrencia} | "
+          f"Peticiones: {args.peticiones} | Threadpool: {TAMANO_THREADPOOL_DB} | "
+          f"Escritura lenta: {args.escritura_lenta_ms} ms cada {args.intervalo_escritura_ms} ms")
+    Base.metadata.create_all(bind=engine)
+    sembrar_articulos(engine, args.articulos)
+
+    resultados = {
+        "antes (async def bloqueante)": ejecutar_escenario(
+            "benchmarks.benchmark_concurrencia:crear_app_bloqueante", engine, args, factory=True
+        ),
+        "después (threadpool)": ejecutar_escenario("backend.main:app", engine, args),
+    }
+
+    for escenario, metricas in resultados.items():
+        print(f"\n📊 {escenario}")
+        for nombre, valor in metricas.items():
+            print(f"   {nombre}: {valor}")
+
+if __name__ == "__main__":
+    main()
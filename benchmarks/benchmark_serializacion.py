@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de la serialización de las respuestas de listas.
+
+Para listas de ArticuloInventario, Usuario y Pedido compara, sin base de datos
+ni servidor, el coste de CPU de convertir lo que devuelve la ruta en el cuerpo
+de la respuesta:
+- fastapi_json: el camino anterior. `response_model` vuelve a validar la lista,
+  la convierte a objetos de Python y JSONResponse la codifica con `json`
+- fastapi_orjson: el mismo camino con ORJSONResponse (clase por defecto de la
+  app para el resto de rutas)
+- typeadapter: `respuesta_json` como lo usa cada ruta ahora: una validación
+  con TypeAdapter desde los objetos ORM (artículos), construcción sin validar
+  (usuarios) o ninguna (pedidos), y codificación directa a JSON con pydantic-core
+
+No incluye el salto al threadpool que FastAPI añade para validar la respuesta
+de las rutas síncronas, que el camino de `respuesta_json` también se ahorra.
+
+Uso:
+    python benchmarks/benchmark_serializacion.py --filas 1000 --repeticiones 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from backend import models, schemas
+from backend.serializacion import (
+    respuesta_json, construir_sin_validar, ADAPTADOR_ARTICULOS, ADAPTADOR_USUARIOS, ADAPTADOR_PEDIDOS
+)
+
+FECHA = datetime(2025, 1, 1, 12, 30)
+
+def parsear_argumentos():
+    """Lee los parámetros del benchmark de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Microbenchmark de serialización de listas")
+    parser.add_argument("--filas", type=int, default=1000, help="Elementos de cada lista")
+    parser.add_argument("--repeticiones", type=int, default=50, help="Repeticiones de cada medición")
+    return parser.parse_args()
+
+def generar_articulos(filas: int) -> List[models.ArticuloInventario]:
+    """Artículos ORM sin sesión, como los que devuelve ServicioInventario"""
+    return [
+        models.ArticuloInventario(
+            id=i, nombre=f"Artículo {i}", descripcion=f"Descripción del artículo {i}",
+            cantidad=i % 50, precio=10 + i % 500 + 0.99,
+            fecha_creacion=FECHA + timedelta(minutes=i), fecha_actualizacion=None
+        )
+        for i in range(1, filas + 1)
+    ]
+
+def generar_usuarios(filas: int) -> List[models.Usuario]:
+    """Usuarios ORM sin sesión, como los que devuelve ServicioUsuarios"""
+    return [
+        models.Usuario(
+            id=i, email=f"usuario{i}@example.com", nombre=f"Usuario {i}", apellidos="García",
+            password_hash="x", rol="cliente", activo=True,
+            fecha_creacion=FECHA, fecha_ultimo_acceso=FECHA + timedelta(days=i % 30)
+        )
+        for i in range(1, filas + 1)
+    ]
+
+def generar_pedidos(filas: int) -> List[schemas.Pedido]:
+    """Pedidos con tres items, ya construidos como esquemas por construir_respuestas_pedidos"""
+    return [
+        schemas.Pedido(
+            id=i, usuario_id=i % 100 + 1, usuario_email=f"usuario{i % 100 + 1}@example.com",
+            total=59.97, estado="pendiente", fecha_pedido=FECHA, fecha_actualizacion=None,
+            direccion_envio="Calle Mayor 1", notas=None,
+            items=[
+                schemas.PedidoItem(
+                    articulo_id=j, nombre_articulo=f"Artículo {j}", cantidad=1,
+                    precio_unitario=19.99, subtotal=19.99
+                )
+                for j in range(1, 4)
+            ]
+        )
+        for i in range(1, filas + 1)
+    ]
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mediana en milisegundos de `repeticiones` ejecuciones de `funcion`"""
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+def camino_fastapi(campo, contenido, clase_respuesta):
+    """Reproduce lo que hace FastAPI con el valor devuelto por una ruta con response_model"""
+    def ejecutar():
+        serializado = asyncio.run(serialize_response(field=campo, response_content=contenido))
+        return clase_respuesta(serializado).body
+    return ejecutar
+
+def main():
+    """Función principal del benchmark"""
+    args = parsear_argumentos()
+
+    casos = {
+        # Antes, listar_articulos devolvía los objetos ORM tal cual
+        "ArticuloInventario": (
+            schemas.ArticuloInventario, generar_articulos(args.filas),
+            lambda articulos: articulos,
+            lambda articulos: respuesta_json(ADAPTADOR_ARTICULOS, articulos)
+        ),
+        # listar_usuarios hacía model_validate de cada usuario antes de devolver la lista
+        "Usuario": (
+            schemas.Usuario, generar_usuarios(args.filas),
+            lambda usuarios: [schemas.Usuario.model_validate(usuario) for usuario in usuarios],
+            lambda usuarios: respuesta_json(
+                ADAPTADOR_USUARIOS, construir_sin_validar(schemas.Usuario, usuarios), validar=False
+            )
+        ),
+        # Los pedidos ya son esquemas: respuesta_json solo los codifica
+        "Pedido": (
+            schemas.Pedido, generar_pedidos(args.filas),
+            lambda pedidos: pedidos,
+            lambda pedidos: respuesta_json(ADAPTADOR_PEDIDOS, pedidos, validar=False)
+        ),
+    }
+
+    print("🚀 Benchmark de serialización")
+    print("=" * 50)
+    print(f"   Filas por lista: {args.filas} | Repeticiones: {args.repeticiones}")
+
+    for nombre, (esquema, datos, preparar_antes, responder_ahora) in casos.items():
+        campo = create_response_field(name="Response", type_=List[esquema], mode="serialization")
+
+        # Las tres variantes deben producir el mismo JSON
+        cuerpo = responder_ahora(datos).body
+        antes = asyncio.run(serialize_response(field=campo, response_content=preparar_antes(datos)))
+        assert ORJSONResponse(antes).body == cuerpo, f"{nombre}: el JSON de respuesta_json no coincide"
+
+        tiempos = {
+            "fastapi_json": medir(lambda: camino_fastapi(campo, preparar_antes(datos), JSONResponse)(), args.repeticiones),
+            "fastapi_orjson": medir(lambda: camino_fastapi(campo, preparar_antes(datos), ORJSONResponse)(), args.repeticiones),
+            "typeadapter": medir(lambda: responder_ahora(datos).body, args.repeticiones),
+        }
+
+        print(f"\n📊 {nombre} ({args.filas} filas, {len(cuerpo) / 1024:.0f} KiB)")
+        referencia = tiempos["fastapi_json"]
+        for variante, milisegundos in tiempos.items():
+            print(f"   {variante:15s} {milisegundos:8.2f} ms  (x{referencia / milisegundos:.1f})")
+
+if __name__ == "__main__":
+    main()
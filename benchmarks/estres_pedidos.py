@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Prueba de estrés de la creación concurrente de pedidos.
+
+Siembra unos pocos artículos con stock limitado y lanza muchos POST
+/api/pedidos simultáneos sobre ellos contra un servidor uvicorn local (en otro
+proceso, sobre una base de datos SQLite temporal). Al terminar comprueba que:
+- ningún artículo queda con stock negativo
+- lo descontado de cada artículo coincide con lo registrado en sus pedidos
+- hay exactamente un pedido por cada respuesta 201
+
+Uso:
+    python benchmarks/estres_pedidos.py --concurrencia 20 --pedidos 500 --stock 100
+
+Termina con código 1 si alguna comprobación falla. Requiere httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.utilidades import iniciar_servidor, detener_servidor, percentil
+
+def parsear_argumentos():
+    """Lee los parámetros de la prueba de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Prueba de estrés de pedidos concurrentes")
+    parser.add_argument("--articulos", type=int, default=3, help="Artículos disputados")
+    parser.add_argument("--stock", type=int, default=100, help="Stock inicial de cada artículo")
+    parser.add_argument("--concurrencia", type=int, default=20, help="Peticiones simultáneas")
+    parser.add_argument("--pedidos", type=int, default=500, help="Pedidos a intentar")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla para generar los pedidos")
+    return parser.parse_args()
+
+def preparar_datos(engine, args) -> tuple:
+    """Crea los artículos disputados y un cliente; devuelve (ids, token)"""
+    from backend import models
+    from backend.crud import ServicioSeguridad
+
+    with engine.begin() as conexion:
+        conexion.execute(
+            models.ArticuloInventario.__table__.insert(),
+            [
+                {"nombre": f"Artículo disputado {i}", "cantidad": args.stock, "precio": 10 + i}
+                for i in range(args.articulos)
+            ]
+        )
+        conexion.execute(
+            models.Usuario.__table__.insert(),
+            {
+                "email": "estres@example.com",
+                "nombre": "Cliente de estrés",
+                "password_hash": ServicioSeguridad.obtener_password_hash("estres123"),
+                "rol": "cliente",
+            }
+        )
+        ids = [fila.id for fila in conexion.execute(models.ArticuloInventario.__table__.select())]
+        usuario = conexion.execute(models.Usuario.__table__.select()).first()
+
+    return ids, ServicioSeguridad.crear_token_usuario(usuario)
+
+def generar_pedidos(ids, args) -> list:
+    """Genera pedidos aleatorios de uno o varios artículos, a veces repetidos"""
+    aleatorio = random.Random(args.semilla)
+    return [
+        {
+            "items": [
+                {"articulo_id": aleatorio.choice(ids), "cantidad": aleatorio.randint(1, 5)}
+                for _ in range(aleatorio.randint(1, 3))
+            ]
+        }
+        for _ in range(args.pedidos)
+    ]
+
+async def ejecutar_carga(url: str, token: str, pedidos: list, args) -> dict:
+    """Envía los pedidos con la concurrencia indicada y cuenta las respuestas"""
+    import httpx
+
+    estados = Counter()
+    latencias = []
+    pendientes = list(pedidos)
+    cabeceras = {"Authorization": f"Bearer {token}"}
+    limites = httpx.Limits(max_connections=args.concurrencia)
+
+    async with httpx.AsyncClient(base_url=url, headers=cabeceras, limits=limites, timeout=60) as cliente:
+
+        async def trabajador():
+            while pendientes:
+                pedido = pendientes.pop()
+                inicio = time.perf_counter()
+                respuesta = await cliente.post("/api/pedidos", json=pedido)
+                latencias.append(time.perf_counter() - inicio)
+                estados[respuesta.status_code] += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(args.concurrencia)))
+        duracion = time.perf_counter() - inicio
+
+    return {
+        "estados": dict(estados),
+        "peticiones_por_segundo": round(len(pedidos) / duracion, 1),
+        "p50/p95 (ms)": f"{percentil(latencias, 50):.1f} / {percentil(latencias, 95):.1f}",
+    }
+
+def verificar(engine, ids, args, estados: dict) -> list:
+    """Comprueba la consistencia del stock y devuelve la lista de fallos"""
+    from sqlalchemy import func, select
+    from backend import models
+
+    fallos = []
+    with engine.connect() as conexion:
+        stock = dict(conexion.execute(
+            select(models.ArticuloInventario.id, models.ArticuloInventario.cantidad)
+            .where(models.ArticuloInventario.id.in_(ids))
+        ).all())
+        vendido = dict(conexion.execute(
+            select(models.pedido_articulos.c.articulo_id, func.sum(models.pedido_articulos.c.cantidad))
+            .where(models.pedido_articulos.c.articulo_id.in_(ids))
+            .group_by(models.pedido_articulos.c.articulo_id)
+        ).all())
+        # Solo los pedidos de los artículos disputados (la base de datos puede tener otros)
+        total_pedidos = conexion.execute(
+            select(func.count(func.distinct(models.pedido_articulos.c.pedido_id)))
+            .where(models.pedido_articulos.c.articulo_id.in_(ids))
+        ).scalar()
+
+    for articulo_id in ids:
+        restante = stock[articulo_id]
+        descontado = args.stock - restante
+        if restante < 0:
+            fallos.append(f"Artículo {articulo_id} con stock negativo: {restante}")
+        if descontado != vendido.get(articulo_id, 0):
+            fallos.append(
+                f"Artículo {articulo_id}: descontado {descontado}, en pedidos {vendido.get(articulo_id, 0)}"
+            )
+        print(f"   Artículo {articulo_id}: stock final {restante}, vendido {vendido.get(articulo_id, 0)}")
+
+    creados = estados.get(201, 0)
+    if total_pedidos != creados:
+        fallos.append(f"{total_pedidos} pedidos en la base de datos para {creados} respuestas 201")
+    inesperados = {estado: n for estado, n in estados.items() if estado not in (201, 400)}
+    if inesperados:
+        fallos.append(f"Respuestas inesperadas: {inesperados}")
+
+    return fallos
+
+def main():
+    """Función principal de la prueba de estrés"""
+    args = parsear_argumentos()
+
+    # La base de datos temporal debe configurarse antes de importar el backend
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/estres.db"
+    from backend.database import engine
+    from backend.models import Base
+
+    print("🛒 Prueba de estrés de pedidos concurrentes")
+    print("=" * 50)
+    print(f"   Artículos: {args.articulos} | Stock: {args.stock} | "
+          f"Pedidos: {args.pedidos} | Concurrencia: {args.concurrencia}")
+    Base.metadata.create_all(bind=engine)
+    ids, token = preparar_datos(engine, args)
+    pedidos = generar_pedidos(ids, args)
+
+    servidor, url = iniciar_servidor("backend.main:app")
+    try:
+        metricas = asyncio.run(ejecutar_carga(url, token, pedidos, args))
+    finally:
+        detener_servidor(servidor)
+
+    print(f"\n📊 Respuestas: {metricas['estados']}")
+    print(f"   Peticiones/s: {metricas['peticiones_por_segundo']} | p50/p95 (ms): {metricas['p50/p95 (ms)']}")
+    fallos = verificar(engine, ids, args, metricas["estados"])
+
+    if fallos:
+        print("\n❌ Inconsistencias detectadas:")
+        for fallo in fallos:
+            print(f"   - {fallo}")
+        sys.exit(1)
+    print("\n✅ Stock consistente: sin sobreventa ni descuentos perdidos")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Utilidades compartidas por los benchmarks y pruebas de estrés.
+"""
+
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Directorio raíz del proyecto
+RAIZ = Path(__file__).parent.parent
+
+def iniciar_servidor(aplicacion: str, factory: bool = False):
+    """Levanta uvicorn en otro proceso sobre un puerto libre y devuelve (proceso, url)"""
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        puerto = sock.getsockname()[1]
+
+    comando = [sys.executable, "-m", "uvicorn", aplicacion, "--port", str(puerto), "--log-level", "warning"]
+    if factory:
+        comando.append("--factory")
+    proceso = subprocess.Popen(comando, cwd=str(RAIZ))
+
+    url = f"http://127.0.0.1:{puerto}"
+    while True:
+        try:
+            httpx.get(f"{url}/api/salud")
+            return proceso, url
+        except httpx.TransportError:
+            if proceso.poll() is not None:
+                raise RuntimeError(f"No se pudo iniciar el servidor para {aplicacion}")
+            time.sleep(0.1)
+
+def detener_servidor(proceso) -> None:
+    """Detiene un servidor iniciado con `iniciar_servidor`"""
+    proceso.terminate()
+    proceso.wait()
+
+def percentil(valores, p: float) -> float:
+    """Percentil p (0-100) en milisegundos"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice] * 1000
@@ -4,16 +4,27 @@ Script para configurar la base de datos inicial con datos de ejemplo.
 Crea un usuario administrador y algunos productos de muestra.
 """
 
+import argparse
+import math
+import random
 import sys
 import os
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional
 
 # Agregar el directorio raíz al path para importar módulos
 sys.path.append(str(Path(__file__).parent))
 
 from backend.database import engine, SessionLocal
-from backend.models import Base, Usuario, ArticuloInventario
+from backend.models import Base, Usuario, ArticuloInventario, Pedido, pedido_articulos
 from backend.crud import ServicioSeguridad
+from backend.busqueda import ServicioBusqueda
+from backend.migraciones import ServicioMigraciones
+from backend.estadisticas import ServicioEstadisticas
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -21,6 +32,8 @@ def crear_tablas():
     """Crea todas las tablas en la base de datos"""
     print("Creando tablas de la base de datos...")
     Base.metadata.create_all(bind=engine)
+    ServicioMigraciones.actualizar(engine)
+    ServicioBusqueda.crear_indice(engine)
     print("✅ Tablas creadas exitosamente")
 
 def crear_usuario_admin(db: Session):
@@ -158,8 +171,208 @@ def crear_usuario_cliente_ejemplo(db: Session):
     print(f"   Email: cliente@ejemplo.com")
     print(f"   Contraseña: {cliente_password}")
     
+# Contraseña de todos los usuarios generados
+PASSWORD_SINTETICOS = "usuario123"
+
+# Fecha de referencia fija para que los datos generados no dependan del día
+FECHA_REFERENCIA = datetime(2025, 1, 1)
+
+CATEGORIAS = {
+    # categoría: (precio medio aproximado, marcas)
+    "Laptop": (1100, ["ASUS", "Dell", "HP", "Lenovo", "Apple", "Acer", "MSI"]),
+    "Monitor": (320, ["Samsung", "LG", "Dell", "BenQ", "AOC", "ASUS"]),
+    "Teclado": (90, ["Logitech", "Corsair", "Razer", "HyperX", "Keychron"]),
+    "Mouse": (55, ["Logitech", "Razer", "Corsair", "SteelSeries", "Glorious"]),
+    "Auriculares": (150, ["Sony", "Bose", "Sennheiser", "HyperX", "JBL"]),
+    "SSD": (110, ["Samsung", "Crucial", "Kingston", "WD", "Seagate"]),
+    "Smartphone": (700, ["Apple", "Samsung", "Xiaomi", "Google", "OnePlus"]),
+    "Tablet": (450, ["Apple", "Samsung", "Lenovo", "Xiaomi"]),
+    "Impresora": (180, ["HP", "Epson", "Canon", "Brother"]),
+    "Router": (95, ["TP-Link", "ASUS", "Netgear", "Ubiquiti"]),
+}
+ADJETIVOS = ["Gaming", "Pro", "Ultra", "Compacto", "Inalámbrico", "Ergonómico", "Premium", "Básico", "Plus", "Max"]
+ESTADOS_PEDIDO = ["entregado", "enviado", "procesando", "pendiente", "cancelado"]
+PESOS_ESTADOS = [70, 10, 8, 8, 4]
+NOMBRES = ["Ana", "Luis", "María", "Carlos", "Lucía", "Javier", "Elena", "Pablo", "Sofía", "Diego"]
+APELLIDOS = ["García", "Martínez", "López", "Sánchez", "Pérez", "Gómez", "Fernández", "Ruiz", "Díaz", "Moreno"]
+
+def insertar_por_lotes(tabla, filas: Iterator[dict], total: int, tamano_lote: int, nombre: str,
+                       tabla_detalle=None, detalle: Optional[List[dict]] = None):
+    """
+    Inserta las filas generadas con executemany de Core, un commit por lote,
+    informando del progreso en filas por segundo. Si se indica `detalle`, el
+    generador va dejando ahí las filas hijas (p. ej. las líneas de cada
+    pedido) y se insertan en `tabla_detalle` en la misma transacción.
+    """
+    inicio = time.perf_counter()
+    insertadas = 0
+    filas_totales = 0
+    
+    while True:
+        lote = list(islice(filas, tamano_lote))
+        if not lote:
+            break
+        with engine.begin() as conexion:
+            conexion.execute(tabla.insert(), lote)
+            if detalle:
+                conexion.execute(tabla_detalle.insert(), detalle)
+        insertadas += len(lote)
+        filas_totales += len(lote) + len(detalle or [])
+        if detalle:
+            detalle.clear()
+        duracion = time.perf_counter() - inicio
+        print(f"\r   {nombre}: {insertadas:,}/{total:,} ({filas_totales / duracion:,.0f} filas/s)", end="", flush=True)
+    
+    duracion = max(time.perf_counter() - inicio, 1e-9)
+    print(f"\r✅ {nombre}: {insertadas:,} ({filas_totales:,} filas) en {duracion:.1f} s "
+          f"({filas_totales / duracion:,.0f} filas/s)")
+
+def siguiente_id(tabla) -> int:
+    """Devuelve el primer ID libre de una tabla"""
+    with engine.connect() as conexion:
+        return (conexion.execute(select(func.max(tabla.c.id))).scalar() or 0) + 1
+
+def generar_articulos(aleatorio: random.Random, total: int, primer_id: int) -> Iterator[dict]:
+    """Artículos con nombres únicos, precios log-normales por categoría y ~10% sin stock"""
+    categorias = list(CATEGORIAS)
+    for n in range(primer_id, primer_id + total):
+        categoria = aleatorio.choice(categorias)
+        precio_medio, marcas = CATEGORIAS[categoria]
+        marca = aleatorio.choice(marcas)
+        adjetivo = aleatorio.choice(ADJETIVOS)
+        yield {
+            "id": n,
+            "nombre": f"{categoria} {marca} {adjetivo} {n}",
+            "descripcion": f"{categoria} {adjetivo.lower()} de {marca}, modelo {n}",
+            "cantidad": 0 if aleatorio.random() < 0.1 else int(aleatorio.expovariate(1 / 40)) + 1,
+            "precio": round(aleatorio.lognormvariate(math.log(precio_medio), 0.5), 2),
+            "fecha_creacion": FECHA_REFERENCIA - timedelta(seconds=aleatorio.randrange(3 * 365 * 86400)),
+        }
+
+def generar_usuarios(aleatorio: random.Random, total: int, primer_id: int, password_hash: str) -> Iterator[dict]:
+    """Clientes con el mismo hash de contraseña precalculado y altas repartidas en dos años"""
+    for n in range(primer_id, primer_id + total):
+        yield {
+            "id": n,
+            "email": f"usuario{n}@ejemplo.com",
+            "nombre": aleatorio.choice(NOMBRES),
+            "apellidos": aleatorio.choice(APELLIDOS),
+            "password_hash": password_hash,
+            "rol": "cliente",
+            "activo": aleatorio.random() > 0.02,
+            "fecha_creacion": FECHA_REFERENCIA - timedelta(seconds=aleatorio.randrange(2 * 365 * 86400)),
+        }
+
+def generar_pedidos(
+    aleatorio: random.Random,
+    total: int,
+    primer_id: int,
+    usuario_ids: List[int],
+    precios: Dict[int, float],
+    lineas: List[dict]
+) -> Iterator[dict]:
+    """
+    Pedidos con una distribución realista de líneas: la mayoría de 1-2
+    artículos, con la popularidad de los artículos siguiendo una ley de
+    potencias (unos pocos artículos concentran gran parte de las ventas).
+    Las líneas de cada pedido se añaden a `lineas`.
+    """
+    # Pesos acumulados de Zipf (s=1.1) sobre un orden aleatorio de los artículos
+    populares = list(precios)
+    aleatorio.shuffle(populares)
+    pesos_acumulados = list(accumulate(1 / (rango ** 1.1) for rango in range(1, len(populares) + 1)))
+    
+    for n in range(primer_id, primer_id + total):
+        numero_lineas = min(8, 1 + int(aleatorio.expovariate(1 / 0.8)))
+        elegidos = set(aleatorio.choices(populares, cum_weights=pesos_acumulados, k=numero_lineas))
+        total_pedido = 0.0
+        for articulo_id in elegidos:
+            cantidad = 1 if aleatorio.random() < 0.8 else aleatorio.randint(2, 4)
+            lineas.append({
+                "pedido_id": n,
+                "articulo_id": articulo_id,
+                "cantidad": cantidad,
+                "precio_unitario": precios[articulo_id],
+            })
+            total_pedido += precios[articulo_id] * cantidad
+        yield {
+            "id": n,
+            "usuario_id": aleatorio.choice(usuario_ids),
+            "total": round(total_pedido, 2),
+            "estado": aleatorio.choices(ESTADOS_PEDIDO, weights=PESOS_ESTADOS)[0],
+            "fecha_pedido": FECHA_REFERENCIA - timedelta(seconds=aleatorio.randrange(365 * 86400)),
+        }
+
+def generar_datos_sinteticos(args):
+    """
+    Genera un volumen de datos de tamaño producción, determinista según la
+    semilla, con inserciones masivas de Core.
+    """
+    print(f"\n🏭 Generando datos sintéticos (semilla {args.semilla}, lotes de {args.lote:,})...")
+    aleatorio = random.Random(args.semilla)
+    inicio = time.perf_counter()
+    
+    if args.articulos:
+        # El índice de búsqueda se reconstruye una vez al final en lugar de fila a fila
+        tabla = ArticuloInventario.__table__
+        with ServicioBusqueda.carga_masiva(engine):
+            insertar_por_lotes(
+                tabla, generar_articulos(aleatorio, args.articulos, siguiente_id(tabla)),
+                args.articulos, args.lote, "Artículos"
+            )
+    
+    if args.usuarios:
+        # Un único hash para todos: bcrypt por usuario tardaría horas
+        password_hash = ServicioSeguridad.obtener_password_hash(PASSWORD_SINTETICOS)
+        tabla = Usuario.__table__
+        insertar_por_lotes(
+            tabla, generar_usuarios(aleatorio, args.usuarios, siguiente_id(tabla), password_hash),
+            args.usuarios, args.lote, "Usuarios"
+        )
+    
+    if args.pedidos:
+        with engine.connect() as conexion:
+            usuario_ids = list(conexion.execute(
+                select(Usuario.id).where(Usuario.rol == "cliente")
+            ).scalars())
+            precios = dict(conexion.execute(select(ArticuloInventario.id, ArticuloInventario.precio)).all())
+        if not usuario_ids or not precios:
+            print("⚠️ Se necesitan clientes y artículos para generar pedidos")
+        else:
+            lineas: List[dict] = []
+            pedidos = generar_pedidos(
+                aleatorio, args.pedidos, siguiente_id(Pedido.__table__), usuario_ids, precios, lineas
+            )
+            insertar_por_lotes(
+                Pedido.__table__, pedidos, args.pedidos, args.lote, "Pedidos",
+                tabla_detalle=pedido_articulos, detalle=lineas
+            )
+    
+    # Los datos se insertan sin pasar por los servicios: recalcular los contadores
+    # y actualizar las estadísticas del planificador de consultas
+    with SessionLocal() as db:
+        ServicioEstadisticas.recalcular(db)
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conexion:
+            conexion.exec_driver_sql("ANALYZE")
+    
+    print(f"\n⏱️ Datos sintéticos generados en {time.perf_counter() - inicio:.1f} s")
+
+def parsear_argumentos():
+    """Lee las opciones del generador de datos de la línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Configura la base de datos y, opcionalmente, genera datos sintéticos a gran escala"
+    )
+    parser.add_argument("--articulos", type=int, default=0, help="Artículos sintéticos a generar")
+    parser.add_argument("--usuarios", type=int, default=0, help="Clientes sintéticos a generar")
+    parser.add_argument("--pedidos", type=int, default=0, help="Pedidos sintéticos a generar")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla para que los datos sean reproducibles")
+    parser.add_argument("--lote", type=int, default=10000, help="Filas por transacción")
+    return parser.parse_args()
+
 def main():
     """Función principal de configuración"""
+    args = parsear_argumentos()
     print("� Iniciando configuración de la base de datos...")
     print("=" * 50)
     
@@ -176,6 +389,13 @@ def main():
             crear_usuario_cliente_ejemplo(db)
             crear_productos_ejemplo(db)
             
+            # Los datos de ejemplo se insertan sin pasar por los servicios
+            ServicioEstadisticas.recalcular(db)
+            
+            # Datos sintéticos a gran escala (opcional)
+            if args.articulos or args.usuarios or args.pedidos:
+                generar_datos_sinteticos(args)
+            
             print("=" * 50)
             print("✅ Configuración completada exitosamente!")
             print("\n📋 Resumen de la configuración:")
@@ -183,13 +403,17 @@ def main():
             # Mostrar estadísticas
             total_usuarios = db.query(Usuario).count()
             total_productos = db.query(ArticuloInventario).count()
+            total_pedidos = db.query(Pedido).count()
             
             print(f"   👥 Usuarios creados: {total_usuarios}")
             print(f"   📦 Productos disponibles: {total_productos}")
+            print(f"   🧾 Pedidos: {total_pedidos}")
             
             print("\n🔐 Credenciales para pruebas:")
             print("   Admin: admin@tienda.com / admin123")
             print("   Cliente: cliente@ejemplo.com / cliente123")
+            if args.usuarios:
+                print(f"   Clientes generados: usuarioN@ejemplo.com / {PASSWORD_SINTETICOS}")
             
             print("\n🌐 Para iniciar la aplicación ejecuta:")
             print("   python main.py")
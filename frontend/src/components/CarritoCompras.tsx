@@ -10,7 +10,7 @@ interface CarritoComprasProps {
   onActualizarCantidad: (productoId: number, nuevaCantidad: number) => void;
   onRemoverProducto: (productoId: number) => void;
   onVaciarCarrito: () => void;
-  onActualizarStock: () => void;
+  onActualizarStock: (ids: number[]) => void;
   total: number;
   onRequiereLogin: () => void;
 }
@@ -76,9 +76,9 @@ const CarritoCompras: React.FC<CarritoComprasProps> = ({
       // Marcar como compra realizada
       setCompraRealizada(true);
       
-      // Vaciar carrito y actualizar stock
+      // Vaciar carrito y actualizar el stock de los artículos comprados
       onVaciarCarrito();
-      onActualizarStock();
+      onActualizarStock(pedidoData.items.map(item => item.articulo_id));
       
     } catch (err) {
       if (err instanceof ApiError) {
@@ -1,6 +1,6 @@
-import React, { useState, useEffect } from 'react';
-import { inventarioApi, ApiError } from '../services/api';
-import { ArticuloInventario } from '../types';
+import React, { useState, useEffect, useRef } from 'react';
+import { inventarioApi, ApiError, LIMITE_PAGINA_ARTICULOS } from '../services/api';
+import { ArticuloInventario, EventoArticulo } from '../types';
 import FormularioArticulo from './FormularioArticulo';
 
 const ListaInventario: React.FC = () => {
@@ -10,15 +10,50 @@ const ListaInventario: React.FC = () => {
   const [mostrarFormulario, setMostrarFormulario] = useState(false);
   const [articuloEditando, setArticuloEditando] = useState<ArticuloInventario | null>(null);
 
+  // Lista actual, para saber desde los eventos si un artículo ya se está mostrando
+  const articulosRef = useRef<ArticuloInventario[]>([]);
+  articulosRef.current = articulos;
+
+  // Si la página cargada es el inventario entero (entonces un artículo nuevo pertenece a ella)
+  const inventarioCompletoRef = useRef(false);
+
   useEffect(() => {
     cargarArticulos();
+    return inventarioApi.suscribirCambios(aplicarCambio, cargarArticulos);
   }, []);
 
+  // Aplicar un cambio de stock o precio sin volver a pedir todo el inventario
+  const aplicarCambio = async (evento: EventoArticulo) => {
+    if (evento.eliminado) {
+      setArticulos(actuales => actuales.filter(articulo => articulo.id !== evento.id));
+      return;
+    }
+
+    if (articulosRef.current.some(articulo => articulo.id === evento.id)) {
+      setArticulos(actuales => actuales.map(articulo =>
+        articulo.id === evento.id ? { ...articulo, cantidad: evento.cantidad, precio: evento.precio } : articulo
+      ));
+    } else if (inventarioCompletoRef.current) {
+      // Artículo nuevo: pedir solo ese. Con más de una página, los que no se
+      // están mostrando se ignoran
+      try {
+        const articulo = await inventarioApi.obtenerArticulo(evento.id);
+        inventarioCompletoRef.current = articulosRef.current.length + 1 < LIMITE_PAGINA_ARTICULOS;
+        setArticulos(actuales =>
+          actuales.some(actual => actual.id === articulo.id) ? actuales : [...actuales, articulo]
+        );
+      } catch (err) {
+        console.error('Error al cargar el artículo:', err);
+      }
+    }
+  };
+
   const cargarArticulos = async () => {
     try {
       setCargando(true);
       setError(null);
       const data = await inventarioApi.obtenerArticulos();
+      inventarioCompletoRef.current = data.length < LIMITE_PAGINA_ARTICULOS;
       setArticulos(data);
     } catch (err) {
       console.error('Error al cargar artículos:', err);
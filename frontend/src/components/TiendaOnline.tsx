@@ -1,6 +1,6 @@
-import React, { useState, useEffect } from 'react';
-import { inventarioApi, generalApi, ApiError } from '../services/api';
-import { ArticuloInventario } from '../types';
+import React, { useState, useEffect, useRef } from 'react';
+import { inventarioApi, generalApi, ApiError, LIMITE_PAGINA_ARTICULOS } from '../services/api';
+import { ArticuloInventario, EventoArticulo } from '../types';
 import { useAuth } from '../contexts/AuthContext';
 import TarjetaProducto from './TarjetaProducto';
 import CarritoCompras from './CarritoCompras';
@@ -23,16 +23,53 @@ const TiendaOnline: React.FC = () => {
   const [busqueda, setBusqueda] = useState('');
   const [estadisticas, setEstadisticas] = useState<{ total_articulos: number } | null>(null);
 
+  // Lista actual, para saber desde los eventos si un artículo ya se está mostrando
+  const productosRef = useRef<ArticuloInventario[]>([]);
+  productosRef.current = productos;
+
+  // Artículos de la página cargada (con y sin stock) y si esa página es el catálogo entero
+  const vistaRef = useRef<{ ids: Set<number>; completa: boolean }>({ ids: new Set(), completa: false });
+
   useEffect(() => {
     cargarProductos();
     cargarEstadisticas();
+    return inventarioApi.suscribirCambios(aplicarCambio, cargarProductos);
   }, []);
 
+  // Aplicar un cambio de stock o precio sin volver a pedir todo el catálogo
+  const aplicarCambio = async (evento: EventoArticulo) => {
+    if (evento.eliminado || evento.cantidad <= 0) {
+      setProductos(actuales => actuales.filter(producto => producto.id !== evento.id));
+      return;
+    }
+
+    if (productosRef.current.some(producto => producto.id === evento.id)) {
+      setProductos(actuales => actuales.map(producto =>
+        producto.id === evento.id ? { ...producto, cantidad: evento.cantidad, precio: evento.precio } : producto
+      ));
+    } else if (vistaRef.current.ids.has(evento.id) || vistaRef.current.completa) {
+      // Artículo de la página que vuelve a tener stock, o nuevo si el catálogo
+      // entero cabe en la página: pedir solo ese. Los de otras páginas se ignoran
+      try {
+        const articulo = await inventarioApi.obtenerArticulo(evento.id);
+        const vista = vistaRef.current;
+        vista.ids.add(articulo.id);
+        vista.completa = vista.completa && vista.ids.size < LIMITE_PAGINA_ARTICULOS;
+        setProductos(actuales =>
+          actuales.some(producto => producto.id === articulo.id) ? actuales : [...actuales, articulo]
+        );
+      } catch (err) {
+        console.error('Error al cargar el artículo:', err);
+      }
+    }
+  };
+
   const cargarProductos = async () => {
     try {
       setCargando(true);
       setError(null);
       const data = await inventarioApi.obtenerArticulos();
+      vistaRef.current = { ids: new Set(data.map(producto => producto.id)), completa: data.length < LIMITE_PAGINA_ARTICULOS };
       // Solo mostrar productos que tienen stock
       setProductos(data.filter(producto => producto.cantidad > 0));
     } catch (err) {
@@ -43,6 +80,43 @@ const TiendaOnline: React.FC = () => {
     }
   };
 
+  // Actualizar precio y stock de unos artículos (los del carrito) con una sola petición
+  const actualizarArticulos = async (ids: number[]) => {
+    if (ids.length === 0) {
+      return;
+    }
+    try {
+      const { articulos, no_encontrados } = await inventarioApi.obtenerLote(ids);
+      const actuales = new Map(articulos.map(articulo => [articulo.id, articulo]));
+
+      // Solo se muestran los productos con stock; los que no estaban se añaden al final
+      setProductos(productosActuales => [
+        ...productosActuales
+          .map(producto => ids.includes(producto.id!) ? actuales.get(producto.id) : producto)
+          .filter((producto): producto is ArticuloInventario => producto !== undefined && producto.cantidad > 0),
+        ...articulos.filter(articulo =>
+          articulo.cantidad > 0 && !productosActuales.some(producto => producto.id === articulo.id)
+        )
+      ]);
+      setCarrito(carritoActual => carritoActual
+        .filter(item => !no_encontrados.includes(item.id!) && (actuales.get(item.id)?.cantidad ?? 1) > 0)
+        .map(item => {
+          const articulo = actuales.get(item.id);
+          return articulo
+            ? { ...item, ...articulo, cantidadCarrito: Math.min(item.cantidadCarrito, articulo.cantidad) }
+            : item;
+        })
+      );
+    } catch (err) {
+      console.error('Error al actualizar artículos:', err);
+    }
+  };
+
+  const abrirCarrito = () => {
+    setMostrarCarrito(true);
+    actualizarArticulos(carrito.map(item => item.id!));
+  };
+
   const cargarEstadisticas = async () => {
     try {
       const data = await generalApi.obtenerEstadisticas();
@@ -200,7 +274,7 @@ const TiendaOnline: React.FC = () => {
               
               {/* Carrito */}
               <button
-                onClick={() => setMostrarCarrito(true)}
+                onClick={abrirCarrito}
                 className="relative bg-blue-600 hover:bg-blue-700 text-white px-6 py-3 rounded-lg font-medium transition-colors duration-200 flex items-center space-x-2"
               >
                 <svg className="w-5 h-5" fill="none" stroke="currentColor" viewBox="0 0 24 24">
@@ -300,7 +374,7 @@ const TiendaOnline: React.FC = () => {
           onActualizarCantidad={actualizarCantidadCarrito}
           onRemoverProducto={removerDelCarrito}
           onVaciarCarrito={vaciarCarrito}
-          onActualizarStock={cargarProductos}
+          onActualizarStock={actualizarArticulos}
           onRequiereLogin={manejarRequiereLogin}
           total={obtenerTotalCarrito()}
         />
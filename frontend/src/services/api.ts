@@ -1,7 +1,10 @@
-import { ArticuloInventario, ArticuloInventarioCrear, ArticuloInventarioActualizar, Usuario, UsuarioCrear, UsuarioLogin, Token, Pedido, PedidoCrear, MensajeRespuesta } from '../types';
+import { ArticuloInventario, ArticuloInventarioCrear, ArticuloInventarioActualizar, EventoArticulo, LoteArticulos, Usuario, UsuarioCrear, UsuarioLogin, Token, Pedido, PedidoCrear, MensajeRespuesta } from '../types';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
+// Artículos que devuelve GET /api/articulos sin `limite` (el valor por defecto de la API)
+export const LIMITE_PAGINA_ARTICULOS = 100;
+
 class ApiError extends Error {
   constructor(public status: number, message: string) {
     super(message);
@@ -77,6 +80,20 @@ export const inventarioApi = {
     return handleResponse(response);
   },
 
+  // Obtener varios artículos por ID en una sola petición (POST si no caben en la URL)
+  obtenerLote: async (ids: number[]): Promise<LoteArticulos> => {
+    const response = ids.length <= 50
+      ? await fetch(`${API_BASE_URL}/api/articulos/lote?ids=${ids.join(',')}`, {
+          headers: obtenerHeaders(),
+        })
+      : await fetch(`${API_BASE_URL}/api/articulos/lote`, {
+          method: 'POST',
+          headers: obtenerHeaders(),
+          body: JSON.stringify({ ids }),
+        });
+    return handleResponse(response);
+  },
+
   // Crear un nuevo artículo (solo admin)
   crearArticulo: async (articulo: ArticuloInventarioCrear): Promise<ArticuloInventario> => {
     const response = await fetch(`${API_BASE_URL}/api/articulos`, {
@@ -118,6 +135,26 @@ export const inventarioApi = {
   obtenerEstadisticas: async (): Promise<{ total_articulos: number; mensaje: string }> => {
     const response = await fetch(`${API_BASE_URL}/api/estadisticas`);
     return handleResponse(response);
+  },
+
+  // Suscribirse a los cambios del catálogo (Server-Sent Events). Devuelve la función para cerrar la conexión
+  suscribirCambios: (alCambiar: (evento: EventoArticulo) => void, alRecargar: () => void): (() => void) => {
+    const fuente = new EventSource(`${API_BASE_URL}/api/articulos/eventos`);
+    let conectada = false;
+
+    fuente.addEventListener('articulo', (evento) => {
+      alCambiar(JSON.parse((evento as MessageEvent).data));
+    });
+    fuente.addEventListener('recargar', () => alRecargar());
+    fuente.onopen = () => {
+      // Tras una reconexión se pueden haber perdido eventos
+      if (conectada) {
+        alRecargar();
+      }
+      conectada = true;
+    };
+
+    return () => fuente.close();
   }
 };
 
@@ -22,6 +22,20 @@ export interface ArticuloInventarioActualizar {
   precio?: number;
 }
 
+// Respuesta de /api/articulos/lote
+export interface LoteArticulos {
+  articulos: ArticuloInventario[];
+  no_encontrados: number[];
+}
+
+// Cambio de un artículo recibido por /api/articulos/eventos
+export interface EventoArticulo {
+  id: number;
+  cantidad: number;
+  precio: number;
+  eliminado: boolean;
+}
+
 // Interfaces para usuarios y autenticación
 export interface Usuario {
   id: number;
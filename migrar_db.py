@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Script para actualizar el esquema de la base de datos.
+Crea las tablas que falten y aplica las migraciones pendientes de backend/migraciones.
+
+Uso:
+    python migrar_db.py              # Aplica todas las migraciones pendientes
+    python migrar_db.py --hasta 1    # Aplica hasta la versión indicada
+    python migrar_db.py --estado     # Muestra las migraciones aplicadas y pendientes
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent))
+
+from backend.database import engine
+from backend.models import Base
+from backend.migraciones import ServicioMigraciones
+
+def mostrar_estado():
+    """Muestra qué migraciones están aplicadas y cuáles pendientes"""
+    aplicadas = ServicioMigraciones.obtener_versiones_aplicadas(engine)
+    for version, nombre, modulo in ServicioMigraciones.listar_migraciones():
+        marca = "✅" if version in aplicadas else "⏳"
+        print(f"{marca} {version:04d} {nombre}: {modulo.DESCRIPCION}")
+
+def main():
+    """Función principal de migración"""
+    parser = argparse.ArgumentParser(description="Actualiza el esquema de la base de datos")
+    parser.add_argument("--hasta", type=int, help="Última versión a aplicar")
+    parser.add_argument("--estado", action="store_true", help="Solo muestra el estado de las migraciones")
+    args = parser.parse_args()
+
+    print("🗄️  Migraciones de la base de datos")
+    print("=" * 50)
+
+    try:
+        if args.estado:
+            mostrar_estado()
+            return
+
+        Base.metadata.create_all(bind=engine)
+        aplicadas = ServicioMigraciones.actualizar(engine, hasta=args.hasta)
+        for nombre in aplicadas:
+            print(f"✅ Aplicada: {nombre}")
+        if not aplicadas:
+            print("✅ El esquema ya está actualizado")
+    except Exception as e:
+        print(f"❌ Error durante la migración: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
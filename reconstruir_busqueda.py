@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir el índice de búsqueda de texto completo (FTS5).
+Útil para bases de datos existentes o después de cargas masivas de artículos.
+"""
+
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent))
+
+from backend.database import engine
+from backend.models import Base
+from backend.busqueda import ServicioBusqueda
+
+def main():
+    """Función principal de reconstrucción"""
+    print("🔎 Reconstruyendo índice de búsqueda...")
+    print("=" * 50)
+
+    try:
+        Base.metadata.create_all(bind=engine)
+        total = ServicioBusqueda.reconstruir_indice(engine)
+        print(f"✅ Índice reconstruido: {total} artículos indexados")
+    except Exception as e:
+        print(f"❌ Error durante la reconstrucción: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
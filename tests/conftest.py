@@ -0,0 +1,45 @@
+"""
+Configuración común de los tests: una base de datos SQLite temporal y la
+aplicación completa (con su ciclo de vida) servida por TestClient.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# La base de datos temporal debe configurarse antes de importar el backend
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/tests.db"
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import models
+from backend.crud import ServicioSeguridad
+from backend.database import engine
+from backend.main import crear_app
+
+@pytest.fixture(scope="session")
+def cliente():
+    """Cliente HTTP de la aplicación; el ciclo de vida crea el esquema al entrar"""
+    with TestClient(crear_app()) as cliente:
+        yield cliente
+
+@pytest.fixture
+def crear_usuario(cliente):
+    """Crea un usuario directamente en la base de datos y devuelve (id, cabeceras de autenticación)"""
+    def crear(rol: str = "cliente"):
+        email = f"{rol}-{os.urandom(4).hex()}@example.com"
+        with engine.begin() as conexion:
+            usuario_id = conexion.execute(
+                models.Usuario.__table__.insert(),
+                {"email": email, "nombre": "Usuario de prueba", "password_hash": "-", "rol": rol}
+            ).inserted_primary_key[0]
+        usuario = models.Usuario(id=usuario_id, email=email, rol=rol)
+        return usuario_id, {"Authorization": f"Bearer {ServicioSeguridad.crear_token_usuario(usuario)}"}
+
+    return crear
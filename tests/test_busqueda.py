@@ -0,0 +1,58 @@
+"""
+La búsqueda usa el índice FTS5 que crea la migración, también desde las
+conexiones de solo lectura que no pueden crearlo.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend import busqueda, models
+from backend.busqueda import ServicioBusqueda
+from backend.database import engine, engine_lectura
+
+def test_busqueda_usa_el_indice_de_la_migracion(cliente, crear_usuario):
+    _, cabeceras_admin = crear_usuario("admin")
+    respuesta = cliente.post(
+        "/api/articulos",
+        json={"nombre": "Teclado Mecánico", "descripcion": "Switches rojos", "cantidad": 1, "precio": 80.0},
+        headers=cabeceras_admin
+    )
+    assert respuesta.status_code == 201, respuesta.text
+
+    # "mecan" sin tilde solo coincide con el tokenizador de FTS5 (ILIKE no ignora las tildes)
+    respuesta = cliente.get("/api/articulos", params={"buscar": "teclado mecan"})
+    assert respuesta.status_code == 200, respuesta.text
+    assert [articulo["nombre"] for articulo in respuesta.json()] == ["Teclado Mecánico"]
+
+def test_indice_ausente_no_se_recuerda_para_siempre(cliente, monkeypatch):
+    monkeypatch.setattr(busqueda, "_fts_disponible", False)
+    monkeypatch.setattr(busqueda, "_fts_comprobar_desde", 0.0)
+    monkeypatch.setattr(busqueda, "TABLA_FTS", "indice_que_no_existe")
+
+    with Session(engine_lectura) as db:
+        assert not ServicioBusqueda.indice_disponible(db)
+        # Se vuelve a comprobar pasado el intervalo y entonces se encuentra
+        monkeypatch.setattr(busqueda, "TABLA_FTS", "articulos_busqueda")
+        monkeypatch.setattr(busqueda, "_fts_comprobar_desde", 0.0)
+        assert ServicioBusqueda.indice_disponible(db)
+
+def test_carga_masiva_interrumpida_se_repara(cliente, monkeypatch):
+    monkeypatch.setattr(busqueda, "_fts_disponible", False)
+    monkeypatch.setattr(busqueda, "_fts_comprobar_desde", 0.0)
+    # Una carga masiva que muere a mitad deja el índice sin triggers
+    with engine.begin() as conexion:
+        conexion.execute(text("DROP TRIGGER articulos_busqueda_ai"))
+        conexion.execute(
+            models.ArticuloInventario.__table__.insert(),
+            {"nombre": "Altavoz Inalámbrico", "cantidad": 1, "precio": 30.0}
+        )
+
+    with Session(engine_lectura) as db:
+        assert not ServicioBusqueda.indice_disponible(db)
+
+    assert ServicioBusqueda.reparar_indice(engine)
+    assert not ServicioBusqueda.reparar_indice(engine)
+    monkeypatch.setattr(busqueda, "_fts_comprobar_desde", 0.0)
+    with Session(engine_lectura) as db:
+        assert ServicioBusqueda.indice_disponible(db)
+        assert [articulo.nombre for articulo in ServicioBusqueda.buscar_articulos(db, "inalambrico")] == ["Altavoz Inalámbrico"]
@@ -0,0 +1,33 @@
+"""
+Validación condicional del catálogo: un cambio dentro del mismo segundo que
+la copia del cliente no puede responderse con 304 por If-Modified-Since.
+"""
+
+from datetime import timedelta
+from email.utils import format_datetime, parsedate_to_datetime
+
+def test_if_modified_since_no_oculta_cambios_del_mismo_segundo(cliente, crear_usuario):
+    _, cabeceras_admin = crear_usuario("admin")
+    respuesta = cliente.get("/api/articulos")
+    assert respuesta.status_code == 200
+    etag = respuesta.headers["etag"]
+    ultima_modificacion = respuesta.headers["last-modified"]
+
+    # Mismo ETag: la copia es exactamente la actual
+    assert cliente.get("/api/articulos", headers={"If-None-Match": etag}).status_code == 304
+
+    # Con solo If-Modified-Since igual al Last-Modified no se puede saber si
+    # hubo otro cambio en ese segundo
+    assert cliente.get("/api/articulos", headers={"If-Modified-Since": ultima_modificacion}).status_code == 200
+
+    # Un cambio en el catálogo invalida el ETag
+    respuesta = cliente.post(
+        "/api/articulos", json={"nombre": "Artículo nuevo", "cantidad": 1, "precio": 1.0}, headers=cabeceras_admin
+    )
+    assert respuesta.status_code == 201, respuesta.text
+    assert cliente.get("/api/articulos", headers={"If-None-Match": etag}).status_code == 200
+
+    # Una fecha del cliente posterior al segundo del último cambio sí es válida
+    actual = cliente.get("/api/articulos").headers["last-modified"]
+    posterior = format_datetime(parsedate_to_datetime(actual) + timedelta(seconds=1), usegmt=True)
+    assert cliente.get("/api/articulos", headers={"If-Modified-Since": posterior}).status_code == 304
@@ -0,0 +1,38 @@
+"""
+Los contadores de estadísticas mantenidos con deltas deben coincidir con un
+recálculo completo, incluido el valor del inventario con precios decimales.
+"""
+
+from backend import estadisticas
+from backend.database import SessionLocal
+from backend.estadisticas import ServicioEstadisticas
+
+def test_valor_del_inventario_no_acumula_error(cliente, crear_usuario):
+    _, cabeceras_admin = crear_usuario("admin")
+    # Otros tests insertan filas sin pasar por los servicios: partir de contadores al día
+    with SessionLocal() as db:
+        ServicioEstadisticas.recalcular(db)
+
+    ids = []
+    for precio in (0.1, 0.2, 19.99, 0.07):
+        respuesta = cliente.post(
+            "/api/articulos",
+            json={"nombre": f"Artículo a {precio}", "cantidad": 3, "precio": precio},
+            headers=cabeceras_admin
+        )
+        assert respuesta.status_code == 201, respuesta.text
+        ids.append(respuesta.json()["id"])
+    for articulo_id in ids:
+        for cantidad in (7, 1, 13):
+            respuesta = cliente.put(f"/api/articulos/{articulo_id}", json={"cantidad": cantidad}, headers=cabeceras_admin)
+            assert respuesta.status_code == 200, respuesta.text
+    assert cliente.delete(f"/api/articulos/{ids[0]}", headers=cabeceras_admin).status_code == 200
+
+    with SessionLocal() as db:
+        mantenido = ServicioEstadisticas.obtener_estadisticas(db)[estadisticas.VALOR_TOTAL_INVENTARIO]
+        recalculado = ServicioEstadisticas.recalcular(db)[estadisticas.VALOR_TOTAL_INVENTARIO]
+
+    assert mantenido == recalculado
+    assert isinstance(mantenido, int)
+    valor = cliente.get("/api/estadisticas").json()["inventario"]["valor_total_inventario"]
+    assert valor == round(recalculado / 100, 2)
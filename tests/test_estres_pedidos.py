@@ -0,0 +1,39 @@
+"""
+Versión reducida de benchmarks/estres_pedidos.py: varios hilos crean pedidos
+a la vez sobre pocos artículos con stock limitado y al terminar se aplican las
+mismas comprobaciones (sin stock negativo, y lo descontado coincide con los
+pedidos creados).
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from backend import models
+from backend.database import engine
+from benchmarks.estres_pedidos import generar_pedidos, verificar
+
+HILOS = 8
+
+def test_pedidos_concurrentes_no_sobrevenden(cliente, crear_usuario):
+    args = SimpleNamespace(stock=20, pedidos=120, semilla=7)
+    with engine.begin() as conexion:
+        ids = [
+            conexion.execute(
+                models.ArticuloInventario.__table__.insert(),
+                {"nombre": f"Artículo disputado {i}", "cantidad": args.stock, "precio": 10 + i}
+            ).inserted_primary_key[0]
+            for i in range(3)
+        ]
+    _, cabeceras = crear_usuario()
+    pedidos = generar_pedidos(ids, args)
+
+    def enviar(pedido):
+        return cliente.post("/api/pedidos", json=pedido, headers=cabeceras).status_code
+
+    with ThreadPoolExecutor(max_workers=HILOS) as ejecutor:
+        estados = Counter(ejecutor.map(enviar, pedidos))
+
+    # Con 60 unidades en total y 120 pedidos, algunos tienen que quedarse sin stock
+    assert estados[201] > 0 and estados[400] > 0, estados
+    assert verificar(engine, ids, args, dict(estados)) == []
@@ -0,0 +1,52 @@
+"""
+Una petición lenta cuya reserva Idempotency-Key toma otra petición no debe
+crear un segundo pedido ni descontar el stock dos veces.
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from backend import models, schemas
+from backend.crud import ServicioPedidos
+from backend.database import SessionLocal, engine
+from backend.idempotencia import ServicioIdempotencia, ReservaPerdida, IDEMPOTENCY_LOCK_SECONDS
+
+def test_reserva_tomada_no_crea_un_segundo_pedido(cliente, crear_usuario):
+    usuario_id, _ = crear_usuario()
+    with engine.begin() as conexion:
+        articulo_id = conexion.execute(
+            models.ArticuloInventario.__table__.insert(),
+            {"nombre": "Artículo idempotente", "cantidad": 10, "precio": 5.0}
+        ).inserted_primary_key[0]
+    pedido = schemas.PedidoCrear(items=[{"articulo_id": articulo_id, "cantidad": 2}])
+    hash_peticion = ServicioIdempotencia.calcular_hash(pedido.model_dump_json())
+
+    with SessionLocal() as lenta, SessionLocal() as reintento:
+        reserva_lenta = ServicioIdempotencia.reservar(lenta, "clave-lenta", usuario_id, hash_peticion)
+        assert reserva_lenta.original is None
+
+        # La petición original lleva más de IDEMPOTENCY_LOCK_SECONDS en curso
+        with engine.begin() as conexion:
+            tabla = models.ClaveIdempotencia.__table__
+            conexion.execute(
+                tabla.update()
+                .where(tabla.c.clave == "clave-lenta")
+                .values(fecha_creacion=reserva_lenta.fecha - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS + 1))
+            )
+        reserva_lenta.fecha -= timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS + 1)
+
+        reserva_reintento = ServicioIdempotencia.reservar(reintento, "clave-lenta", usuario_id, hash_peticion)
+        assert reserva_reintento.original is None
+        ServicioPedidos.crear_pedido(reintento, pedido, usuario_id, reserva_idempotencia=reserva_reintento)
+
+        with pytest.raises(ReservaPerdida):
+            ServicioPedidos.crear_pedido(lenta, pedido, usuario_id, reserva_idempotencia=reserva_lenta)
+        # Liberar la reserva perdida no borra la del reintento
+        ServicioIdempotencia.liberar(lenta, reserva_lenta)
+
+    with SessionLocal() as db:
+        assert db.query(models.Pedido).filter_by(usuario_id=usuario_id).count() == 1
+        assert db.get(models.ArticuloInventario, articulo_id).cantidad == 8
+        clave = db.query(models.ClaveIdempotencia).filter_by(clave="clave-lenta").one()
+        assert clave.estado == "completada"
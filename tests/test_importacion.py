@@ -0,0 +1,26 @@
+"""
+La importación masiva detecta los nombres repetidos aunque caigan en lotes
+distintos, sin guardar los nombres de todo el archivo.
+"""
+
+from backend import models
+from backend.database import SessionLocal
+from backend.importacion import ServicioImportacion
+
+def test_nombres_repetidos_dentro_y_entre_lotes(cliente):
+    filas = [
+        (1, {"nombre": "Importado A", "cantidad": 1, "precio": 1.5}),
+        (2, {"nombre": "Importado A", "cantidad": 2, "precio": 1.5}),
+        (3, {"nombre": "Importado B", "cantidad": 1, "precio": 2.0}),
+        (4, {"nombre": "Importado A", "cantidad": 3, "precio": 1.5}),
+    ]
+    with SessionLocal() as db:
+        resultado = ServicioImportacion.importar_articulos(db, filas, tamano_lote=2)
+        nombres = [
+            nombre for (nombre,) in db.query(models.ArticuloInventario.nombre)
+            .filter(models.ArticuloInventario.nombre.like("Importado %"))
+        ]
+
+    assert resultado.importados == 2
+    assert [error.fila for error in resultado.errores] == [2, 4]
+    assert sorted(nombres) == ["Importado A", "Importado B"]
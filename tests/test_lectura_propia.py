@@ -0,0 +1,20 @@
+"""
+Solo las escrituras marcan al cliente para leer de la base de datos principal;
+la consulta por lotes de artículos es un POST pero solo lee.
+"""
+
+from backend.database import COOKIE_LEER_PRIMARIA
+
+def test_consulta_por_lotes_no_marca_lectura_de_la_principal(cliente, crear_usuario):
+    _, cabeceras_admin = crear_usuario("admin")
+    cliente.cookies.clear()
+    respuesta = cliente.post("/api/articulos/lote", json={"ids": [1, 2]})
+    assert respuesta.status_code == 200, respuesta.text
+    assert COOKIE_LEER_PRIMARIA not in respuesta.headers.get("set-cookie", "")
+
+    respuesta = cliente.post(
+        "/api/articulos", json={"nombre": "Artículo escrito", "cantidad": 1, "precio": 1.0}, headers=cabeceras_admin
+    )
+    assert respuesta.status_code == 201, respuesta.text
+    assert COOKIE_LEER_PRIMARIA in respuesta.headers.get("set-cookie", "")
+    cliente.cookies.clear()
@@ -0,0 +1,27 @@
+"""
+La IP con la que se limitan login y registro: la del cliente real detrás de
+un proxy de confianza, y nunca la que escribe un cliente directo.
+"""
+
+from starlette.requests import Request
+
+from backend.limitador import ip_cliente, leer_redes
+
+PROXIES = leer_redes("127.0.0.1,172.16.0.0/12")
+
+def peticion(ip: str, cabeceras: dict = None) -> Request:
+    return Request({
+        "type": "http",
+        "client": (ip, 50000),
+        "headers": [(nombre.lower().encode(), valor.encode()) for nombre, valor in (cabeceras or {}).items()],
+    })
+
+def test_ip_del_cliente_detras_de_un_proxy_de_confianza():
+    # nginx en la red de Docker añade la IP de quien le conecta al final de X-Forwarded-For
+    assert ip_cliente(peticion("172.18.0.3", {"X-Forwarded-For": "203.0.113.7"}), PROXIES) == "203.0.113.7"
+    # Lo que el cliente escribe delante no cuenta: se toma la última IP ajena a los proxies
+    assert ip_cliente(peticion("172.18.0.3", {"X-Forwarded-For": "1.2.3.4, 203.0.113.7"}), PROXIES) == "203.0.113.7"
+    assert ip_cliente(peticion("172.18.0.3", {"X-Real-IP": "203.0.113.8"}), PROXIES) == "203.0.113.8"
+
+def test_cabeceras_ignoradas_si_la_conexion_no_viene_de_un_proxy():
+    assert ip_cliente(peticion("198.51.100.2", {"X-Forwarded-For": "1.2.3.4"}), PROXIES) == "198.51.100.2"
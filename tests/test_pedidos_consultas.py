@@ -0,0 +1,72 @@
+"""
+El listado de pedidos debe ejecutar el mismo número de consultas SQL tenga el
+usuario uno o cincuenta pedidos (sin N+1 por pedido ni por item).
+"""
+
+from backend import models
+from backend.database import engine
+from backend.instrumentacion import contar_consultas, presupuesto_consultas
+
+def sembrar_pedidos(usuario_id: int, articulo_ids, numero: int) -> None:
+    """Inserta `numero` pedidos del usuario, cada uno con una línea por artículo"""
+    with engine.begin() as conexion:
+        for _ in range(numero):
+            pedido_id = conexion.execute(
+                models.Pedido.__table__.insert(),
+                {"usuario_id": usuario_id, "total": 30.0, "estado": "pendiente"}
+            ).inserted_primary_key[0]
+            conexion.execute(
+                models.pedido_articulos.insert(),
+                [
+                    {"pedido_id": pedido_id, "articulo_id": articulo_id, "cantidad": 1, "precio_unitario": 10.0}
+                    for articulo_id in articulo_ids
+                ]
+            )
+
+# Pedidos con su usuario (un JOIN) e items de todos los pedidos (una consulta)
+CONSULTAS_LISTADO_PEDIDOS = 2
+
+def crear_articulos(numero: int = 3):
+    with engine.begin() as conexion:
+        return [
+            conexion.execute(
+                models.ArticuloInventario.__table__.insert(),
+                {"nombre": f"Artículo {i}", "cantidad": 100, "precio": 10.0}
+            ).inserted_primary_key[0]
+            for i in range(numero)
+        ]
+
+def test_listado_de_pedidos_no_depende_del_numero_de_pedidos(cliente, crear_usuario):
+    articulo_ids = crear_articulos()
+
+    consultas_por_tamano = {}
+    for numero in (1, 5, 50):
+        usuario_id, cabeceras = crear_usuario()
+        sembrar_pedidos(usuario_id, articulo_ids, numero)
+        # La primera petición del usuario puede resolver su principal en la base de datos
+        cliente.get("/api/pedidos", headers=cabeceras)
+
+        with contar_consultas() as contadas:
+            respuesta = cliente.get("/api/pedidos", headers=cabeceras)
+
+        assert respuesta.status_code == 200, respuesta.text
+        pedidos = respuesta.json()
+        assert len(pedidos) == numero
+        assert all(len(pedido["items"]) == len(articulo_ids) for pedido in pedidos)
+        consultas_por_tamano[numero] = contadas.consultas
+
+    assert len(set(consultas_por_tamano.values())) == 1, consultas_por_tamano
+
+def test_listado_de_pedidos_de_admin_dentro_del_presupuesto(cliente, crear_usuario):
+    articulo_ids = crear_articulos()
+    for _ in range(5):
+        usuario_id, _ = crear_usuario()
+        sembrar_pedidos(usuario_id, articulo_ids, 10)
+    _, cabeceras_admin = crear_usuario("admin")
+    cliente.get("/api/pedidos", headers=cabeceras_admin)
+
+    with presupuesto_consultas(CONSULTAS_LISTADO_PEDIDOS):
+        respuesta = cliente.get("/api/pedidos", headers=cabeceras_admin)
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert len(respuesta.json()) >= 50